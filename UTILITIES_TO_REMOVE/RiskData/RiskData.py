@@ -209,7 +209,7 @@ class RiskData:
         # variables = ['@report_date', '@FundCode']
         variables = ['@python_date', '@python_portfolio', '@python_all']
 
-        replace_method = ['raw', 'in', 'default']
+        replace_method = ['values', 'in', 'default']
 
         if isinstance(portfolios, list):
             if portfolios and portfolios[0] == 'All':
@@ -229,21 +229,20 @@ class RiskData:
             raise TypeError('The input portfolios should either be a list or a string.')
 
         if isinstance(dates, list) & (len(dates) > 1):
-            datesInput = "('" + "'),('".join(dates) + "')"
             datesList = dates
         elif isinstance(dates, str):
-            datesInput = "('" + dates + "')"
             datesList = [dates]
         else:
             raise TypeError('The input dates should either be a list or a string.')
 
-        values = [datesInput, portfoliosInput, allInput]
+        values = [datesList, portfoliosInput, allInput]
         # values = ['2020-07-31', "', '".join(['EUHYDEN', 'SJPHY'])]
 
-        # Request fund risk data
+        # Request fund risk data. The values are bound as parameters, so the query plan is reused across funds and
+        # dates. The risk of historical month-ends is final, so it is cached until evicted
         tempFundRisk = database.read_sql(path=fundRiskPath, variables=variables, values=values,
                                          replace_method=replace_method, statement_number=0,
-                                         stored_procedure=True)
+                                         stored_procedure=True, bind_parameters=True, as_of=datesList)
 
         tempFundRisk.rename(columns={'BET': 'ActiveWeight'},
                             inplace=True)
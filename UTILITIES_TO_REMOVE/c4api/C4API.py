@@ -7,12 +7,22 @@
 ========================================================================================================================================================================
 """  # noqa: E501
 
+import base64
+import http.client
 import json
+import os
 import re
 import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
 import urllib.response
-from datetime import datetime, timedelta
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
 import pandas as pd
 
@@ -23,6 +33,9 @@ from capfourpy.c4api.Additional_DataSources import (
 )
 from capfourpy.c4api.C4API_Utilities import getReturnSeries
 from capfourpy.c4api.CalculationEngine import GrossIndex
+from UTILITIES_TO_REMOVE.cache import get_result_cache
+from utils.as_of_dates import historical_as_of_date
+from utils.tracing import current_span, traced
 
 SCOPES = [
     "api://cfanalytics.ad.capital-four.com/Performance.ReadWrite",
@@ -48,6 +61,201 @@ TIMESERIES_CONTROLLER = [
 CFANALYTCS_API_CLIENT_ID = "ad926898-da0e-41cf-be78-28db55dbfbfd"
 AZURE_TENANT_ID = "62c5eb46-d129-44dd-91fd-47d9e6a17d69"
 
+# Tokens are renewed this many seconds before they expire. Tokens without a readable expiry are kept for
+# TOKEN_DEFAULT_LIFETIME seconds.
+TOKEN_EXPIRY_MARGIN = 120
+TOKEN_DEFAULT_LIFETIME = 3000
+
+
+def generate_api_token(scope: str) -> str:
+    """Default token provider for CapFourAPI, generating an Azure token for the given scope."""
+    return generate_token(scopes=[scope], tenant_id=AZURE_TENANT_ID, client_id=CFANALYTCS_API_CLIENT_ID)
+
+
+def _token_expiry(token: str) -> float:
+    # Read the expiry from the (unverified) JWT payload
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + TOKEN_DEFAULT_LIFETIME
+
+
+class TokenCache:
+    """
+    Process-wide cache of API tokens per token provider and scope, renewed shortly before they expire. The cache lock
+    is only held to read and store tokens. A token is fetched outside it, by one thread per provider and scope while
+    the others wait for its result, so a slow fetch does not block the tokens of other scopes.
+    """
+
+    def __init__(self):
+        self.__tokens = {}
+        self.__fetch_locks = {}
+        self.__lock = threading.Lock()
+
+    def __valid_token(self, key: tuple) -> str | None:
+        token, expires_at = self.__tokens.get(key, (None, 0.0))
+        if token is None or time.time() >= expires_at - TOKEN_EXPIRY_MARGIN:
+            return None
+        return token
+
+    def get(self, scope: str, provider: Callable[[str], str]) -> str:
+        key = (provider, scope)
+        with self.__lock:
+            token = self.__valid_token(key)
+            if token is not None:
+                return token
+            fetch_lock = self.__fetch_locks.setdefault(key, threading.Lock())
+
+        with fetch_lock:
+            # Renewed by another thread while this one waited
+            with self.__lock:
+                token = self.__valid_token(key)
+            if token is None:
+                token = provider(scope)
+                expires_at = _token_expiry(token)
+                with self.__lock:
+                    self.__tokens[key] = (token, expires_at)
+            return token
+
+
+class KeepAliveSession:
+    """
+    Reuses one HTTP(S) connection per thread and host, instead of opening a new connection for every request as
+    urllib.request.urlopen does. A request on a connection the server has closed is retried once on a new connection.
+    Redirects are followed like urlopen does, up to MAX_REDIRECTS.
+    """
+
+    MAX_REDIRECTS = 10
+
+    def __init__(self, timeout: float = 300):
+        self.timeout = timeout
+        self.__local = threading.local()
+
+    def __connection(self, scheme: str, netloc: str, context: ssl.SSLContext) -> http.client.HTTPConnection:
+        connections = self.__connections()
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(netloc, timeout=self.timeout, context=context)
+            else:
+                connection = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            connections[(scheme, netloc)] = connection
+        return connection
+
+    def __connections(self) -> dict:
+        # Connections of the current thread, keyed by (scheme, netloc)
+        connections = getattr(self.__local, "connections", None)
+        if connections is None:
+            connections = self.__local.connections = {}
+        return connections
+
+    def __drop(self, scheme: str, netloc: str):
+        connection = self.__connections().pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def __send(
+        self, method: str, url: str, body: bytes | None, headers: dict, context: ssl.SSLContext | None
+    ) -> tuple[int, http.client.HTTPMessage, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        for attempt in range(2):
+            connection = self.__connection(parts.scheme, parts.netloc, context)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.__drop(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+                continue
+
+            if response.will_close:
+                self.__drop(parts.scheme, parts.netloc)
+            return response.status, response.headers, data
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict | None = None,
+        context: ssl.SSLContext | None = None,
+    ) -> tuple[int, bytes]:
+        """
+        Send the request and return the status code and the response body.
+
+        Raises
+        ------
+            urllib.error.HTTPError: If the response is still a redirect after MAX_REDIRECTS redirects, or a redirect
+                has no Location.
+        """
+        headers = dict(headers or {})
+        for _ in range(self.MAX_REDIRECTS + 1):
+            status, response_headers, data = self.__send(method, url, body, headers, context)
+            if status not in (301, 302, 303, 307, 308):
+                return status, data
+
+            location = response_headers.get("Location")
+            if location is None:
+                raise urllib.error.HTTPError(url, status, "Redirect without a Location", response_headers, None)
+
+            redirect_url = urllib.parse.urljoin(url, location)
+            # The credentials are only sent to the host they were meant for
+            if urllib.parse.urlsplit(redirect_url).netloc != urllib.parse.urlsplit(url).netloc:
+                headers = {key: value for key, value in headers.items() if key.lower() != "authorization"}
+            # Like urlopen, 301, 302 and 303 are repeated as a GET without the body, 307 and 308 as they were
+            if status in (301, 302, 303) and method != "HEAD":
+                method, body = "GET", None
+                headers = {key: value for key, value in headers.items()
+                           if key.lower() not in ("content-type", "content-length")}
+            url = redirect_url
+
+        raise urllib.error.HTTPError(url, status, f"More than {self.MAX_REDIRECTS} redirects", response_headers, None)
+
+
+_TOKEN_CACHE = TokenCache()
+_SESSION = KeepAliveSession()
+
+# The threads of cfdh_many. They live as long as the process, so their keep-alive connections are reused by later
+# calls. A forked process creates its own executor.
+CFDH_MAX_WORKERS = 8
+_EXECUTOR = None
+_EXECUTOR_PID = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR, _EXECUTOR_PID
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+            _EXECUTOR = ThreadPoolExecutor(max_workers=CFDH_MAX_WORKERS, thread_name_prefix="cfdh")
+            _EXECUTOR_PID = os.getpid()
+        return _EXECUTOR
+
+
+def _map_concurrently(fetch: Callable, items: list, max_workers: int) -> list:
+    # The results of fetch for the items, in their order, with at most max_workers requests in flight. Pending
+    # requests are cancelled when one fails.
+    executor = _get_executor()
+    results = []
+    pending = deque()
+    try:
+        for item in items:
+            if len(pending) >= max_workers:
+                results.append(pending.popleft().result())
+            pending.append(executor.submit(fetch, item))
+        while pending:
+            results.append(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+    return results
+
 
 class CapFourAPI:
     """
@@ -80,11 +288,21 @@ class CapFourAPI:
         )
     """
 
-    def __init__(self):
+    def __init__(self, BaseURL: str | None = None, TokenProvider: Callable[[str], str] | None = None):
+        """
+        Args:
+            BaseURL (Optional[str]): Base URL of the API, by default the CfAnalytics API. Can point at a local stub server.
+            TokenProvider (Optional[Callable[[str], str]]): Function returning a bearer token for a scope, by default
+                generate_api_token. Tokens are cached process-wide until shortly before they expire.
+        """
         # self.BASEURL = 'https://cfanalytics.ad.capital-four.com/DataMgmt/api'  # Old API without authentication
         self.BASEURL = (
             "https://cfanalytics.ad.capital-four.com/api"  # New API with authentication enabled
         )
+        if BaseURL is not None:
+            self.BASEURL = BaseURL.rstrip("/")
+
+        self.TokenProvider = TokenProvider if TokenProvider is not None else generate_api_token
 
         # Context for not checking the Certificate. Should only be used for trusted URLs
         self.context = ssl.create_default_context()
@@ -104,15 +322,17 @@ class CapFourAPI:
             pd.DataFrame: The data from the URL as a DataFrame
         """
         idp_token = self.__get_token(field)
-        try:
-            request = urllib.request.Request(url, headers={"Authorization": f"Bearer {idp_token}"})
-            response = urllib.request.urlopen(request, context=self.context)
-            response = response.read().decode("utf-8")
-            response_json = json.loads(response)
-            tempDataFrame = pd.DataFrame(data=response_json)
-        except urllib.error.HTTPError:
+
+        # The connection is kept alive and reused for the next request from this thread
+        status, response = _SESSION.request(
+            "GET", url, headers={"Authorization": f"Bearer {idp_token}"}, context=self.context
+        )
+        if status >= 400:
             return pd.DataFrame()
 
+        response_json = json.loads(response.decode("utf-8"))
+        tempDataFrame = pd.DataFrame(data=response_json)
+
         if neastedKey is not None:
             tempNeastedDataFrame = tempDataFrame[neastedKey].apply(pd.Series)
             tempDataFrame = pd.merge(
@@ -135,9 +355,7 @@ class CapFourAPI:
             else:
                 raise ValueError("This Field is not yet implemented!")
 
-            token = generate_token(
-                scopes=[scope], tenant_id=AZURE_TENANT_ID, client_id=CFANALYTCS_API_CLIENT_ID
-            )
+            token = _TOKEN_CACHE.get(scope=scope, provider=self.TokenProvider)
         else:
             token = None
         return token
@@ -171,12 +389,19 @@ class CapFourAPI:
 
         return response
 
-    def cfdh(self, Identifier: str, Field: str, **kwargs) -> pd.DataFrame:
+    @traced("cfdh", category="api")
+    def cfdh(self, Identifier: str, Field: str, AsOf: date | str | None = None, **kwargs) -> pd.DataFrame:
         """Get the data from the Capital Four API.
 
+        The result is looked up in the result cache (see UTILITIES_TO_REMOVE.cache) if one is configured. Empty
+        results are not cached, as failed requests also return an empty DataFrame.
+
         Args:
             Identifier (str): The Identifier of the data
             Field (str): The Field of the data
+            AsOf (Optional[date | str]): The as-of date of the data, only for data that never changes once published.
+                A cached result of a historical month-end is then kept until it is evicted, by default None, so cached
+                results expire after the time-to-live.
 
         Returns
         -------
@@ -188,6 +413,75 @@ class CapFourAPI:
             ValueError: If the Identifier is not a Currency when Field is "HedgeCost"
             ValueError: If the Field is not implemented yet
         """
+        current_span().set(identifier=Identifier, field=Field)
+        cache = get_result_cache()
+        if cache is None:
+            return self.__cfdh(Identifier=Identifier, Field=Field, **kwargs)
+
+        cache_key = cache.make_key("cfdh", url=self.BASEURL, Identifier=Identifier, Field=Field, kwargs=kwargs)
+        tempDataframe = cache.get(cache_key)
+        if tempDataframe is not None:
+            current_span().set(cached=True)
+        else:
+            tempDataframe = self.__cfdh(Identifier=Identifier, Field=Field, **kwargs)
+            if not tempDataframe.empty:
+                cache.put(cache_key, tempDataframe, as_of_date=historical_as_of_date(AsOf))
+
+        return tempDataframe
+
+    def cfdh_many(self, Identifiers: list, Field: str, MaxWorkers: int = 8, **kwargs) -> pd.DataFrame:
+        """Get the data for several identifiers concurrently and return it as one DataFrame.
+
+        Args:
+            Identifiers (list): The Identifiers of the data, see cfdh
+            Field (str): The Field of the data
+            MaxWorkers (Optional[int]): The maximum number of concurrent requests, by default 8. The requests run on a
+                shared pool of CFDH_MAX_WORKERS threads, which also bounds the concurrency.
+            **kwargs: Passed on to cfdh
+
+        Returns
+        -------
+            pd.DataFrame: The concatenated data. An "Identifier" column holding the requested Identifier is added,
+            unless the data already has one.
+
+        Raises
+        ------
+            See cfdh. The first error raised by any of the requests is raised.
+        """
+        def fetch(identifier):
+            tempDataframe = self.cfdh(Identifier=identifier, Field=Field, **kwargs)
+            if "Identifier" not in tempDataframe.columns:
+                tempDataframe = tempDataframe.assign(Identifier=identifier)
+            return tempDataframe
+
+        frames = _map_concurrently(fetch, list(Identifiers), MaxWorkers)
+        if not frames:
+            return pd.DataFrame()
+
+        return pd.concat(frames, ignore_index=True)
+
+    def cfdh_fields(self, Identifier: str | None, Fields: list, MaxWorkers: int = 8, **kwargs) -> dict:
+        """Get several Fields of the same Identifier concurrently, e.g. the NAV, AUM and shares series of all funds.
+
+        Args:
+            Identifier (str): The Identifier of the data, see cfdh
+            Fields (list): The Fields of the data
+            MaxWorkers (Optional[int]): The maximum number of concurrent requests, by default 8, see cfdh_many.
+            **kwargs: Passed on to cfdh
+
+        Returns
+        -------
+            dict: The data of every Field, keyed by the Field.
+
+        Raises
+        ------
+            See cfdh. The first error raised by any of the requests is raised.
+        """
+        frames = _map_concurrently(lambda field: self.cfdh(Identifier=Identifier, Field=field, **kwargs),
+                                   list(Fields), MaxWorkers)
+        return dict(zip(Fields, frames))
+
+    def __cfdh(self, Identifier: str, Field: str, **kwargs) -> pd.DataFrame:
         # Unpack Kwargs
         StartDateInput = kwargs.get("StartDate")
         EndDateInput = kwargs.get("EndDate")
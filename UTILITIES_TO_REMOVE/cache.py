@@ -0,0 +1,128 @@
+"""Persistent result cache.
+
+On-disk cache for the data frames returned by Database.read_sql and CapFourAPI.cfdh, keyed by the normalized query
+and its parameters. The frames are stored as Parquet files (requires pyarrow) with a small SQLite index holding the
+size, expiry and last access of every entry.
+
+The cache is disabled unless the environment variable RESULT_CACHE_PATH points at a directory, or a cache is set with
+set_result_cache. The size limit and the time-to-live are read from RESULT_CACHE_MAX_BYTES and RESULT_CACHE_TTL
+(seconds).
+
+Entries expire after the time-to-live. Callers reading data that never changes once published, e.g. a month-end
+snapshot, can pass its as-of date, and entries whose as-of date is a month-end before the current month are then kept
+until they are evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+from utils.lru_file_store import LruFileStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+DEFAULT_TTL = timedelta(hours=1)
+
+
+class ResultCache(LruFileStore):
+    """
+    Size-bounded on-disk cache of data frames with least-recently-used eviction, see utils.lru_file_store.
+
+    Examples
+    --------
+        cache = ResultCache(directory='/tmp/lumo_cache', max_bytes=500 * 1024**2)
+        key = cache.make_key('read_sql', database='C4DW', query=query, parameters=parameters)
+        data = cache.get(key)
+        if data is None:
+            data = db.read_sql(query=query)
+            cache.put(key, data, as_of_date=date(2024, 11, 29))
+        print(cache.stats())
+    """
+
+    TABLE = "entries"
+    SUFFIX = ".parquet"
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, ttl: timedelta = DEFAULT_TTL):
+        super().__init__(directory, max_bytes, ttl)
+
+    @staticmethod
+    def make_key(namespace: str, **parts) -> str:
+        """Hash the namespace and the keyword arguments into a cache key. Values are serialized with str if needed."""
+        payload = json.dumps({"namespace": namespace, **parts}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """Return the cached data frame, or None if the key is missing or has expired."""
+        if self._lookup(key) is None:
+            return None
+
+        try:
+            data = pd.read_parquet(self._path(key))
+        except (OSError, ValueError):
+            # Evicted by another process between the lookup and the read
+            data = None
+
+        self._count(hit=data is not None)
+        return data
+
+    def put(self, key: str, data: pd.DataFrame, as_of_date: date | None = None) -> bool:
+        """
+        Store a data frame.
+
+        Args:
+            key (str): The cache key, see make_key.
+            data (pd.DataFrame): The data frame to store.
+            as_of_date (Optional[date]): The as-of date of data that never changes once published, e.g. a month-end
+                snapshot. Entries of a historical month-end never expire, all others expire after the time-to-live.
+
+        Returns
+        -------
+            bool: False if the data frame could not be stored as Parquet (e.g. duplicate column names), else True.
+        """
+        temp_path = self._temp_path(key)
+        try:
+            data.to_parquet(temp_path)
+        except (ValueError, TypeError, ImportError, NotImplementedError) as e:
+            logger.warning("The result could not be cached: %s", e)
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            return False
+
+        self._add(key, temp_path, as_of_date=as_of_date)
+        return True
+
+
+_RESULT_CACHE = None
+_RESULT_CACHE_CONFIGURED = False
+_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def set_result_cache(cache: ResultCache | None):
+    """Set the process-wide result cache, or disable it with None."""
+    global _RESULT_CACHE, _RESULT_CACHE_CONFIGURED
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE = cache
+        _RESULT_CACHE_CONFIGURED = True
+
+
+def get_result_cache() -> ResultCache | None:
+    """Return the process-wide result cache. On first use it is created from RESULT_CACHE_PATH, if set."""
+    global _RESULT_CACHE, _RESULT_CACHE_CONFIGURED
+    with _RESULT_CACHE_LOCK:
+        if not _RESULT_CACHE_CONFIGURED:
+            directory = os.environ.get("RESULT_CACHE_PATH")
+            if directory:
+                _RESULT_CACHE = ResultCache(
+                    directory=directory,
+                    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                    ttl=timedelta(seconds=float(os.environ.get("RESULT_CACHE_TTL", DEFAULT_TTL.total_seconds()))),
+                )
+            _RESULT_CACHE_CONFIGURED = True
+
+        return _RESULT_CACHE
@@ -14,16 +14,25 @@ Database class: Python - Microsoft SQL Sever API connection.
 It can be used for both reading and writing to the database. Note however that there isn't
 implemented any writing restricting, these should be given through ones Microsoft credentials.
 
-NOTE: This class is not thread-safe!
+NOTE: The SQLAlchemy engines are shared process-wide through a thread-safe registry, see get_engine.
 """
 
+import collections
+import decimal
 import platform
+import re
+import threading
 import urllib
+from collections.abc import Iterator
+from datetime import date, datetime, time
 
 import pandas as pd
 import sqlalchemy
 
 from UTILITIES_TO_REMOVE import authentication
+from UTILITIES_TO_REMOVE.cache import get_result_cache
+from utils.as_of_dates import historical_as_of_date
+from utils.tracing import current_span, traced
 
 VALID_SERVER_STRINGS = [
     "DB-C4DW-PROD.ad.capital-four.com",
@@ -31,6 +40,96 @@ VALID_SERVER_STRINGS = [
     "mi-c4-share-register.public.c8c6f9050130.database.windows.net,3342",
 ]
 
+# Connection pool settings for the shared engines. Connections are checked with a ping before use and recycled
+# before the Azure access token (and Kerberos tickets) can expire.
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 10
+POOL_TIMEOUT = 30
+POOL_RECYCLE = 1800
+
+# SQL Server accepts at most 2100 parameters per request, queries needing more are substituted into the text instead
+MAX_PARAMETERS = 2100
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(
+    server: str,
+    database: str,
+    azure: bool,
+    use_service_account: bool,
+    connection_str: str,
+    fast_executemany: bool = False,
+) -> sqlalchemy.engine.Engine:
+    """Get the shared engine for the given connection, creating it on first use.
+
+    Engines are keyed by (server, database, azure, use_service_account, fast_executemany), so every Database instance
+    pointing at the same database reuses the same QueuePool and its warm connections.
+
+    The Kerberos environment and the Azure access token are set up when the pool opens a new connection rather than
+    when the engine is created, so long-lived engines keep working after the credentials have been renewed.
+
+    Args:
+        server (str): The server the engine connects to.
+        database (str): The database the engine connects to.
+        azure (bool): Whether the server is an Azure server.
+        use_service_account (bool): Use a service account for the Kerberos setup.
+        connection_str (str): The ODBC connection string.
+        fast_executemany (Optional[bool]): Passed on to pyodbc, by default False.
+
+    Returns
+    -------
+        sqlalchemy.engine.Engine
+    """
+    key = (server, database, azure, use_service_account, fast_executemany)
+
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is not None:
+            return engine
+
+        # The connection requires a URL format
+        parameters = urllib.parse.quote_plus(connection_str)
+
+        # Instantiation of the SQL engine, which is used to connect Python with SQL
+        engine = sqlalchemy.create_engine(
+            f"mssql+pyodbc:///?odbc_connect={parameters}",
+            fast_executemany=fast_executemany,
+            poolclass=sqlalchemy.pool.QueuePool,
+            pool_size=POOL_SIZE,
+            max_overflow=POOL_MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+        @sqlalchemy.event.listens_for(engine, "do_connect")
+        def _authenticate(dialect, conn_rec, cargs, cparams):
+            if platform.system() != "Linux":
+                return
+            if azure:
+                cparams["attrs_before"] = authentication.get_azure_db_token()
+            else:
+                authentication.setup_kerberos_environment(use_service_account)
+
+        _ENGINES[key] = engine
+
+    return engine
+
+
+def dispose_engines():
+    """Close all pooled connections and clear the engine registry, e.g. after forking a process."""
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+
+def _row(item) -> tuple:
+    # A row of a table value constructor, tuples are rows of several columns
+    return tuple(item) if isinstance(item, tuple) else (item,)
+
 
 class Database:
     """
@@ -44,7 +143,8 @@ class Database:
     for handling multiple SQL statements and stored procedures, including support for fetching
     multiple result sets.
 
-    NOTE: This class is not thread-safe!
+    NOTE: Instances share a pooled engine per database (see get_engine) and every query checks out its own
+    connection, so instances can be created freely and used from several threads.
     NOTE: This class assumes that the necessary credentials are managed externally.
 
     Examples
@@ -97,7 +197,6 @@ class Database:
         """  # noqa: E501
         self.DATABASE = database
         self.SERVER = server
-        connect_args_attrs = {}
 
         # Control server string
         if server and server not in VALID_SERVER_STRINGS:
@@ -111,8 +210,6 @@ class Database:
                 self.SERVER = "DB-C4DW-PROD.ad.capital-four.com"
             self.DRIVER = "ODBC Driver 17 for SQL Server"
             connection_str = f"Driver={self.DRIVER}; Server={self.SERVER}; Database={self.DATABASE}; Trusted_Connection=yes"  # noqa: E501
-            if platform.system() == "Linux":
-                authentication.setup_kerberos_environment(use_service_account)
         elif azure:
             # Set the Azure Server
             if not self.SERVER:
@@ -122,7 +219,6 @@ class Database:
                 connection_str = (
                     f"Driver={self.DRIVER}; Server={self.SERVER}; Database={self.DATABASE};"
                 )
-                connect_args_attrs = authentication.get_azure_db_token()
             else:
                 self.DRIVER = "ODBC Driver 17 for SQL Server"
                 connection_str = f"Driver={self.DRIVER}; Server=tcp:{self.SERVER}; Database={self.DATABASE}; Encrypt=yes;TrustServerCertificate=no; Connection Timeout=30; Authentication=ActiveDirectoryIntegrated"  # noqa: E501
@@ -131,16 +227,17 @@ class Database:
                 'Either connect to an SQL Server or an Azure Server. Only boolean values can be passed to parameter "Azure".'  # noqa: E501
             )
 
-        # The connection requires a URL format
-        parameters = urllib.parse.quote_plus(connection_str)
-
-        # Instantiation of the SQL engine, which is used to connect Python with SQL
-        self.engine = sqlalchemy.create_engine(
-            f"mssql+pyodbc:///?odbc_connect={parameters}",
+        # Reuse the shared engine for this connection
+        self.engine = get_engine(
+            server=self.SERVER,
+            database=self.DATABASE,
+            azure=azure,
+            use_service_account=use_service_account,
+            connection_str=connection_str,
             fast_executemany=kwargs.get("fast_executemany", False),
-            connect_args={"attrs_before": connect_args_attrs},
         )
 
+    @traced("read_sql", category="query")
     def read_sql(
         self,
         query: str = None,
@@ -150,6 +247,9 @@ class Database:
         stored_procedure: bool = False,
         statement_number: int = 0,
         debug: bool = False,
+        bind_parameters: bool = False,
+        use_cache: bool = True,
+        as_of: date | str | list | None = None,
         **kwargs,
     ) -> pd.DataFrame:
         """Read data from the database using a SQL query or a file path.
@@ -162,11 +262,18 @@ class Database:
             stored_procedure (Optional[bool]): Indicate whether to execute a stored procedure, by default False
             statement_number (Optional[int]): Used to indicate which SQL statement should be loaded, if the query contains more than one statement, by default 0
             debug (Optional[bool]): Enable debug print statements, by default False
+            use_cache (Optional[bool]): Look the result up in the result cache (see UTILITIES_TO_REMOVE.cache) if one is configured, by default True. Results with several tables are cached per table.
+            as_of (Optional[date | str | list]): The as-of dates of the data, only for queries and stored procedures reading data that never changes once published, e.g. month-end snapshots. A cached result is then kept until it is evicted if all the dates are historical month-ends, by default None, so cached results expire after the time-to-live.
+            bind_parameters (Optional[bool]): Send the values as bound parameters instead of substituting them into the query text, by default False. The query text then stays the same across calls, so SQL Server can reuse the cached plan. 'raw' variables are still substituted into the text, and the values are substituted if they need more than MAX_PARAMETERS parameters.
             **kwargs (Optional[any]): Additional keyword arguments. The only two available parameters are:
                 replace_method (Optional[list]): This indicates how the parameters in the SQL query should be replaced. Possible values are:
                     'default': This is used when only on parameter should be inserted.
                     'in': This is used when one wants to substitute one parameter in a SQL query
-                    with a list of arguments.
+                    with a list of arguments. With bind_parameters the list is padded to the next power of two
+                    by repeating the last value, to limit the number of distinct query texts. The padding stops at
+                    MAX_PARAMETERS parameters.
+                    'values': A list of arguments inserted as a table value constructor, i.e. ('a'), ('b').
+                    Tuples in the list are inserted as rows of several columns, i.e. ('a', 1), ('b', 2).
                     'raw': This is a user defines method, where the users input is substituted
                     directly into the SQl query.
                 Tables (Optional[int]): This indicates how many tables the user wants to fetch from the database.
@@ -187,6 +294,371 @@ class Database:
             ValueError: If the number of tables is not a positive integer.
             TimeoutError: If the process reaches the maximum number of iterations.
         """  # noqa: E501
+        query, parameters = self.__prepare_query(
+            query=query,
+            path=path,
+            variables=variables,
+            values=values,
+            stored_procedure=stored_procedure,
+            debug=debug,
+            bind_parameters=bind_parameters,
+            replace_method=kwargs.get("replace_method"),
+        )
+        current_span().set(database=self.DATABASE, query=path or query[:200])
+
+        # Look up the result cache, keyed by the normalized query and its parameters
+        cache = get_result_cache() if use_cache else None
+        if cache is not None:
+            cache_key = cache.make_key(
+                "read_sql",
+                server=self.SERVER,
+                database=self.DATABASE,
+                query="\n".join(line.strip() for line in query.splitlines() if line.strip()),
+                parameters=parameters,
+                statement_number=statement_number,
+                tables=kwargs.get("Tables"),
+            )
+            cached_result = self.__get_cached(cache, cache_key, kwargs.get("Tables"))
+            if cached_result is not None:
+                current_span().set(cached=True)
+                return cached_result
+
+        # Get a raw connection to the database via pyodbc
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+
+            # Execute the query
+            if parameters:
+                cursor.execute(query, parameters)
+            else:
+                cursor.execute(query)
+
+            # Find the table of interest
+            if "Tables" in kwargs:
+                NoOfTables = kwargs.get("Tables")
+                if NoOfTables < 1:
+                    raise ValueError("The Number of tables needs to be a positive integer.")
+
+                Result = {}
+                TableCounter = 1
+                BreakCounter = 0
+                while TableCounter <= NoOfTables:
+                    if not BreakCounter < 100:
+                        raise TimeoutError(
+                            f"The current limit of {BreakCounter} was reached, thus the process is terminated!"  # noqa: E501
+                        )
+                    BreakCounter += 1
+
+                    if debug:
+                        print(cursor.description)
+                        print(f"Table: {TableCounter}, Break: {BreakCounter}, NoOfTables: {NoOfTables}")
+
+                    # Fetch the all the column names and rows
+                    try:
+                        column_names = [col[0] for col in cursor.description]
+                        data_rows = cursor.fetchall()
+                        DataLocated = True
+                    except TypeError:
+                        DataLocated = False
+
+                    if DataLocated:
+                        # Convert the data to a pandas data frame
+                        temp_data = pd.DataFrame(data=(tuple(row) for row in data_rows))
+                        temp_data.rename(
+                            columns=dict(zip(temp_data.columns, column_names, strict=False)),
+                            inplace=True,
+                        )
+
+                        Result.update({"Table_" + str(TableCounter): temp_data})
+
+                        TableCounter += 1
+
+                    cursor.nextset()
+            else:
+                if statement_number > 0:
+                    tableCounter = 1
+                    while tableCounter <= statement_number:
+                        cursor.nextset()
+                        if debug:
+                            print(cursor.description)
+                        tableCounter += 1
+
+                # Fetch the all the column names and rows
+                column_names = [col[0] for col in cursor.description]
+                data_rows = cursor.fetchall()
+
+                # Convert the data to a pandas data frame
+                Result = pd.DataFrame(data=(tuple(row) for row in data_rows))
+                Result.rename(
+                    columns=dict(zip(Result.columns, column_names, strict=False)), inplace=True
+                )
+        finally:
+            # Return the connection to the pool, also when the query fails
+            connection.close()
+
+        if cache is not None:
+            as_of_date = historical_as_of_date(as_of)
+            if isinstance(Result, dict):
+                for name, table in Result.items():
+                    cache.put(f"{cache_key}-{name}", table, as_of_date=as_of_date)
+            else:
+                cache.put(cache_key, Result, as_of_date=as_of_date)
+
+        return Result
+
+    @staticmethod
+    def __get_cached(cache, cache_key: str, tables: int | None) -> pd.DataFrame | dict | None:
+        """Return the cached result of read_sql, or None if it or one of its tables is not cached."""
+        if tables is None:
+            return cache.get(cache_key)
+        if tables < 1:
+            return None
+
+        Result = {}
+        for TableCounter in range(1, tables + 1):
+            name = "Table_" + str(TableCounter)
+            Result[name] = cache.get(f"{cache_key}-{name}")
+            if Result[name] is None:
+                return None
+        return Result
+
+    def read_sql_chunks(
+        self,
+        query: str = None,
+        path: str = None,
+        variables: list = None,
+        values: list = None,
+        stored_procedure: bool = False,
+        statement_number: int = 0,
+        debug: bool = False,
+        bind_parameters: bool = False,
+        chunksize: int = 100000,
+        arrow: bool = False,
+        **kwargs,
+    ) -> Iterator[pd.DataFrame]:
+        """Read data from the database in chunks of rows, without materializing the full result set.
+
+        The arguments are the same as for read_sql, except that only one result set (statement_number) can be read.
+        The arguments are checked and the query is prepared when this method is called, the query is executed on the
+        first next(). The connection is held until the iterator is exhausted or closed.
+
+        Args:
+            chunksize (Optional[int]): The number of rows fetched with each fetchmany, by default 100000
+            arrow (Optional[bool]): Build typed pyarrow columns directly from the fetched rows instead of going through
+                Python tuples, by default False. The returned frames then use pd.ArrowDtype columns, with the same
+                types in every chunk, taken from the column types of the result set. Requires pyarrow.
+            For the other arguments see read_sql.
+
+        Returns
+        -------
+            Iterator[pd.DataFrame]
+                Data frames with at most chunksize rows. An empty result set yields a single empty data frame with
+                the column names.
+
+        Raises
+        ------
+            ValueError: If the chunksize is not a positive integer.
+            ImportError: If arrow is True and pyarrow is not installed.
+            See read_sql for the errors raised when preparing the query.
+        """  # noqa: E501
+        if chunksize < 1:
+            raise ValueError("The chunksize needs to be a positive integer.")
+
+        if arrow:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("The arrow conversion requires pyarrow, please install it or set arrow=False.")
+
+        query, parameters = self.__prepare_query(
+            query=query,
+            path=path,
+            variables=variables,
+            values=values,
+            stored_procedure=stored_procedure,
+            debug=debug,
+            bind_parameters=bind_parameters,
+            replace_method=kwargs.get("replace_method"),
+        )
+
+        return self.__iterate_chunks(query, parameters, statement_number, debug, chunksize, arrow)
+
+    def __iterate_chunks(
+        self, query: str, parameters: list, statement_number: int, debug: bool, chunksize: int, arrow: bool
+    ) -> Iterator[pd.DataFrame]:
+        """Execute the prepared query and yield its rows in chunks, see read_sql_chunks."""
+        # Get a raw connection to the database via pyodbc
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+
+            # Execute the query
+            if parameters:
+                cursor.execute(query, parameters)
+            else:
+                cursor.execute(query)
+
+            for _ in range(statement_number):
+                cursor.nextset()
+                if debug:
+                    print(cursor.description)
+
+            column_names = [col[0] for col in cursor.description]
+            schema = self.__arrow_schema(cursor.description) if arrow else None
+
+            data_rows = cursor.fetchmany(chunksize)
+            if not data_rows:
+                if schema is not None:
+                    yield schema.empty_table().to_pandas(types_mapper=pd.ArrowDtype)
+                else:
+                    yield pd.DataFrame(columns=column_names)
+
+            while data_rows:
+                yield self.__rows_to_frame(data_rows, column_names, schema)
+                data_rows = cursor.fetchmany(chunksize)
+        finally:
+            # Close the connection, also if the iterator is closed early
+            connection.close()
+
+    def last_modified(self, tables: list) -> str | None:
+        """Return the last time rows were inserted, updated or deleted in the given tables of this database.
+
+        Views are resolved to the tables they read from. The time is taken from the index usage statistics of the
+        server (sys.dm_db_index_usage_stats), which needs the VIEW SERVER STATE permission and is reset when the
+        server restarts. It is meant as a data version token, see utils.artifact_cache.
+
+        Args:
+            tables (list): The tables and views, e.g. ['DailyOverview.Positions', 'Performance.vwBaseValue'].
+
+        Returns
+        -------
+            str or None
+                The time in ISO format, or None if it is unknown for one of the tables, i.e. the table or a table of
+                a view could not be resolved or was not modified since the server started.
+        """
+        query = """WITH names
+                   AS (SELECT t.TableName,
+                              OBJECT_ID(t.TableName) AS ObjectId
+                       FROM (VALUES @tables_py) AS t (TableName)),
+                        objects
+                   AS (SELECT n.ObjectId
+                       FROM names AS n
+                       WHERE n.ObjectId IS NOT NULL
+                       UNION ALL
+                       SELECT d.referenced_id
+                       FROM objects AS o
+                           INNER JOIN sys.sql_expression_dependencies AS d
+                               ON d.referencing_id = o.ObjectId
+                       WHERE d.referenced_id IS NOT NULL),
+                        source_tables
+                   AS (SELECT DISTINCT o.ObjectId
+                       FROM objects AS o
+                           INNER JOIN sys.tables AS t
+                               ON t.object_id = o.ObjectId)
+                   SELECT r.Unresolved,
+                          m.Tables,
+                          m.Modified,
+                          m.LastModified
+                   FROM
+                   (
+                       SELECT COUNT(*) AS Tables,
+                              COUNT(u.LastUserUpdate) AS Modified,
+                              MAX(u.LastUserUpdate) AS LastModified
+                       FROM source_tables AS st
+                           OUTER APPLY
+                           (
+                               SELECT MAX(s.last_user_update) AS LastUserUpdate
+                               FROM sys.dm_db_index_usage_stats AS s
+                               WHERE s.database_id = DB_ID()
+                                     AND s.object_id = st.ObjectId
+                           ) AS u
+                   ) AS m
+                       CROSS JOIN
+                       (
+                           SELECT (SELECT COUNT(*) FROM names WHERE ObjectId IS NULL)
+                                  + (SELECT COUNT(*)
+                                     FROM sys.sql_expression_dependencies AS d
+                                     WHERE d.referencing_id IN (SELECT ObjectId FROM objects)
+                                           AND d.referenced_id IS NULL) AS Unresolved
+                       ) AS r"""
+        result = self.read_sql(
+            query=query,
+            variables=["@tables_py"],
+            values=[list(tables)],
+            replace_method=["values"],
+            bind_parameters=True,
+            use_cache=False,
+        )
+
+        unresolved, table_count, modified, last_modified = result.iloc[0]
+        if unresolved or table_count == 0 or modified < table_count:
+            return None
+        return pd.Timestamp(last_modified).isoformat()
+
+    @staticmethod
+    def __arrow_schema(description: tuple):
+        """One pyarrow schema for all chunks of a result set, from the column types in the cursor description.
+
+        Inferring the types of every chunk instead would give e.g. a null column for a chunk where the column is all
+        NULL, or a different decimal precision per chunk. Columns of other Python types are read as strings.
+        """
+        import pyarrow as pa
+
+        arrow_types = {
+            str: pa.string(),
+            int: pa.int64(),
+            float: pa.float64(),
+            bool: pa.bool_(),
+            bytes: pa.binary(),
+            bytearray: pa.binary(),
+            datetime: pa.timestamp("us"),
+            date: pa.date32(),
+            time: pa.time64("us"),
+        }
+        fields = []
+        for column in description:
+            name, type_code, precision, scale = column[0], column[1], column[4], column[5]
+            if type_code is decimal.Decimal:
+                arrow_type = pa.decimal128(min(precision or 38, 38), scale or 0)
+            else:
+                arrow_type = arrow_types.get(type_code, pa.string())
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+
+    @staticmethod
+    def __rows_to_frame(data_rows: list, column_names: list, schema=None) -> pd.DataFrame:
+        """Convert fetched rows to a data frame, with typed pyarrow columns if a schema is given."""
+        if schema is not None:
+            import pyarrow as pa
+
+            arrays = []
+            for column, field in zip(zip(*data_rows, strict=True), schema, strict=True):
+                if field.type == pa.string():
+                    column = [value if value is None or isinstance(value, str) else str(value) for value in column]
+                arrays.append(pa.array(column, type=field.type))
+            table = pa.Table.from_arrays(arrays, schema=schema)
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+        return pd.DataFrame.from_records([tuple(row) for row in data_rows], columns=column_names)
+
+    def __prepare_query(
+        self,
+        query: str = None,
+        path: str = None,
+        variables: list = None,
+        values: list = None,
+        stored_procedure: bool = False,
+        debug: bool = False,
+        bind_parameters: bool = False,
+        replace_method: list = None,
+    ) -> tuple[str, list]:
+        """Load the query and insert the user-defined variables, see read_sql for the arguments.
+
+        Returns
+        -------
+            tuple[str, list]: The query and the parameters to bind, which is empty unless bind_parameters is True.
+        """
         # Note that query overrides path
         if query is None:
             if path is not None:
@@ -198,37 +670,34 @@ class Database:
                 raise ValueError("Insert either a query or a file path")
 
         # Inserting user-defined variables in the SQL query if any
+        parameters = []
         if variables is not None:
             if len(variables) != len(values):
                 raise ValueError(
                     "Then length of the values must be equal to the length of the variables."
                 )
 
-            if "replace_method" in kwargs:
-                replace_method_list = kwargs.get("replace_method")
+            if replace_method is not None:
+                replace_method_list = replace_method
                 if len(replace_method_list) != len(variables):
                     raise ValueError(
                         "The length of the replace methods (replace_method) must be equal to the the length of the variables."  # noqa: E501
                     )
-                for i in range(0, len(variables)):
-                    if replace_method_list[i] == "default":
-                        query = query.replace(variables[i], "'" + values[i] + "'")
-                    elif replace_method_list[i] == "in":
-                        try:
-                            query = query.replace(variables[i], "'" + "', '".join(values[i]) + "'")
-                        except TypeError:
-                            query = query.replace(
-                                variables[i], "'" + "', '".join(str(num) for num in values[i]) + "'"
-                            )
-                    elif replace_method_list[i] == "raw":
-                        query = query.replace(variables[i], values[i])
-                    else:
-                        raise ValueError(
-                            f"The replace method: {replace_method_list[i]} is not defined."
-                        )
+                for method in replace_method_list:
+                    if method not in ["default", "in", "values", "raw"]:
+                        raise ValueError(f"The replace method: {method} is not defined.")
+            else:
+                replace_method_list = ["default"] * len(variables)
+
+            if bind_parameters:
+                bound_query, parameters = self.__bind_variables(query, variables, values, replace_method_list)
+                if len(parameters) > MAX_PARAMETERS:
+                    parameters = []
+                    query = self.__substitute_variables(query, variables, values, replace_method_list)
+                else:
+                    query = bound_query
             else:
-                for i in range(0, len(variables)):
-                    query = query.replace(variables[i], "'" + values[i] + "'")
+                query = self.__substitute_variables(query, variables, values, replace_method_list)
 
         # Check if stored procedure
         if stored_procedure:
@@ -237,80 +706,96 @@ class Database:
 
         if debug:
             print(query)
-        # Get a raw connection to the database via pyodbc
-        connection = self.engine.raw_connection()
-        cursor = connection.cursor()
-
-        # Execute the query
-        cursor.execute(query)
-
-        # Find the table of interest
-        if "Tables" in kwargs:
-            NoOfTables = kwargs.get("Tables")
-            if NoOfTables < 1:
-                raise ValueError("The Number of tables needs to be a positive integer.")
-
-            Result = {}
-            TableCounter = 1
-            BreakCounter = 0
-            while TableCounter <= NoOfTables:
-                if not BreakCounter < 100:
-                    raise TimeoutError(
-                        f"The current limit of {BreakCounter} was reached, thus the process is terminated!"  # noqa: E501
-                    )
-                BreakCounter += 1
-
-                if debug:
-                    print(cursor.description)
-                    print(f"Table: {TableCounter}, Break: {BreakCounter}, NoOfTables: {NoOfTables}")
-
-                # Fetch the all the column names and rows
+            if parameters:
+                print(parameters)
+
+        return query, parameters
+
+    @staticmethod
+    def __substitute_variables(query: str, variables: list, values: list, replace_method_list: list) -> str:
+        """Substitute the user-defined variables directly into the query text."""
+        for i in range(0, len(variables)):
+            if replace_method_list[i] == "default":
+                query = query.replace(variables[i], "'" + values[i] + "'")
+            elif replace_method_list[i] == "in":
                 try:
-                    column_names = [col[0] for col in cursor.description]
-                    data_rows = cursor.fetchall()
-                    DataLocated = True
+                    query = query.replace(variables[i], "'" + "', '".join(values[i]) + "'")
                 except TypeError:
-                    DataLocated = False
-
-                if DataLocated:
-                    # Convert the data to a pandas data frame
-                    temp_data = pd.DataFrame(data=(tuple(row) for row in data_rows))
-                    temp_data.rename(
-                        columns=dict(zip(temp_data.columns, column_names, strict=False)),
-                        inplace=True,
+                    query = query.replace(
+                        variables[i], "'" + "', '".join(str(num) for num in values[i]) + "'"
                     )
+            elif replace_method_list[i] == "values":
+                query = query.replace(
+                    variables[i],
+                    "(" + "), (".join(", ".join(f"'{value}'" for value in _row(item)) for item in values[i]) + ")",
+                )
+            elif replace_method_list[i] == "raw":
+                query = query.replace(variables[i], values[i])
 
-                    Result.update({"Table_" + str(TableCounter): temp_data})
+        return query
 
-                    TableCounter += 1
+    @staticmethod
+    def __bind_variables(
+        query: str, variables: list, values: list, replace_method_list: list
+    ) -> tuple[str, list]:
+        """Replace the user-defined variables with parameter markers and collect the parameters in marker order.
 
-                cursor.nextset()
+        'raw' variables are substituted into the text first. A variable may occur several times in the query, each
+        occurrence gets its own marker. 'in' lists are padded within the MAX_PARAMETERS budget left by the others.
+        """
+        bound = {}
+        padded = []
+        for variable, value, replace_method in zip(variables, values, replace_method_list, strict=True):
+            if replace_method == "raw":
+                query = query.replace(variable, value)
+                continue
+
+            if replace_method == "default":
+                bound[variable] = ("?", [value])
+            else:
+                value_list = [value] if isinstance(value, str) else list(value)
+                if not value_list:
+                    raise ValueError(f"The list of values for {variable} cannot be empty.")
+                if replace_method == "in":
+                    bound[variable] = (", ".join("?" * len(value_list)), value_list)
+                    padded.append(variable)
+                else:
+                    rows = [_row(item) for item in value_list]
+                    bound[variable] = (", ".join("(" + ", ".join("?" * len(row)) + ")" for row in rows),
+                                       [value for row in rows for value in row])
+
+        if not bound:
+            return query, []
+
+        # Longest names first, so a variable is never matched as the prefix of another
+        pattern = re.compile(
+            "|".join(re.escape(variable) for variable in sorted(bound, key=len, reverse=True)) + r"(?!\w)"
+        )
 
-            # Close the connection
-            connection.close()
-        else:
-            if statement_number > 0:
-                tableCounter = 1
-                while tableCounter <= statement_number:
-                    cursor.nextset()
-                    if debug:
-                        print(cursor.description)
-                    tableCounter += 1
+        # Pad the 'in' lists to the next power of two, IN is unaffected by repeated values. Every occurrence of a
+        # variable takes its parameters again, so the padding is capped at the budget left after all occurrences.
+        occurrences = collections.Counter(pattern.findall(query))
+        budget = MAX_PARAMETERS - sum(len(value_list) * occurrences[variable]
+                                      for variable, (_, value_list) in bound.items())
+        for variable in padded:
+            value_list = bound[variable][1]
+            size = 1 << (len(value_list) - 1).bit_length()
+            if occurrences[variable]:
+                extra = max(min(size - len(value_list), budget // occurrences[variable]), 0)
+                value_list += [value_list[-1]] * extra
+                budget -= extra * occurrences[variable]
+                bound[variable] = (", ".join("?" * len(value_list)), value_list)
 
-            # Fetch the all the column names and rows
-            column_names = [col[0] for col in cursor.description]
-            data_rows = cursor.fetchall()
+        parameters = []
 
-            # Close the connection
-            connection.close()
+        def replace(match):
+            markers, value_list = bound[match.group(0)]
+            parameters.extend(value_list)
+            return markers
 
-            # Convert the data to a pandas data frame
-            Result = pd.DataFrame(data=(tuple(row) for row in data_rows))
-            Result.rename(
-                columns=dict(zip(Result.columns, column_names, strict=False)), inplace=True
-            )
+        query = pattern.sub(replace, query)
 
-        return Result
+        return query, parameters
 
     def insert_sql(
         self,
@@ -362,6 +847,7 @@ class Database:
         except Exception as e:
             raise Exception(f"An unexpected error occurred: {e}")
 
+    @traced("execute_sql", category="query")
     def execute_sql(
         self,
         statement: str = None,
@@ -398,42 +884,40 @@ class Database:
             Any exceptions that may occur during the execution of the SQL statement.
 
         """  # noqa: E501
+        current_span().set(database=self.DATABASE)
+
         # Connect to engine
         connection = self.engine.raw_connection()
 
-        # Get cursor
-        cursor = connection.cursor()
-
-        # Execute statement
-        cursor.execute(statement)
-        if read:
-            if statement_number > 0:
-                tableCounter = 1
-                while tableCounter <= statement_number:
-                    cursor.nextset()
-                    if debug:
-                        print(cursor.description)
-                    tableCounter += 1
-
-            # Fetch the all the column names and rows
-            column_names = [col[0] for col in cursor.description]
-            data_rows = cursor.fetchall()
+        try:
+            # Get cursor
+            cursor = connection.cursor()
+
+            # Execute statement
+            cursor.execute(statement)
+            if read:
+                if statement_number > 0:
+                    tableCounter = 1
+                    while tableCounter <= statement_number:
+                        cursor.nextset()
+                        if debug:
+                            print(cursor.description)
+                        tableCounter += 1
 
-            # Convert the data to a pandas data frame
-            result_data = pd.DataFrame(data=(tuple(row) for row in data_rows))
-            result_data.rename(
-                columns=dict(zip(result_data.columns, column_names, strict=False)), inplace=True
-            )
+                # Fetch the all the column names and rows
+                column_names = [col[0] for col in cursor.description]
+                data_rows = cursor.fetchall()
 
-        cursor.commit()
+                # Convert the data to a pandas data frame
+                result_data = pd.DataFrame(data=(tuple(row) for row in data_rows))
+                result_data.rename(
+                    columns=dict(zip(result_data.columns, column_names, strict=False)), inplace=True
+                )
 
-        # Close the connection
-        connection.close()
+            cursor.commit()
+        finally:
+            # Return the connection to the pool, also when the statement fails
+            connection.close()
 
         if read:
             return result_data
-
-    def __del__(self):
-        """Destructor for the Database class."""
-        self.engine.dispose()
-        del self.engine
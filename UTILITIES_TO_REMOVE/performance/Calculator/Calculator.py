@@ -144,3 +144,63 @@ def InteractionEffect(
         return (portfolioGroupWeight - benchmarkGroupWeight) * (
             portfolioGroupTotalReturn - benchmarkGroupTotalReturn
         )
+
+
+# Vectorized Brinson. Same edge cases as the scalar functions above, applied element-wise to arrays or Series.
+def AllocationEffectVectorized(
+    portfolioGroupWeight,
+    benchmarkGroupWeight,
+    benchmarkTotalReturn,
+    benchmarkGroupTotalReturn,
+    portfolioGroupTotalReturn,
+) -> np.ndarray:
+    portfolioGroupWeight = np.asarray(portfolioGroupWeight, dtype=float)
+    benchmarkGroupWeight = np.asarray(benchmarkGroupWeight, dtype=float)
+    benchmarkTotalReturn = np.asarray(benchmarkTotalReturn, dtype=float)
+    benchmarkGroupTotalReturn = np.asarray(benchmarkGroupTotalReturn, dtype=float)
+    portfolioGroupTotalReturn = np.asarray(portfolioGroupTotalReturn, dtype=float)
+
+    BenchmarkWeightless = benchmarkGroupWeight == 0
+    Weightless = BenchmarkWeightless & (portfolioGroupWeight == 0)
+    ActiveWeight = portfolioGroupWeight - benchmarkGroupWeight
+
+    return np.where(
+        Weightless,
+        portfolioGroupTotalReturn - benchmarkGroupTotalReturn,
+        np.where(
+            BenchmarkWeightless,
+            ActiveWeight * (portfolioGroupTotalReturn - benchmarkTotalReturn),
+            ActiveWeight * (benchmarkGroupTotalReturn - benchmarkTotalReturn),
+        ),
+    )
+
+
+def SelectionEffectVectorized(
+    portfolioGroupWeight, benchmarkGroupWeight, benchmarkGroupTotalReturn, portfolioGroupTotalReturn
+) -> np.ndarray:
+    portfolioGroupWeight = np.asarray(portfolioGroupWeight, dtype=float)
+    benchmarkGroupWeight = np.asarray(benchmarkGroupWeight, dtype=float)
+    benchmarkGroupTotalReturn = np.asarray(benchmarkGroupTotalReturn, dtype=float)
+    portfolioGroupTotalReturn = np.asarray(portfolioGroupTotalReturn, dtype=float)
+
+    Weightless = (benchmarkGroupWeight == 0) | (portfolioGroupWeight == 0)
+    return np.where(
+        Weightless, 0.0, benchmarkGroupWeight * (portfolioGroupTotalReturn - benchmarkGroupTotalReturn)
+    )
+
+
+def InteractionEffectVectorized(
+    portfolioGroupWeight, benchmarkGroupWeight, benchmarkGroupTotalReturn, portfolioGroupTotalReturn
+) -> np.ndarray:
+    portfolioGroupWeight = np.asarray(portfolioGroupWeight, dtype=float)
+    benchmarkGroupWeight = np.asarray(benchmarkGroupWeight, dtype=float)
+    benchmarkGroupTotalReturn = np.asarray(benchmarkGroupTotalReturn, dtype=float)
+    portfolioGroupTotalReturn = np.asarray(portfolioGroupTotalReturn, dtype=float)
+
+    Weightless = (benchmarkGroupWeight == 0) | (portfolioGroupWeight == 0)
+    return np.where(
+        Weightless,
+        0.0,
+        (portfolioGroupWeight - benchmarkGroupWeight)
+        * (portfolioGroupTotalReturn - benchmarkGroupTotalReturn),
+    )
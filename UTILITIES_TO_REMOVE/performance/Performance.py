@@ -35,6 +35,7 @@ from UTILITIES_TO_REMOVE.performance.Utilities.Beautification import (
     ExpandBrinsonTable,
     OverrideIRSReturns,
 )
+from UTILITIES_TO_REMOVE.performance.Utilities.Caching import MemoizeResult, ResultCache
 from UTILITIES_TO_REMOVE.performance.Utilities.Timing import PerformanceTracker
 from UTILITIES_TO_REMOVE.performance.Utilities.Utilities import GenerateFrequency
 
@@ -57,7 +58,8 @@ class Performance:
         PerformanceData (pd.DataFrame): Data containing portfolio and benchmark performance information.
         FromDate (datetime): The start date for the performance data.
         ToDate (datetime): The end date for the performance data.
-        __UseCaching (bool): Flag to indicate whether to use caching for performance data.
+        ResultCache (ResultCache): Memoized results of DailyReturn, DailyBrinson and the prepared performance data.
+        __UseCaching (bool): Flag to indicate whether to use caching for performance data and results.
         __CachedData (pd.DataFrame): Cached copy of performance data for faster computations.
 
     Examples
@@ -105,6 +107,11 @@ class Performance:
         # Cached Data
         self.__UseCaching = True
         self.__CachedData = self.PerformanceData.copy(deep=True)
+        self.ResultCache = ResultCache()
+
+    @property
+    def UseCaching(self) -> bool:
+        return self.__UseCaching
 
     # Private Functions
 
@@ -397,6 +404,7 @@ class Performance:
         return PeriodReturns
 
     @PerformanceTracker(debug=DEBUG_MODE)
+    @MemoizeResult()
     def __Core_DailyBrinson(self, **kwargs):
         PerformanceInputs = self.__createPerformanceInputObject(**kwargs)
 
@@ -417,21 +425,25 @@ class Performance:
         BenchmarkTotalReturn = PerformanceInputs.PerformanceColumns.BenchmarkTotalReturn
 
         # Calculate Attribution Effects
-        BrinsonData[Allocation] = BrinsonData[
-            [
-                PortfolioWeight,
-                BenchmarkWeight,
-                BenchmarkTotalTotalReturn,
-                BenchmarkTotalReturn,
-                PortfolioTotalReturn,
-            ]
-        ].apply(lambda x: Calculator.AllocationEffect(*x), axis=1)
-        BrinsonData[Selection] = BrinsonData[
-            [PortfolioWeight, BenchmarkWeight, BenchmarkTotalReturn, PortfolioTotalReturn]
-        ].apply(lambda x: Calculator.SelectionEffect(*x), axis=1)
-        BrinsonData[Interaction] = BrinsonData[
-            [PortfolioWeight, BenchmarkWeight, BenchmarkTotalReturn, PortfolioTotalReturn]
-        ].apply(lambda x: Calculator.InteractionEffect(*x), axis=1)
+        BrinsonData[Allocation] = Calculator.AllocationEffectVectorized(
+            BrinsonData[PortfolioWeight],
+            BrinsonData[BenchmarkWeight],
+            BrinsonData[BenchmarkTotalTotalReturn],
+            BrinsonData[BenchmarkTotalReturn],
+            BrinsonData[PortfolioTotalReturn],
+        )
+        BrinsonData[Selection] = Calculator.SelectionEffectVectorized(
+            BrinsonData[PortfolioWeight],
+            BrinsonData[BenchmarkWeight],
+            BrinsonData[BenchmarkTotalReturn],
+            BrinsonData[PortfolioTotalReturn],
+        )
+        BrinsonData[Interaction] = Calculator.InteractionEffectVectorized(
+            BrinsonData[PortfolioWeight],
+            BrinsonData[BenchmarkWeight],
+            BrinsonData[BenchmarkTotalReturn],
+            BrinsonData[PortfolioTotalReturn],
+        )
 
         BrinsonData[SelectionWithInteraction] = BrinsonData[Selection] + BrinsonData[Interaction]
         BrinsonData[TotalEffect] = BrinsonData[Allocation] + BrinsonData[SelectionWithInteraction]
@@ -491,17 +503,6 @@ class Performance:
 
         GroupByList = [PortfolioTotalFrequencyGroup] + [PerformanceInputs.Group_List[-1]]
 
-        SimpleMeanList = [PortfolioWeight, BenchmarkWeight]
-        ForwardLookingCompoundingDict = {
-            "Portfolio": {
-                "Contribution": PortfolioContribution,
-                "InverseReturn": PortfolioTotalInverseCumulativeTotalReturn,
-            },
-            "Benchmark": {
-                "Contribution": BenchmarkContribution,
-                "InverseReturn": BenchmarkTotalInverseCumulativeTotalReturn,
-            },
-        }
         ResidualFreePortfolioCumulativeList = [
             Allocation,
             Selection,
@@ -509,64 +510,98 @@ class Performance:
             SelectionWithInteraction,
             TotalEffect,
         ]
-        CumulativeCompoundingList = [PortfolioTotalReturn, BenchmarkTotalReturn]
 
-        PeriodBrinson = pd.DataFrame()
+        # Linking factors, shifted within each group for summable periods
+        PortfolioInverseReturn = DailyBrinson[PortfolioTotalInverseCumulativeTotalReturn]
+        BenchmarkInverseReturn = DailyBrinson[BenchmarkTotalInverseCumulativeTotalReturn]
+        PortfolioCumulativeReturn = DailyBrinson[PortfolioTotalCumulativeTotalReturn]
+        if Summable:
+            Grouped = DailyBrinson.groupby(by=GroupByList)
+            PortfolioInverseReturn = Grouped[PortfolioTotalInverseCumulativeTotalReturn].shift(
+                periods=-1, fill_value=0
+            )
+            BenchmarkInverseReturn = Grouped[BenchmarkTotalInverseCumulativeTotalReturn].shift(
+                periods=-1, fill_value=0
+            )
+            PortfolioCumulativeReturn = Grouped[PortfolioTotalCumulativeTotalReturn].shift(
+                periods=1, fill_value=0
+            )
+        ResidualFreeFactor = BenchmarkInverseReturn.add(1) * PortfolioCumulativeReturn.add(1)
+
+        # Precompute the daily terms, so that every period figure is a single sum or product per group:
+        # - Weights: simple mean over the number of days in the period
+        # - Contributions: forward looking compounding linked to the total return
+        # - Total returns: cumulative compounding
+        # - Effects: residual free portfolio cumulative compounding (GRAP/Frongello)
         NoOfDaysInPeriod = DailyBrinson.groupby(GroupByList[0])["FromDate"].nunique()
-        DailyBrinson["NoOfDaysInPeriod"] = DailyBrinson[GroupByList[0]].map(NoOfDaysInPeriod)
+        PeriodTerms = pd.DataFrame(
+            {
+                **{col: DailyBrinson[col] for col in GroupByList},
+                "NoOfDaysInPeriod": DailyBrinson[GroupByList[0]].map(NoOfDaysInPeriod),
+                PortfolioWeight: DailyBrinson[PortfolioWeight],
+                BenchmarkWeight: DailyBrinson[BenchmarkWeight],
+                PortfolioContribution: DailyBrinson[PortfolioContribution]
+                * PortfolioInverseReturn.add(1),
+                BenchmarkContribution: DailyBrinson[BenchmarkContribution]
+                * BenchmarkInverseReturn.add(1),
+                PortfolioTotalReturn: DailyBrinson[PortfolioTotalReturn].add(1),
+                BenchmarkTotalReturn: DailyBrinson[BenchmarkTotalReturn].add(1),
+                **{
+                    col: DailyBrinson[col] * ResidualFreeFactor
+                    for col in ResidualFreePortfolioCumulativeList
+                },
+            }
+        )
 
-        for col in SimpleMeanList:
-            temp = (
-                DailyBrinson.groupby(by=GroupByList)
-                .apply(Calculator.Mean, Column=col, MeanDenominatorColumn="NoOfDaysInPeriod")
-                .reset_index(drop=False)
+        SumList = [
+            PortfolioWeight,
+            BenchmarkWeight,
+            PortfolioContribution,
+            BenchmarkContribution,
+        ] + ResidualFreePortfolioCumulativeList
+        ProductList = [PortfolioTotalReturn, BenchmarkTotalReturn]
+
+        PeriodBrinson = (
+            PeriodTerms.groupby(by=GroupByList)
+            .agg(
+                **{"NoOfDaysInPeriod": ("NoOfDaysInPeriod", "first")},
+                **{col: (col, "sum") for col in SumList},
+                **{col: (col, "prod") for col in ProductList},
             )
-            if PeriodBrinson.empty:
-                PeriodBrinson = temp.copy(deep=True)
-            else:
-                PeriodBrinson = pd.merge(left=PeriodBrinson, right=temp, how="left", on=GroupByList)
+            .reset_index(drop=False)
+        )
+
+        for col in [PortfolioWeight, BenchmarkWeight]:
+            PeriodBrinson[col] = PeriodBrinson[col] / PeriodBrinson["NoOfDaysInPeriod"].astype(float)
+        for col in ProductList:
+            PeriodBrinson[col] = PeriodBrinson[col] - 1
 
         PeriodBrinson[ActiveWeight] = (
             PeriodBrinson[PortfolioWeight] - PeriodBrinson[BenchmarkWeight]
         )
-
-        for key, item in ForwardLookingCompoundingDict.items():
-            temp = Calculator.ForwardLookingCompounding(
-                Dataframe=DailyBrinson,
-                EffectColumn=item.get("Contribution"),
-                InverseReturnColumn=item.get("InverseReturn"),
-                Shift=Summable,
-                Group=GroupByList,
-            ).reset_index(drop=False)
-
-            PeriodBrinson = pd.merge(left=PeriodBrinson, right=temp, how="left", on=GroupByList)
-
-        for col in CumulativeCompoundingList:
-            temp = Calculator.CumulativeCompounding(
-                Dataframe=DailyBrinson, ReturnColumn=col, Group=GroupByList
-            ).reset_index(drop=False)
-
-            PeriodBrinson = pd.merge(left=PeriodBrinson, right=temp, how="left", on=GroupByList)
-
         PeriodBrinson[Outperformance] = (
             PeriodBrinson[PortfolioTotalReturn] - PeriodBrinson[BenchmarkTotalReturn]
         )
 
-        for col in ResidualFreePortfolioCumulativeList:
-            temp = Calculator.ResidualFreePortfolioCumulativeCompounding(
-                Dataframe=DailyBrinson,
-                EffectColumn=col,
-                BenchmarkTotalInverseCumulativeTotalReturn=BenchmarkTotalInverseCumulativeTotalReturn,
-                PortfolioTotalCumulativeTotalReturn=PortfolioTotalCumulativeTotalReturn,
-                Shift=Summable,
-                Group=GroupByList,
-            ).reset_index(drop=False)
-
-            PeriodBrinson = pd.merge(left=PeriodBrinson, right=temp, how="left", on=GroupByList)
+        PeriodBrinson = PeriodBrinson[
+            GroupByList
+            + [
+                PortfolioWeight,
+                BenchmarkWeight,
+                ActiveWeight,
+                PortfolioContribution,
+                BenchmarkContribution,
+                PortfolioTotalReturn,
+                BenchmarkTotalReturn,
+                Outperformance,
+            ]
+            + ResidualFreePortfolioCumulativeList
+        ]
 
         return PeriodBrinson
 
     @PerformanceTracker(debug=DEBUG_MODE)
+    @MemoizeResult(RegisterData=True)
     def __PreparePerformanceData(self, **kwargs):
         PerformanceData = PreparePerformanceData(
             PerformanceDataSettings=self.PerformanceSettings,
@@ -691,11 +726,20 @@ class Performance:
     # Public Functions
     @PerformanceTracker(debug=DEBUG_MODE)
     def SetCaching(self, Caching: bool = True):
+        """
+        Enable or disable caching of the prepared performance data and memoization of results. Disabling resets the
+        cached data and clears the memoized results.
+
+        Args:
+            Caching (bool): Whether to use caching.
+        """
         self.__UseCaching = Caching
         if not self.__UseCaching:
-            self.__UseCaching = self.PerformanceData.copy(deep=True)
+            self.__CachedData = self.PerformanceData.copy(deep=True)
+            self.ResultCache.Clear()
 
     @PerformanceTracker(debug=DEBUG_MODE)
+    @MemoizeResult()
     def DailyReturn(self, **kwargs):
         """
         Calculate daily return data for the portfolio.
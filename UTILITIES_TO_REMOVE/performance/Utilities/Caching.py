@@ -0,0 +1,124 @@
+"""
+========================================================================================================================================================================
+-- Description:	Memoization of Performance results, e.g. DailyReturn and DailyBrinson, so reports calling several generators against the same
+                Performance object only compute each distinct result once.
+========================================================================================================================================================================
+"""
+
+import functools
+import weakref
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+class ResultCache:
+    """
+    Results of Performance methods keyed by the method name and its keyword arguments (group, dates, frequency,
+    Local/include/exclude settings etc.). Results are copied on both write and read, so callers may modify them.
+
+    A PerformanceData argument is only part of a key if the frame was registered with RegisterData, i.e. it was
+    returned by a memoized method. Calls with any other PerformanceData frame are not memoized.
+
+    Attributes
+    ----------
+        Hits (int): Number of results served from the cache.
+        Misses (int): Number of results calculated and stored.
+    """
+
+    def __init__(self):
+        self.Hits = 0
+        self.Misses = 0
+
+        self.__Results = {}
+        self.__DataKeys = weakref.WeakValueDictionary()
+        self.__DataKeyLookup = {}
+
+    def Key(self, Method: str, **kwargs) -> tuple | None:
+        """Return the key of the call, or None if it cannot be memoized."""
+        DataKey = None
+        if "PerformanceData" in kwargs:
+            PerformanceData = kwargs.pop("PerformanceData")
+            if self.__DataKeys.get(id(PerformanceData)) is not PerformanceData:
+                return None
+            DataKey = self.__DataKeyLookup.get(id(PerformanceData))
+
+        try:
+            Key = (Method, DataKey, _Freeze(kwargs))
+            hash(Key)
+        except TypeError:
+            return None
+
+        return Key
+
+    def Get(self, Key: tuple) -> pd.DataFrame | None:
+        Result = self.__Results.get(Key)
+        if Result is None:
+            return None
+
+        self.Hits += 1
+        return Result.copy(deep=True)
+
+    def Set(self, Key: tuple, Result: pd.DataFrame) -> None:
+        self.Misses += 1
+        self.__Results[Key] = Result.copy(deep=True)
+
+    def RegisterData(self, PerformanceData: pd.DataFrame, Key: tuple) -> None:
+        """Mark a returned PerformanceData frame as the result of Key, so later calls taking it can be memoized."""
+        DataId = id(PerformanceData)
+        self.__DataKeys[DataId] = PerformanceData
+        self.__DataKeyLookup[DataId] = Key
+        weakref.finalize(PerformanceData, self.__DataKeyLookup.pop, DataId, None)
+
+    def Clear(self) -> None:
+        self.__Results.clear()
+        self.__DataKeys.clear()
+        self.__DataKeyLookup.clear()
+
+
+def _Freeze(Value):
+    # Hashable representation of (nested) keyword arguments
+    if isinstance(Value, dict):
+        return tuple(sorted((Key, _Freeze(Item)) for Key, Item in Value.items()))
+    if isinstance(Value, (list, tuple)):
+        return tuple(_Freeze(Item) for Item in Value)
+    if isinstance(Value, set):
+        return tuple(sorted(_Freeze(Item) for Item in Value))
+    if isinstance(Value, (pd.DataFrame, pd.Series, np.ndarray)):
+        raise TypeError("Data arguments cannot be part of a cache key.")
+    if isinstance(Value, date):
+        return pd.Timestamp(Value)
+    return Value
+
+
+def MemoizeResult(RegisterData: bool = False):
+    """
+    Decorator memoizing a Performance method on the instance's ResultCache, as long as caching is enabled.
+
+    Args:
+        RegisterData (bool): Register the returned frame, so it can be passed on as PerformanceData to other
+            memoized methods.
+    """
+
+    def MemoizeResultInner(func):
+        @functools.wraps(func)
+        def MemoizedFunction(self, **kwargs):
+            Cache = self.ResultCache
+            Key = Cache.Key(Method=func.__name__, **kwargs) if self.UseCaching else None
+            if Key is None:
+                return func(self, **kwargs)
+
+            Result = Cache.Get(Key)
+            if Result is None:
+                Result = func(self, **kwargs)
+                Cache.Set(Key, Result)
+
+            if RegisterData:
+                Cache.RegisterData(Result, Key)
+
+            return Result
+
+        return MemoizedFunction
+
+    return MemoizeResultInner
@@ -6,21 +6,39 @@
 ========================================================================================================================================================================
 """
 
+import functools
 import time
 
+from utils.tracing import count_rows, get_tracer
+
 
 def PerformanceTracker(debug: bool = False):
+    """
+    Times each call of the function. While a tracer is active (see utils.tracing) the call is recorded
+    as a span, with the rows of a returned DataFrame. With debug the time is also printed.
+    """
     def PerformanceTrackerInner(func):
+        @functools.wraps(func)
         def TimingFunction(*args, **kwargs):
-            if debug:
+            Tracer = get_tracer()
+            if Tracer is not None:
+                with Tracer.span(func.__qualname__, category="performance") as Span:
+                    Time_Start = time.time()
+                    Result = func(*args, **kwargs)
+                    Time_End = time.time()
+                    Rows = count_rows(Result)
+                    if Rows is not None:
+                        Span.set(rows=Rows)
+            elif debug:
                 Time_Start = time.time()
                 Result = func(*args, **kwargs)
                 Time_End = time.time()
+            else:
+                return func(*args, **kwargs)
+
+            if debug:
                 totalTime = int((Time_End - Time_Start) * 1000)
-                # TODO: Implement Log Function and PerformanceTracker
                 print("%r  %2.2f ms" % (func.__name__, totalTime))
-            else:
-                Result = func(*args, **kwargs)
             return Result
 
         return TimingFunction
@@ -0,0 +1,51 @@
+"""Repeated-call latency of Database.read_sql with substituted versus bound parameters.
+
+    python -m benchmarks.bind_parameters
+
+Requires access to C4DW.
+"""
+
+import time
+
+from reports.credit_beta.utils.SQL import get_credit_betas
+from UTILITIES_TO_REMOVE.database import Database
+from UTILITIES_TO_REMOVE.Paths import getPathFromMainRoot
+
+REPORT_DATES = ["2024-08-30", "2024-09-30", "2024-10-31", "2024-11-29"]
+
+
+def main():
+    db = Database(database="C4DW")
+    risk_path = getPathFromMainRoot("UTILITIES_TO_REMOVE", "RiskData", "SQL", "get_risk_basic.sql")
+
+    for bind in [False, True]:
+        timings = []
+        for report_date in REPORT_DATES:
+            start = time.perf_counter()
+            db.read_sql(
+                query=get_credit_betas,
+                variables=["@py_getDate", "@py_fundCode", "@py_betaBenchmark", "@py_betaSeries"],
+                values=[report_date, "CFTRC", "HPC0", "TRI"],
+                statement_number=4,
+                bind_parameters=bind,
+            )
+            timings.append(time.perf_counter() - start)
+        print(f"get_credit_betas, bind_parameters={bind}: {[round(t, 2) for t in timings]} s")
+
+        timings = []
+        for report_date in REPORT_DATES:
+            start = time.perf_counter()
+            db.read_sql(
+                path=risk_path,
+                variables=["@python_date", "@python_portfolio", "@python_all"],
+                values=[[report_date], ["CFTRC"], "NotAll"],
+                replace_method=["values", "in", "default"],
+                stored_procedure=True,
+                bind_parameters=bind,
+            )
+            timings.append(time.perf_counter() - start)
+        print(f"get_risk_basic.sql, bind_parameters={bind}: {[round(t, 2) for t in timings]} s")
+
+
+if __name__ == "__main__":
+    main()
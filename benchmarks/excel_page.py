@@ -0,0 +1,99 @@
+"""Worksheet write benchmarks.
+
+    python -m benchmarks.excel_page
+
+Times the bulk-write path of InsertTableBody against the legacy cell-by-cell path on a position-level sized table, and
+checks that both write the same worksheet. Then measures the peak memory of the default in-memory workbook against
+constant memory mode on a page that only appends rows. Each mode runs in a forked process, so the peak resident set
+sizes (Linux, in kB) do not influence each other.
+"""
+
+import multiprocessing
+import resource
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from utils.excel.ExcelBase import BaseWorkbook
+from utils.excel.ExcelPage import BaseWorkSheet
+
+GENERATOR = np.random.default_rng(seed=1)
+
+
+class BenchmarkSheet(BaseWorkSheet):
+    def AttributeSheet(self, BulkWrite: bool = True):
+        self.InsertTableBody(Dataframe=self.Data, Format={'Weight': 'PCT', 'Price': 'NUMBER'},
+                             Type='UNDERLINE', BulkWrite=BulkWrite)
+
+
+class AppendOnlySheet(BaseWorkSheet):
+    def AttributeSheet(self):
+        for chunk in range(0, len(self.Data), 50000):
+            self.InsertTable(Dataframe=self.Data.iloc[chunk:chunk + 50000], Format={'Weight': 'PCT'},
+                             RowNumber=self.Counters['Row_1'])
+
+
+def bulk_write():
+    rows = 5000
+    data = pd.DataFrame({f'Value_{k}': GENERATOR.normal(size=rows) for k in range(16)})
+    data['Weight'] = GENERATOR.random(size=rows)
+    data['Price'] = np.where(GENERATOR.random(size=rows) < 0.1, np.nan, 100 * GENERATOR.random(size=rows))
+    data['Quantity'] = GENERATOR.integers(0, 10 ** 6, size=rows)
+    data['AssetName'] = [f'Asset {k}' for k in range(rows)]
+    data['Currency'] = np.where(GENERATOR.random(size=rows) < 0.5, 'EUR', None)
+    data['AsOfDate'] = pd.Timestamp('2024-11-29')
+    data['IsHedged'] = GENERATOR.random(size=rows) < 0.5
+
+    sheet_xml = {}
+    for bulk in [False, True]:
+        wb = BaseWorkbook()
+        wb.Add_WorkSheet(SheetName='Benchmark')
+        start = time.perf_counter()
+        BenchmarkSheet(Workbook=wb, SheetName='Benchmark', Data=data).AttributeSheet(BulkWrite=bulk)
+        elapsed = time.perf_counter() - start
+        wb.Close()
+        with zipfile.ZipFile(wb.output) as zf:
+            sheet_xml[bulk] = zf.read('xl/worksheets/sheet1.xml')
+        print(f'BulkWrite={bulk}: {elapsed * 1000:.0f} ms for {data.size} cells')
+
+    print(f'Identical worksheet: {sheet_xml[False] == sheet_xml[True]}')
+
+
+def measure_peak_memory(constant_memory: bool, rows: int, queue):
+    data = pd.DataFrame({f'Value_{k}': GENERATOR.normal(size=rows) for k in range(7)})
+    data['Weight'] = GENERATOR.random(size=rows)
+    data['AssetName'] = [f'Asset {k % 5000}' for k in range(rows)]
+    data['Currency'] = np.where(GENERATOR.random(size=rows) < 0.5, 'EUR', 'USD')
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    wb = BaseWorkbook(ConstantMemory=constant_memory)
+    wb.Add_WorkSheet(SheetName='Exposure')
+    AppendOnlySheet(Workbook=wb, SheetName='Exposure', Data=data).AttributeSheet()
+    wb.Close()
+    queue.put((baseline, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, time.perf_counter() - start,
+               wb.output.getbuffer().nbytes))
+
+
+def constant_memory():
+    context = multiprocessing.get_context('fork')
+    for rows in [100000, 400000]:
+        for constant in [False, True]:
+            queue = context.Queue()
+            process = context.Process(target=measure_peak_memory, args=(constant, rows, queue))
+            process.start()
+            baseline, peak, elapsed, file_size = queue.get()
+            process.join()
+            print(f'ConstantMemory={constant}, {rows * 10} cells: peak RSS {(peak - baseline) / 1024:.0f} MB above '
+                  f'the data, {elapsed:.1f} s, {file_size / 1024 ** 2:.1f} MB workbook')
+
+
+def main():
+    bulk_write()
+    constant_memory()
+
+
+if __name__ == '__main__':
+    main()
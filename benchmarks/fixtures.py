@@ -0,0 +1,185 @@
+"""Recorded data sources.
+
+Records the results of Database.read_sql, Database.execute_sql and CapFourAPI.cfdh to a fixture directory, and
+replays them without a database or network connection. A call is identified by the method, the database (or API base
+URL) and a hash of its arguments, so a replayed report must make the same calls with the same arguments as when it
+was recorded. Reports using date.today() or other time dependent arguments need to be recorded again.
+
+The fixtures are pickled DataFrames and hold production data, keep them out of version control. Only load fixtures
+you recorded yourself, as unpickling runs arbitrary code.
+"""
+
+import functools
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from utils.tracing import count_rows, span
+
+# The recorded methods: module, class and method names. Classes that cannot be imported are skipped.
+RECORDED_METHODS = [
+    ("UTILITIES_TO_REMOVE.database", "Database", "read_sql"),
+    ("UTILITIES_TO_REMOVE.database", "Database", "execute_sql"),
+    ("UTILITIES_TO_REMOVE.c4api.C4API", "CapFourAPI", "cfdh"),
+    ("capfourpy.databases", "Database", "read_sql"),
+]
+
+
+class FixtureMissingError(LookupError):
+    """Raised on replay when a call was not recorded."""
+
+
+def _target(instance) -> str:
+    # The database or API the call goes to
+    for attribute in ("BASEURL", "DATABASE"):
+        value = getattr(instance, attribute, None)
+        if value is not None:
+            return str(value)
+    return type(instance).__name__
+
+
+def _describe(args: tuple, kwargs: dict) -> str:
+    # A short readable form of the call for the index and error messages: the query, path or identifier and the values
+    first = args[0] if args else kwargs.get("path") or next(iter(kwargs.values()), "")
+    description = " ".join(str(first).split())[:120]
+    for name in ("values", "Field", "StartDate", "EndDate"):
+        if kwargs.get(name) is not None:
+            description += f" {name}={kwargs[name]}"
+    return description
+
+
+class FixtureStore:
+    """
+    The recorded calls of one scenario, one pickle per call and an index.json describing them.
+
+    Args:
+        directory (str): The fixture directory of the scenario.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index = {}
+        self.__lock = threading.Lock()
+
+        index_path = os.path.join(self.directory, "index.json")
+        if os.path.isfile(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+
+    @staticmethod
+    def make_key(method: str, target: str, args: tuple, kwargs: dict) -> str:
+        payload = json.dumps({"method": method, "target": target, "args": args, "kwargs": kwargs},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str):
+        try:
+            with open(self.__path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            raise FixtureMissingError(key) from None
+
+    def put(self, key: str, result, method: str, target: str, description: str):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.__path(key), "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.__lock:
+            self.index[key] = {"method": method, "target": target, "call": description, "rows": count_rows(result)}
+
+    def save_index(self):
+        if not self.index:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "index.json"), "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+
+
+def _recording_method(original, method: str, store: FixtureStore):
+    @functools.wraps(original)
+    def recording(self, *args, **kwargs):
+        result = original(self, *args, **kwargs)
+        target = _target(self)
+        store.put(FixtureStore.make_key(method, target, args, kwargs), result, method=method, target=target,
+                  description=_describe(args, kwargs))
+        return result
+
+    return recording
+
+
+def _replaying_method(method: str, store: FixtureStore):
+    def replaying(self, *args, **kwargs):
+        target = _target(self)
+        with span(method, category="fixture", target=target) as s:
+            try:
+                result = store.get(FixtureStore.make_key(method, target, args, kwargs))
+            except FixtureMissingError:
+                raise FixtureMissingError(
+                    f"No fixture for {method} on {target}: {_describe(args, kwargs)}. Record the scenario again."
+                ) from None
+            rows = count_rows(result)
+            if rows is not None:
+                s.set(rows=rows)
+            return result
+
+    return replaying
+
+
+@contextmanager
+def _patched(make_replacement) -> Iterator[None]:
+    patched = []
+    try:
+        for module_name, class_name, method in RECORDED_METHODS:
+            try:
+                cls = getattr(importlib.import_module(module_name), class_name)
+            except (ImportError, AttributeError):
+                continue
+            original = cls.__dict__.get(method)
+            if original is None:
+                continue
+            setattr(cls, method, make_replacement(original, method))
+            patched.append((cls, method, original))
+        yield
+    finally:
+        for cls, method, original in reversed(patched):
+            setattr(cls, method, original)
+
+
+@contextmanager
+def recording(directory: str) -> Iterator[FixtureStore]:
+    """Record the data source calls made within this context to the directory, replacing earlier recordings."""
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".pkl") or name == "index.json":
+                os.remove(os.path.join(directory, name))
+
+    store = FixtureStore(directory)
+    with _patched(lambda original, method: _recording_method(original, method, store)):
+        try:
+            yield store
+        finally:
+            store.save_index()
+
+
+@contextmanager
+def replaying(directory: str) -> Iterator[FixtureStore]:
+    """
+    Serve the data source calls made within this context from the recordings in the directory. No database engine
+    is created, and a call that was not recorded raises FixtureMissingError.
+    """
+    database = importlib.import_module("UTILITIES_TO_REMOVE.database")
+    store = FixtureStore(directory)
+    get_engine = database.get_engine
+    database.get_engine = lambda **kwargs: None
+    try:
+        with _patched(lambda original, method: _replaying_method(method, store)):
+            yield store
+    finally:
+        database.get_engine = get_engine
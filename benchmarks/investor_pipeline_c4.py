@@ -0,0 +1,98 @@
+"""Parity and timing of map_strategy and get_change_in_pipeline of the investor pipeline (C4) report.
+
+    python -m benchmarks.investor_pipeline_c4
+
+Compares the vectorized functions against the previous row-wise implementations on synthetic opportunity histories.
+"""
+
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from reports.investor_pipeline.utils.mappings import strategy_mapping
+from reports.investor_pipeline_c4.datasource import get_change_in_pipeline, map_strategy
+
+
+def map_strategy_rowwise(df: pd.DataFrame) -> pd.Series:
+    return df.apply(lambda row: next((strategy for strategy, funds in strategy_mapping.items()
+                                      if row['StrategyFund'] in funds), "Other"), axis=1)
+
+
+def get_change_in_pipeline_apply(opportunities_df: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    start_date = start_date.strftime("%Y-%m-%d")
+    end_date = end_date.strftime("%Y-%m-%d")
+    filtered_df = opportunities_df[(opportunities_df['AsOfDate'] >= start_date) &
+                                   (opportunities_df['AsOfDate'] <= end_date)]
+    filtered_df = filtered_df.sort_values(['OpportunityId', 'ModifiedTime'])
+    first_last_entries = filtered_df.groupby('OpportunityId').apply(lambda x: x.iloc[[0, -1]]).reset_index(
+        drop=True)
+    keys = first_last_entries.groupby(['AccountName', 'OpportunityId', 'StrategyFund'])
+    first_last_entries['From Probability %'] = keys['Probability'].shift()
+    first_last_entries['From Exp AuM mEUR'] = keys['ExpectedRevenueEUR'].shift()
+    first_last_entries['Probability Change %'] = first_last_entries['Probability'] - first_last_entries[
+        'From Probability %']
+    filtered_pipeline = first_last_entries.dropna(subset=['Probability Change %'])
+    filtered_pipeline = filtered_pipeline[(filtered_pipeline['Probability Change %'] != 0) &
+                                          (filtered_pipeline['ExpectedRevenueEUR'] >= 10) &
+                                          (filtered_pipeline['Probability'] > 0)]
+    change_in_key_pipeline = filtered_pipeline[['AccountName', 'StrategyFund', 'From Exp AuM mEUR',
+                                                'ExpectedRevenueEUR', 'From Probability %', 'Probability',
+                                                'Probability Change %']]
+    change_in_key_pipeline = change_in_key_pipeline.sort_values('ExpectedRevenueEUR', ascending=False)
+    change_in_key_pipeline = change_in_key_pipeline.rename(columns={'Probability': 'To Probability %',
+                                                                    'AccountName': 'Account Name',
+                                                                    'StrategyFund': 'Strategy Fund',
+                                                                    'ExpectedRevenueEUR': 'To Exp AuM mEUR'})
+    change_in_key_pipeline[change_in_key_pipeline.select_dtypes(include='float').columns] = \
+        change_in_key_pipeline.select_dtypes(include='float').round().astype(int)
+    return change_in_key_pipeline
+
+
+def main():
+    generator = np.random.default_rng(seed=1)
+    all_funds = [fund for funds in strategy_mapping.values() for fund in funds] + ["Unmapped fund", None]
+    report_date = date(2024, 12, 9)
+
+    for opportunities_count, changes in [(500, 10), (5000, 20)]:
+        rows = opportunities_count * changes
+        opportunity_ids = generator.integers(0, opportunities_count, size=rows)
+        modified_time = pd.Timestamp(2022, 1, 1) + pd.to_timedelta(generator.integers(0, 3 * 365 * 24, size=rows),
+                                                                    unit='h')
+        history = pd.DataFrame({
+            'OpportunityId': [f'Opportunity {k}' for k in opportunity_ids],
+            # A few opportunities move to another account or fund during their history
+            'AccountName': [f'Account {k if generator.random() > 0.02 else -k}' for k in opportunity_ids],
+            'StrategyFund': np.array(all_funds, dtype=object)[(opportunity_ids + (generator.random(size=rows) < 0.02))
+                                                              % len(all_funds)],
+            'Probability': generator.choice([0, 10, 25, 50, 75, 90, 100], size=rows),
+            'ExpectedRevenueEUR': generator.random(size=rows) * 1e8,
+            'ModifiedTime': modified_time,
+            'AsOfDate': modified_time.normalize(),
+        })
+
+        start = time.perf_counter()
+        legacy_strategies = map_strategy_rowwise(history)
+        legacy_map = time.perf_counter() - start
+        start = time.perf_counter()
+        strategies = map_strategy(history['StrategyFund'])
+        vectorized_map = time.perf_counter() - start
+        pd.testing.assert_series_equal(strategies, legacy_strategies, check_names=False)
+
+        start = time.perf_counter()
+        legacy_changes = get_change_in_pipeline_apply(history, report_date - relativedelta(years=2), report_date)
+        legacy_change = time.perf_counter() - start
+        start = time.perf_counter()
+        changes_in_pipeline = get_change_in_pipeline(history, report_date - relativedelta(years=2), report_date)
+        vectorized_change = time.perf_counter() - start
+        pd.testing.assert_frame_equal(changes_in_pipeline.reset_index(drop=True), legacy_changes.reset_index(drop=True))
+
+        print(f'{rows} rows, {len(changes_in_pipeline)} changes: map_strategy {legacy_map * 1000:.0f} ms -> '
+              f'{vectorized_map * 1000:.1f} ms, get_change_in_pipeline {legacy_change * 1000:.0f} ms -> '
+              f'{vectorized_change * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
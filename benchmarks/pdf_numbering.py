@@ -0,0 +1,70 @@
+"""Page numbering of a board pack sized PDF.
+
+    python -m benchmarks.pdf_numbering
+
+Times one overlay per page (the previous approach, including the write and re-parse of the merged document) against
+the single overlay pass of PdfModifier.merge_pdf, and checks that both give the same text.
+"""
+
+import io
+import os
+import tempfile
+import time
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+
+from utils.pdf.PdfBase import PdfModifier
+
+
+def write_sections(directory: str) -> list:
+    paths = []
+    for k in range(4):
+        path = os.path.join(directory, f"section_{k}.pdf")
+        can = canvas.Canvas(path, pagesize=(842, 595))
+        for i in range(80):
+            can.drawString(72, 500, f"Section {k} page {i}")
+            can.rect(72, 100, 600, 350)
+            can.showPage()
+        can.save()
+        paths.append(path)
+    return paths
+
+
+def number_per_page(paths: list, output_path: str):
+    writer = PdfWriter()
+    for path in paths:
+        with open(path, "rb") as pdf_file:
+            for page in PdfReader(pdf_file).pages:
+                writer.add_page(page)
+    merged = io.BytesIO()
+    writer.write(merged)
+    merged.seek(0)
+
+    numbered_writer = PdfWriter()
+    for i, page in enumerate(PdfReader(merged).pages):
+        page.merge_page(PdfModifier().create_watermark(f"{i + 1}", page.mediabox.width, page.mediabox.height).pages[0])
+        numbered_writer.add_page(page)
+    with open(output_path, "wb") as output_file:
+        numbered_writer.write(output_file)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    paths = write_sections(directory)
+
+    start = time.perf_counter()
+    number_per_page(paths, os.path.join(directory, "per_page.pdf"))
+    print(f"Overlay per page: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    PdfModifier().merge_pdf(paths, os.path.join(directory, "single_pass.pdf"), add_page_numbers=True)
+    print(f"Single pass:      {time.perf_counter() - start:.2f} s")
+
+    texts = [[page.extract_text() for page in PdfReader(os.path.join(directory, name)).pages]
+             for name in ["per_page.pdf", "single_pass.pdf"]]
+    print(f"{len(texts[1])} pages, identical text: {texts[0] == texts[1]}")
+
+
+if __name__ == "__main__":
+    main()
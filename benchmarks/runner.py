@@ -0,0 +1,154 @@
+"""Offline report benchmarks.
+
+    python -m benchmarks record [--only credit_beta esg]    Record the data of the scenarios, needs database access
+    python -m benchmarks run [--only ...] [--repeat 10]      Time the scenarios from the recordings, offline
+    python -m benchmarks list                                List the scenarios and whether they are recorded
+
+Each run of a scenario is split into curation, everything up to the workbook, and compilation, the sheet attribution
+and workbook close (and PDF conversion, if any) traced by utils.tracing. The p50 and p95 over the runs
+are reported, after one warm-up run. The peak memory is the Python heap peak of one further run under tracemalloc.
+
+The fixtures are stored in BENCHMARK_FIXTURES_PATH, by default benchmarks/fixtures, one directory per scenario.
+
+The parity and timing checks of single functions against their previous implementations are separate modules, run
+e.g. with python -m benchmarks.excel_page.
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import recording, replaying
+from benchmarks.scenarios import SCENARIOS, Scenario
+from UTILITIES_TO_REMOVE.cache import set_result_cache
+from utils.tracing import tracing
+from utils.artifact_cache import set_artifact_cache
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_REPEAT = 5
+
+
+def _compilation_time(spans: list) -> float:
+    # The outermost spans of the workbook compilation: compile_report, or the sheets and the close when a report
+    # compiles the workbook itself
+    excel = {span.span_id for span in spans if span.category == "excel"}
+    return sum(span.wall_time for span in spans if span.category == "excel" and span.parent_id not in excel)
+
+
+def _percentiles(values: list) -> tuple:
+    return float(np.percentile(values, 50)), float(np.percentile(values, 95))
+
+
+def record_scenario(scenario: Scenario, fixtures: str) -> dict:
+    """Run the scenario once against the live data sources, recording their results."""
+    if not scenario.needs_fixtures:
+        return {"scenario": scenario.name, "status": "uses sample data"}
+
+    try:
+        entry, argument = scenario.load()
+        with recording(os.path.join(fixtures, scenario.name)) as store:
+            entry(argument())
+    except Exception as e:
+        return {"scenario": scenario.name, "status": f"failed: {type(e).__name__}: {e}"}
+    return {"scenario": scenario.name, "status": "recorded", "calls": len(store.index),
+            "rows": sum(call["rows"] or 0 for call in store.index.values())}
+
+
+def benchmark_scenario(scenario: Scenario, fixtures: str, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Time the scenario from its recordings.
+
+    Returns
+    -------
+        dict: p50 and p95 of the total, curation and compilation times in milliseconds, and the peak memory in MB.
+    """
+    directory = os.path.join(fixtures, scenario.name)
+    if scenario.needs_fixtures and not os.path.isdir(directory):
+        return {"scenario": scenario.name, "status": "not recorded"}
+
+    totals, curations, compilations = [], [], []
+    try:
+        entry, argument = scenario.load()
+        with replaying(directory):
+            # The warm-up run imports the report modules and loads templates and fonts
+            entry(argument())
+
+            for _ in range(repeat):
+                arguments = argument()
+                with tracing(memory=None) as tracer:
+                    start = time.perf_counter()
+                    entry(arguments)
+                    total = time.perf_counter() - start
+                compilation = _compilation_time(tracer.spans)
+                totals.append(total)
+                compilations.append(compilation)
+                curations.append(total - compilation)
+
+            arguments = argument()
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            start_memory, _ = tracemalloc.get_traced_memory()
+            entry(arguments)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+    except Exception as e:
+        return {"scenario": scenario.name, "status": f"failed: {type(e).__name__}: {e}"}
+
+    result = {"scenario": scenario.name, "status": "ok", "runs": repeat}
+    for label, values in (("total", totals), ("curate", curations), ("compile", compilations)):
+        p50, p95 = _percentiles(values)
+        result[f"{label}_p50_ms"] = round(p50 * 1000, 1)
+        result[f"{label}_p95_ms"] = round(p95 * 1000, 1)
+    result["peak_memory_mb"] = round((peak_memory - start_memory) / 1024**2, 1)
+    return result
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline report benchmarks.")
+    parser.add_argument("command", choices=["record", "run", "list"])
+    parser.add_argument("--only", nargs="+", help="Names of the scenarios, by default all.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per scenario.")
+    parser.add_argument("--fixtures", default=os.environ.get("BENCHMARK_FIXTURES_PATH", DEFAULT_FIXTURES))
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario for scenario in SCENARIOS if not args.only or scenario.name in args.only]
+    unknown = set(args.only or []) - {scenario.name for scenario in scenarios}
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Every run has to do the work, and flash_report reads the environment name
+    set_result_cache(None)
+    set_artifact_cache(None)
+    os.environ.setdefault("ENV", "local")
+
+    results = []
+    for scenario in scenarios:
+        if args.command == "list":
+            recorded = os.path.isdir(os.path.join(args.fixtures, scenario.name))
+            results.append({"scenario": scenario.name, "report": scenario.report,
+                            "data": "recorded" if recorded else "not recorded" if scenario.needs_fixtures
+                            else f"sample_datasets/{scenario.sample}"})
+            continue
+
+        if args.command == "record":
+            result = record_scenario(scenario, fixtures=args.fixtures)
+        else:
+            result = benchmark_scenario(scenario, fixtures=args.fixtures, repeat=args.repeat)
+        results.append(result)
+        print(f"{scenario.name}: {result['status']}", flush=True)
+
+    print()
+    print(pd.DataFrame(results, dtype=object).to_string(index=False, na_rep=""))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
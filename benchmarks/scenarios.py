@@ -0,0 +1,96 @@
+import copy
+import importlib
+import os
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+from utils.excel.ExcelReport import Report
+
+SAMPLE_DATASETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_datasets")
+
+
+def _esg_page(input_data: dict):
+    # Compiles the ESG page from the curated data in the sample dataset
+    from reports.esg.page import page
+
+    mr = Report(Data={"ESG Overview": input_data}, Sheets={"ESG Overview": page})
+    return mr.CompileReport(), "ESG Overview.xlsx"
+
+
+@dataclass
+class Scenario:
+    """
+    A benchmarked report.
+
+    Args:
+        name (str): Name of the scenario, also the name of its fixture directory.
+        report (str): The report package, e.g. 'reports.credit_beta'.
+        model (Optional[dict]): Fields of the ReportModel passed to generate_report. These scenarios read their data
+            from the database and the API, so they are replayed from recorded fixtures.
+        sample (Optional[str]): A workbook in sample_datasets. Its sheets are passed as a dict of DataFrames to the
+            entry point instead, so the scenario needs no fixtures.
+        entry (str | Callable): The entry point, a function of the report module or a callable.
+    """
+    name: str
+    report: str
+    model: Optional[dict] = None
+    sample: Optional[str] = None
+    entry: str | Callable = "generate_report"
+    _input_data: Optional[dict] = field(default=None, init=False, repr=False)
+
+    @property
+    def needs_fixtures(self) -> bool:
+        return self.model is not None
+
+    def load(self) -> tuple[Callable, Callable]:
+        """
+        Import the report.
+
+        Returns
+        -------
+            tuple: The entry point, and a function returning a new argument for each call of it.
+        """
+        module = importlib.import_module(f"{self.report}.report")
+        entry = self.entry if callable(self.entry) else getattr(module, self.entry)
+
+        if self.sample is not None:
+            if self._input_data is None:
+                self._input_data = pd.read_excel(os.path.join(SAMPLE_DATASETS, self.sample), sheet_name=None)
+            # The entry points may change the frames in place, so every call gets its own copy
+            return entry, lambda: copy.deepcopy(self._input_data)
+
+        validated_data = importlib.import_module(f"{self.report}.model").ReportModel(**self.model)
+        return entry, lambda: validated_data
+
+
+SCENARIOS = [
+    Scenario("afgift_afstemning", "reports.afgift_afstemning", sample="semler_report_data.xlsx",
+             entry="generate_report_from_input_data"),
+    Scenario("aum_figures", "reports.aum_figures", model={"report_date": "2024-12-06"}),
+    Scenario("cip_management_report", "reports.cip_management_report",
+             model={"fund_code": "CFPDV", "report_date": "2024-11-29"}),
+    Scenario("clo_data_controls", "reports.clo_data_controls", model={}),
+    Scenario("credit_beta", "reports.credit_beta",
+             model={"fund_code": "CFTRC", "report_date": "2024-11-29", "beta_benchmark": "HPC0"}),
+    Scenario("credit_beta_sample", "reports.credit_beta", sample="credit_beta_data.xlsx",
+             entry="generate_report_from_input_data"),
+    Scenario("esg", "reports.esg", model={"fund_code": "CFTRC", "report_date": "2024-11-29"}),
+    Scenario("esg_sample", "reports.esg", sample="esg_report_data.xlsx", entry=_esg_page),
+    Scenario("flash_report", "reports.flash_report", model={"report_date": "2024-12-09"}),
+    Scenario("fund_overview", "reports.fund_overview",
+             model={"fund_code": "CFTRC", "start_date": "2024-10-31", "end_date": "2024-11-29",
+                    "end_of_last_year_date": "2023-12-29"}),
+    Scenario("investor_pipeline", "reports.investor_pipeline", model={"report_date": "2024-12-31"}),
+    Scenario("investor_pipeline_c4", "reports.investor_pipeline_c4", model={"report_date": "2024-12-09"}),
+    Scenario("month_end_performance", "reports.month_end_performance",
+             model={"fund_code": "CFTRC", "report_date": "2024-11-29"}),
+    Scenario("monthly_report_delogue", "reports.monthly_report_delogue", model={}),
+    Scenario("nav_stats", "reports.nav_stats",
+             model={"fund_code": "CFTRC", "currency": "EUR", "shareclass": "NotDefined", "to_date": "2024-11-29",
+                    "nav_series": "NET", "indices": ["HPC0"]}),
+    Scenario("nzam", "reports.nzam", model={"fund_code": "CFTRC", "report_date": "2024-11-29"}),
+    Scenario("waci", "reports.waci", model={"fund_code": "CFTRC", "report_date": "2024-11-29", "waci_metric": 1}),
+]
@@ -1,6 +1,9 @@
 import pandas as pd
 
+from utils.tracing import traced
 
+
+@traced(category="curate")
 def curate_data(input_date: dict):
     # mapping = pd.read_excel(r"C:\repo\Lumo\sample_datasets\semler_report_data.xlsx", sheet_name="mapping")
     # skat_data = pd.read_excel(r"C:\repo\Lumo\sample_datasets\semler_report_data.xlsx", sheet_name="SKAT")
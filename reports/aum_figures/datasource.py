@@ -1,9 +1,11 @@
 import numpy as np
 import pandas as pd
 
-from capfourpy.databases import Database
+from UTILITIES_TO_REMOVE.database import Database
+from utils.tracing import traced
 
 
+@traced(category="curate")
 def curate_data(report_date):
     cfanalytics_db = Database(database='CfAnalytics')
 
@@ -30,42 +32,51 @@ def curate_data(report_date):
         'VELLIV': 'Velliv'
     }
 
-    # Create empty Dataframe to fill
-    fund_aum_data = pd.DataFrame(columns=['AsOfDate', 'FundCode', 'AumEur'])
-
-    for fund in fund_index:
-        fund_aum_data_sql = '''
-        DECLARE @get_date DATE = @get_date_py;
-        DECLARE @shareclass VARCHAR(55) = @shareclass_py;
-        DECLARE @fund_code VARCHAR(55) = @fund_code_py;
-        
-        WITH aum
-        AS (SELECT bv.Date AS AsOfDate,
-                   bv.PortfolioName AS Fund,
-                   bv.ShareClass,
-                   p.Currency,
-                   bv.Value AS Aum
-            FROM Performance.vwBaseValue AS bv
-                LEFT OUTER JOIN Performance.Portfolio AS p
-                    ON bv.PortfolioName = p.PortfolioName
-                       AND bv.ShareClass = p.ShareClass
-            WHERE bv.ValueTypeName = 'AUM'
-                  AND bv.PortfolioName = @fund_code
-                  AND bv.ShareClass = @shareclass
-                  AND YEAR(Date) = YEAR(@get_date)
-                  AND MONTH(Date) = MONTH(@get_date))
-        SELECT a.AsOfDate,
-               a.Fund,
-               a.Aum * e.FxRate AS AumEur
-        FROM aum a
-            LEFT JOIN C4DW.DailyOverview.DcbExchRates e
-                ON a.AsOfDate = e.TradeDate
-                   AND a.Currency = e.FromCcy
-                   AND e.ToCcy = 'EUR';'''
-        get_data = cfanalytics_db.read_sql(query=fund_aum_data_sql,
-                                           variables=['@get_date_py', '@fund_code_py', '@shareclass_py'],
-                                           values=[report_date, fund, fund_index[fund]['Shareclass']])
-        fund_aum_data = pd.concat([fund_aum_data, get_data])
+    # All funds for the month in one query, the funds and share classes are passed as a table value constructor
+    fund_aum_data_sql = '''
+    DECLARE @get_date DATE = @get_date_py;
+    DECLARE @month_start DATE = DATEFROMPARTS(YEAR(@get_date), MONTH(@get_date), 1);
+
+    WITH funds
+    AS (SELECT f.FundCode,
+               f.ShareClass
+        FROM (VALUES @funds_py) AS f (FundCode, ShareClass)),
+         aum
+    AS (SELECT bv.Date AS AsOfDate,
+               bv.PortfolioName AS Fund,
+               bv.ShareClass,
+               p.Currency,
+               bv.Value AS Aum
+        FROM Performance.vwBaseValue AS bv
+            INNER JOIN funds AS f
+                ON bv.PortfolioName = f.FundCode
+                   AND bv.ShareClass = f.ShareClass
+            LEFT OUTER JOIN Performance.Portfolio AS p
+                ON bv.PortfolioName = p.PortfolioName
+                   AND bv.ShareClass = p.ShareClass
+        WHERE bv.ValueTypeName = 'AUM'
+              AND bv.Date >= @month_start
+              AND bv.Date < DATEADD(MONTH, 1, @month_start))
+    SELECT a.AsOfDate,
+           a.Fund,
+           a.Aum * e.FxRate AS AumEur
+    FROM aum a
+        LEFT JOIN C4DW.DailyOverview.DcbExchRates e
+            ON a.AsOfDate = e.TradeDate
+               AND a.Currency = e.FromCcy
+               AND e.ToCcy = 'EUR'
+    ORDER BY a.Fund,
+             a.AsOfDate;'''
+    fund_aum_data = cfanalytics_db.read_sql(query=fund_aum_data_sql,
+                                            variables=['@get_date_py', '@funds_py'],
+                                            values=[report_date, [(fund, settings['Shareclass'])
+                                                                  for fund, settings in fund_index.items()]],
+                                            replace_method=['default', 'values'],
+                                            bind_parameters=True)
+
+    # In the order of fund_index, as when the funds were queried one by one
+    fund_order = {fund: i for i, fund in enumerate(fund_index)}
+    fund_aum_data = fund_aum_data.sort_values('Fund', key=lambda funds: funds.map(fund_order), kind='stable')
 
     # Dynamic naming of columns
     rename_dict_month = {
@@ -89,8 +100,8 @@ def curate_data(report_date):
     monthly_average = fund_aum_data.groupby('Fund')['AumEur'].mean().reset_index()
     monthly_average.rename(columns={'AumEur': 'AumEurAvg'}, inplace=True)
 
-    # Sort the DataFrame by 'identifier' and 'date' in descending order
-    current_aum = fund_aum_data.sort_values(by=['FundCode', 'AsOfDate'], ascending=[True, False])
+    # Sort the DataFrame by date in descending order, the latest date of each fund is kept
+    current_aum = fund_aum_data.sort_values(by='AsOfDate', ascending=False, kind='stable')
     current_aum = current_aum.drop_duplicates(subset='Fund')
     current_aum['AumEur'] = current_aum['AumEur'].astype(float)
     current_aum.rename(columns={'AumEur': 'AumEurCurrent'}, inplace=True)
@@ -124,3 +135,12 @@ def curate_data(report_date):
             "AumEurAvg": AumEurAvg_rename,
             "AumEurCurrent": AumEurCurrent_rename,
             }
+
+
+def data_version(validated_data) -> str | None:
+    # The last change of the AUM and exchange rate data, see utils.artifact_cache
+    versions = [
+        Database(database='CfAnalytics').last_modified(['Performance.vwBaseValue', 'Performance.Portfolio']),
+        Database(database='C4DW').last_modified(['DailyOverview.DcbExchRates']),
+    ]
+    return None if None in versions else '/'.join(versions)
@@ -1,10 +1,12 @@
 from reports.aum_figures.datasource import curate_data
 from reports.aum_figures.page import page
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 from reports.aum_figures.model import ReportModel
 from utils.report_compiler import compile_report
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
 
     report_date_iso = validated_data.report_date.strftime("%Y-%m-%d")
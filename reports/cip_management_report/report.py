@@ -1,8 +1,10 @@
 import io
 import time
 from reports.aum_figures.model import ReportModel
+from utils.artifact_cache import cache_artifact
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
 
     file_path = r'C:\repo\Lumo_reports\reports\cip_management_report\CIP Dummy Report.xlsx'
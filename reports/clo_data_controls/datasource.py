@@ -1,8 +1,10 @@
 import json
 import pandas as pd
 from UTILITIES_TO_REMOVE.database import Database
+from utils.tracing import traced
 
 
+@traced(category="curate")
 def curate_data():
 
     def get_data_discrepancy():
@@ -224,3 +226,15 @@ def curate_data():
 
     return {'Discrepancy': data_Discrepancy,
             'EverestData': data_EverestData}
+
+
+def data_version(validated_data) -> str | None:
+    # The last change of the data quality test results and the position data, see utils.artifact_cache
+    versions = [
+        Database(database="CfRisk", use_service_account=True).last_modified(
+            ["CfData.DataQualityTests", "CfData.DataQualityTestsUnpacked"]),
+        Database(database="C4DW").last_modified(
+            ["DailyOverview.AssetData", "DailyOverview.Positions", "DailyOverview.RatingsConversion",
+             "DailyOverview.vwRatingsReferenceTypes"]),
+    ]
+    return None if None in versions else "/".join(versions)
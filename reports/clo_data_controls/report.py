@@ -2,8 +2,10 @@ from reports.clo_data_controls.datasource import curate_data
 from reports.clo_data_controls.page import DiscrepancyAnalysisPage, EverestDataPage
 from reports.esg.model import ReportModel
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
     clo_control_data = curate_data()
 
@@ -3,6 +3,7 @@ from datetime import date
 
 from reports.credit_beta.utils.SQL import get_credit_betas
 from UTILITIES_TO_REMOVE.database import Database
+from utils.tracing import traced
 
 
 def fetch_data(fund_code: str, report_date: date, beta_benchmark: str):
@@ -12,10 +13,13 @@ def fetch_data(fund_code: str, report_date: date, beta_benchmark: str):
     credit_beta_data = db.read_sql(query=get_credit_betas,
                                    variables=['@py_getDate', '@py_fundCode', '@py_betaBenchmark', '@py_betaSeries'],
                                    values=[report_date.strftime('%Y-%m-%d'), fund_code, beta_benchmark, beta_series],
-                                   statement_number=4)
+                                   statement_number=4,
+                                   bind_parameters=True,
+                                   as_of=report_date)
     return credit_beta_data
 
 
+@traced(category="curate")
 def curate_data(fund_code: str, report_date: date, beta_benchmark: str, input_date: pd.DataFrame = pd.DataFrame()):
     if input_date.empty:
         # Check if report_date is later than today
@@ -1,7 +1,9 @@
 import reports.esg.utils.portfolio_settings as ps
 from UTILITIES_TO_REMOVE.RiskData.RiskData import RiskData
+from utils.tracing import traced
 
 
+@traced(category="curate")
 def curate_data(
         fund_code: str,
         report_date: str
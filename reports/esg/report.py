@@ -2,9 +2,11 @@ from reports.esg.datasource import curate_data
 from reports.esg.page import page
 from reports.esg.model import ReportModel
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 from utils.report_compiler import compile_report
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
     report_date_iso = validated_data.report_date.strftime("%Y-%m-%d")
 
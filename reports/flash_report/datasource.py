@@ -9,8 +9,10 @@ from UTILITIES_TO_REMOVE.performance.Calculator import Calculator
 from UTILITIES_TO_REMOVE.c4api.C4API import CapFourAPI
 from UTILITIES_TO_REMOVE.database import Database
 from UTILITIES_TO_REMOVE.Dates import get_FromDate
+from utils.tracing import traced
 
 
+@traced(category="curate")
 def curate_data(ReportingDate: str = None):
     eoday = offsets.BusinessDay()
 
@@ -115,15 +117,15 @@ def curate_data(ReportingDate: str = None):
 
     # Get data from API
     C4API = CapFourAPI()
-    nav_return_data = C4API.cfdh(
+    series = C4API.cfdh_fields(
         Identifier=None,
-        Field="NavIndex",
+        Fields=["NavIndex", "NavSeries", "AumSeries", "SharesSeries"],
         Source="Everest",
         StartDate=DateFrom_str,
         EndDate=DateTo_str,
         Trim="Both",
     )
-    nav_return_data = nav_return_data.rename(columns={"IndexReturn": "Pf Return"})
+    nav_return_data = series["NavIndex"].rename(columns={"IndexReturn": "Pf Return"})
     nav_return_data = nav_return_data.drop(
         [
             "DataSource",
@@ -137,41 +139,17 @@ def curate_data(ReportingDate: str = None):
         axis=1,
     )
 
-    nav_data = C4API.cfdh(
-        Identifier=None,
-        Field="NavSeries",
-        Source="Everest",
-        StartDate=DateFrom_str,
-        EndDate=DateTo_str,
-        Trim="Both",
-    )
-    nav_data = nav_data.rename(columns={"IndexValue": "NAV"})
+    nav_data = series["NavSeries"].rename(columns={"IndexValue": "NAV"})
     nav_data = nav_data.drop(
         ["DataSource", "HasCalculationValue", "CalculationValueType"], axis=1
     )
 
-    aum_data = C4API.cfdh(
-        Identifier=None,
-        Field="AumSeries",
-        Source="Everest",
-        StartDate=DateFrom_str,
-        EndDate=DateTo_str,
-        Trim="Both",
-    )
-    aum_data = aum_data.rename(columns={"IndexValue": "AUM"})
+    aum_data = series["AumSeries"].rename(columns={"IndexValue": "AUM"})
     aum_data = aum_data.drop(
         ["DataSource", "HasCalculationValue", "CalculationValueType"], axis=1
     )
 
-    shares_data = C4API.cfdh(
-        Identifier=None,
-        Field="SharesSeries",
-        Source="Everest",
-        StartDate=DateFrom_str,
-        EndDate=DateTo_str,
-        Trim="Both",
-    )
-    shares_data = shares_data.rename(columns={"IndexValue": "Shares"})
+    shares_data = series["SharesSeries"].rename(columns={"IndexValue": "Shares"})
     shares_data = shares_data.drop(
         ["DataSource", "HasCalculationValue", "CalculationValueType"], axis=1
     )
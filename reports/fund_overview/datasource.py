@@ -1,4 +1,3 @@
-import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
@@ -27,6 +26,7 @@ from UTILITIES_TO_REMOVE.database import Database
 from UTILITIES_TO_REMOVE.RiskData.RiskData import RiskData
 from UTILITIES_TO_REMOVE.TimeSeries.Composite.Generator import TotalReturnIndex as PortfolioCompositeGenerator
 from UTILITIES_TO_REMOVE.TimeSeries.Composite.DataSource import TimeSeries
+from utils.tracing import count_rows, span
 
 
 @dataclass
@@ -84,42 +84,33 @@ class FundOverview(object):
             self.RiskTableSetting = RiskTableSettings.DEFAULT
 
         if self.RiskEngine is None:
-            Time_Start = time.time()
-            self.RiskEngine = RiskData()
-            self.FundRisk = self.RiskEngine.getFundRisk(portfolios=self.PortfolioCode,
-                                                        dates=datetime.strftime(self.EndDate, '%Y-%m-%d'),
-                                                        net_cash=True,
-                                                        net_CDS=True,
-                                                        reporting=True,
-                                                        HedgeCurrency='EUR',
-                                                        RMSData=True)
-
-            Time_End = time.time()
-            totalTime = int((Time_End - Time_Start) * 1000)
-            print('RiskEngine  %2.2f ms' % (totalTime))
+            with span('RiskEngine', category='curate', portfolio=self.PortfolioCode) as risk_span:
+                self.RiskEngine = RiskData()
+                self.FundRisk = self.RiskEngine.getFundRisk(portfolios=self.PortfolioCode,
+                                                            dates=datetime.strftime(self.EndDate, '%Y-%m-%d'),
+                                                            net_cash=True,
+                                                            net_CDS=True,
+                                                            reporting=True,
+                                                            HedgeCurrency='EUR',
+                                                            RMSData=True)
+                risk_span.set(rows=count_rows(self.FundRisk))
 
         if self.PerformanceEngine is None:
-            Time_Start = time.time()
-            pds = PerformanceDataSettings(FromDate=self.StartDate,
-                                          ToDate=self.EndDate,
-                                          PortfolioCode=self.PortfolioCode)
+            with span('PerformanceEngine', category='curate', portfolio=self.PortfolioCode):
+                pds = PerformanceDataSettings(FromDate=self.StartDate,
+                                              ToDate=self.EndDate,
+                                              PortfolioCode=self.PortfolioCode)
 
-            self.PerformanceEngine = Performance(PerformanceDataSettings=pds)
-            Time_End = time.time()
-            totalTime = int((Time_End - Time_Start) * 1000)
-            print('PerformanceEngine  %2.2f ms' % (totalTime))
+                self.PerformanceEngine = Performance(PerformanceDataSettings=pds)
 
         if self.CIEngine is None:
-            Time_Start = time.time()
-            s = WaciSettings()
-            self.CIEngine = waci_datasource(PortfolioCode=self.PortfolioCode,
-                                            ReportEndDate=self.EndDate,
-                                            WACIStrategyLimit=s.get_waci_limit(fund_code=self.PortfolioCode),
-                                            WACIMetric=s.get_waci_metric(fund_code=self.PortfolioCode,
-                                                                         report_date=self.EndDate))
-            Time_End = time.time()
-            totalTime = int((Time_End - Time_Start) * 1000)
-            print('CIEngine  %2.2f ms' % (totalTime))
+            with span('CIEngine', category='curate', portfolio=self.PortfolioCode):
+                s = WaciSettings()
+                self.CIEngine = waci_datasource(PortfolioCode=self.PortfolioCode,
+                                                ReportEndDate=self.EndDate,
+                                                WACIStrategyLimit=s.get_waci_limit(fund_code=self.PortfolioCode),
+                                                WACIMetric=s.get_waci_metric(fund_code=self.PortfolioCode,
+                                                                             report_date=self.EndDate))
 
         self.RiskFigures = self.GetRiskFigures()
 
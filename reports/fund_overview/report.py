@@ -10,6 +10,7 @@ from reports.fund_overview.utils.objects import (
 from reports.fund_overview.page import OverviewPage
 from reports.fund_overview.utils.settings import PORTFOLIO_SETTINGS
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 from reports.fund_overview.utils.waci_datasource import waci_datasource
 from reports.fund_overview.utils.waci_portfolio_settings import WaciSettings
 from reports.fund_overview.utils.instantiation import InstantiatePerformance
@@ -17,6 +18,7 @@ from utils.report_compiler import compile_report
 from UTILITIES_TO_REMOVE.RiskData.RiskData import RiskData
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
 
     # Instantiate Performance
@@ -1,17 +1,17 @@
-import sqlite3
-import pandas as pd
-
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 
 from reports.investor_pipeline.utils.mappings import strategy_mapping
+from reports.investor_pipeline.utils.snapshot_store import DEFAULT_PATH, SnapshotStore
 from reports.investor_pipeline.utils.sorting import stage_sort_order
 from UTILITIES_TO_REMOVE.Dates import getEndOfMonth_Set
+from utils.tracing import traced
 
-DATABASE_URL = "lumo_reports_data.db"
+DATABASE_URL = DEFAULT_PATH
 report_date = date(2024, 12, 31)
 
 
+@traced(category="curate")
 def curate_data(report_date: date):
     report_date_dt = datetime.combine(report_date, datetime.min.time())
     from_date = report_date_dt - relativedelta(months=12)
@@ -19,18 +19,15 @@ def curate_data(report_date: date):
     # Get the last 12 months of end of month dates
     date_strings = {d.strftime("%Y-%m-%d") for d in getEndOfMonth_Set(from_date, report_date_dt) if d != from_date}
 
-    # Get data
-    connection = sqlite3.connect(DATABASE_URL)
-
-    opportunity_data_query = "select * FROM investor_pipeline WHERE AsOfDate = ?;"
-
-    opportunities_data = pd.concat(
-        [pd.read_sql_query(opportunity_data_query, connection, params=(date_str,)) for date_str in date_strings],
-        ignore_index=True)
-
-    # Top-level pipeline
+    # Get data, the top-level pipeline of all month ends in one query. The store is indexed first if the file was
+    # created before the store existed.
     not_in = ['Closed Won Inflow', 'Closed Lost Outflow', 'Closed Lost opportunity']
-    top_level_opportunities = opportunities_data[~opportunities_data['Stage'].isin(not_in)]
+    store = SnapshotStore(DATABASE_URL)
+    store.ensure_schema()
+    top_level_opportunities = store.read(
+        date_strings,
+        columns=['AsOfDate', 'Stage', 'Probability', 'Amount', 'ExpectedRevenueEUR'],
+        exclude_stages=not_in)
 
     # Pipeline AUM
     def calc_top_level_aum(df, calc_col, prob_filter=None):
@@ -52,4 +49,6 @@ def curate_data(report_date: date):
     prob_weighted_75_90_aum = calc_top_level_aum(top_level_opportunities, 'ExpectedRevenueEUR', [75, 90])
 
 
-
+def data_version(validated_data) -> str:
+    # Changes whenever snapshots are stored, see utils.artifact_cache
+    return SnapshotStore(DATABASE_URL).data_version()
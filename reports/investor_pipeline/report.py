@@ -4,9 +4,11 @@ from reports.investor_pipeline.page import (prop_weighted_page,
                                                                         change_key_pipeline_page_intra_month,
                                                                         change_key_pipeline_page_last_month)
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 from reports.esg.model import ReportModel
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
 
     report_date_iso = validated_data.report_date.strftime("%Y-%m-%d")
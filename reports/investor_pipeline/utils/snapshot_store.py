@@ -0,0 +1,248 @@
+"""Local store of the daily investor pipeline snapshots.
+
+The snapshots are kept in the SQLite table investor_pipeline, one row per opportunity and as-of date, with the as-of
+date as a "%Y-%m-%d" string. The store indexes the table on (AsOfDate, Stage, OpportunityId) and runs in WAL mode,
+so reports can read while new snapshots are appended.
+
+Reads go through a read-only connection that is opened once per thread and process, instead of a new connection per
+report. A database file created before the store existed is indexed by create_schema, on first use by the report
+(see ensure_schema) or by running this module:
+
+    python -m reports.investor_pipeline.utils.snapshot_store lumo_reports_data.db
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "lumo_reports_data.db"
+TABLE = "investor_pipeline"
+INDEX_COLUMNS = ["AsOfDate", "Stage", "OpportunityId"]
+
+# Read-only connections of this thread by path, process and file
+_READ_CONNECTIONS = threading.local()
+
+# The files checked by ensure_schema in this process
+_SCHEMA_CHECKED = set()
+_SCHEMA_LOCK = threading.Lock()
+
+
+class SnapshotStore:
+    """
+    The investor pipeline snapshots in a SQLite file.
+
+    Args:
+        path (str): The SQLite file, by default lumo_reports_data.db in the working directory.
+
+    Examples
+    --------
+        store = SnapshotStore('lumo_reports_data.db')
+        store.load_incremental(fetch=lambda dates: read_sql_as_of(db, opportunity_asofdate, dates),
+                               end_date=date.today())
+        data = store.read(['2024-11-30', '2024-12-31'], exclude_stages=['Closed Won Inflow'])
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+
+    @contextmanager
+    def __connect(self) -> Iterator[sqlite3.Connection]:
+        # A writable connection, committed on success and always closed
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def __read_connection(self) -> sqlite3.Connection:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The investor pipeline snapshot store {self.path} does not exist.") from None
+
+        # A file replaced on disk gets a new connection, and connections are never shared with forked processes
+        key = (os.path.abspath(self.path), os.getpid(), stat.st_dev, stat.st_ino)
+        connections = getattr(_READ_CONNECTIONS, "connections", None)
+        if connections is None:
+            connections = _READ_CONNECTIONS.connections = {}
+
+        connection = connections.get(key)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, timeout=30)
+            connections[key] = connection
+        return connection
+
+    @staticmethod
+    def __columns(connection: sqlite3.Connection) -> list:
+        return [row[1] for row in connection.execute(f"PRAGMA table_info({TABLE})").fetchall()]
+
+    def create_schema(self, data: pd.DataFrame | None = None):
+        """
+        Switch the file to WAL mode and index the snapshot table, creating the table from the columns of the data if
+        it does not exist yet. Does nothing that is already done.
+
+        Args:
+            data (Optional[pd.DataFrame]): Snapshots with the columns of the table, needed if the table does not exist.
+        """
+        with self.__connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+
+            if not self.__columns(connection):
+                if data is None:
+                    raise ValueError(f"The table {TABLE} does not exist, pass snapshots to create it from.")
+                data.head(0).to_sql(TABLE, connection, index=False)
+
+            columns = self.__columns(connection)
+            index_columns = [column for column in INDEX_COLUMNS if column in columns]
+            if "AsOfDate" not in index_columns:
+                raise ValueError(f"The table {TABLE} has no AsOfDate column.")
+            connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_{'_'.join(index_columns)} "
+                               f"ON {TABLE} ({', '.join(index_columns)})")
+
+    def ensure_schema(self):
+        """
+        Run create_schema once per file and process, so that a file created before the store existed is indexed
+        before it is read. A missing file is left to the reads, and a file that cannot be written (e.g. read-only) or
+        has no snapshot table is read as it is.
+        """
+        key = (os.path.abspath(self.path), os.getpid())
+        with _SCHEMA_LOCK:
+            if key in _SCHEMA_CHECKED or not os.path.isfile(self.path):
+                return
+            try:
+                self.create_schema()
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning("The investor pipeline snapshot store %s could not be indexed: %s", self.path, e)
+            _SCHEMA_CHECKED.add(key)
+
+    def as_of_dates(self) -> list:
+        """The as-of dates in the store, in ascending order."""
+        return [row[0] for row in self.__read_connection().execute(
+            f"SELECT DISTINCT AsOfDate FROM {TABLE} ORDER BY AsOfDate").fetchall()]
+
+    def data_version(self) -> str:
+        """
+        A token that changes whenever snapshots are stored, from the size and modification time of the file and its
+        write-ahead log.
+
+        Returns
+        -------
+            str: The token.
+        """
+        parts = []
+        for path in (self.path, f"{self.path}-wal"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                if path != self.path:
+                    continue
+                raise FileNotFoundError(f"The investor pipeline snapshot store {self.path} does not exist.") from None
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        return "/".join(parts)
+
+    def read(self, as_of_dates: Iterable, columns: list | None = None,
+             exclude_stages: list | None = None) -> pd.DataFrame:
+        """
+        Read the snapshots of the as-of dates in one query.
+
+        Args:
+            as_of_dates (Iterable): The as-of dates, as dates or "%Y-%m-%d" strings.
+            columns (Optional[list]): The columns to read, by default all.
+            exclude_stages (Optional[list]): Stages to leave out. Opportunities without a stage are kept.
+
+        Returns
+        -------
+            pd.DataFrame: The snapshots by as-of date.
+        """
+        date_strings = sorted({_date_string(as_of_date) for as_of_date in as_of_dates})
+        query = (f"SELECT {', '.join(columns) if columns else '*'} FROM {TABLE} "
+                 f"WHERE AsOfDate IN ({', '.join('?' * len(date_strings))})")
+        parameters = list(date_strings)
+        if exclude_stages:
+            query += f" AND (Stage IS NULL OR Stage NOT IN ({', '.join('?' * len(exclude_stages))}))"
+            parameters += list(exclude_stages)
+
+        return pd.read_sql_query(query + " ORDER BY AsOfDate", self.__read_connection(), params=parameters)
+
+    def append(self, snapshots: pd.DataFrame) -> int:
+        """
+        Store snapshots, replacing the stored snapshots of the same as-of dates.
+
+        Args:
+            snapshots (pd.DataFrame): The snapshots, with the as-of date in the column AsOfDate.
+
+        Returns
+        -------
+            int: The number of rows stored.
+        """
+        if snapshots.empty:
+            return 0
+
+        snapshots = snapshots.assign(AsOfDate=snapshots["AsOfDate"].map(_date_string))
+        self.create_schema(snapshots)
+
+        with self.__connect() as connection:
+            columns = self.__columns(connection)
+            missing = set(snapshots.columns) - set(columns)
+            if missing:
+                raise ValueError(f"The table {TABLE} has no columns {', '.join(sorted(missing))}.")
+
+            connection.executemany(f"DELETE FROM {TABLE} WHERE AsOfDate = ?",
+                                   [(as_of_date,) for as_of_date in snapshots["AsOfDate"].unique()])
+            snapshots.to_sql(TABLE, connection, index=False, if_exists="append", chunksize=10000)
+
+        return len(snapshots)
+
+    def load_incremental(self, fetch: Callable[[list], pd.DataFrame], end_date: date,
+                         start_date: date | None = None) -> int:
+        """
+        Append the daily snapshots after the latest stored as-of date up to and including the end date.
+
+        Args:
+            fetch (Callable): Returns the snapshots of a list of "%Y-%m-%d" as-of dates, with the date in AsOfDate.
+            end_date (date): The last as-of date to load.
+            start_date (Optional[date]): The first as-of date to load when the store is empty.
+
+        Returns
+        -------
+            int: The number of rows stored.
+        """
+        latest = None
+        if os.path.isfile(self.path):
+            with self.__connect() as connection:
+                if self.__columns(connection):
+                    latest = connection.execute(f"SELECT MAX(AsOfDate) FROM {TABLE}").fetchone()[0]
+
+        if latest is not None:
+            first_date = date.fromisoformat(latest) + timedelta(days=1)
+        elif start_date is not None:
+            first_date = start_date
+        else:
+            raise ValueError("The store is empty, pass the start date of the snapshots to load.")
+
+        date_strings = [_date_string(d) for d in pd.date_range(first_date, end_date, freq="D")]
+        if not date_strings:
+            return 0
+        return self.append(fetch(date_strings))
+
+
+def _date_string(value) -> str:
+    return value if isinstance(value, str) else value.strftime("%Y-%m-%d")
+
+
+if __name__ == "__main__":
+    store = SnapshotStore(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
+    store.create_schema()
+    as_of_dates = store.as_of_dates()
+    print(f"{store.path}: {len(as_of_dates)} as-of dates"
+          + (f" from {as_of_dates[0]} to {as_of_dates[-1]}" if as_of_dates else ""))
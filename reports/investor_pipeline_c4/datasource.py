@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 
 from datetime import date, datetime
@@ -7,8 +8,123 @@ from dateutil.relativedelta import relativedelta
 from reports.investor_pipeline.utils.mappings import strategy_mapping
 from UTILITIES_TO_REMOVE.database import Database
 from UTILITIES_TO_REMOVE.Dates import getEndOfMonth_Set
+from utils.tracing import traced
 
 
+def read_sql_as_of(db: Database, query: str, date_strings) -> pd.DataFrame:
+    """
+    Runs a query of a temporal table at several points in time in one round trip. FOR SYSTEM_TIME AS OF only takes a
+    literal or a variable, so the query is repeated for each date and the results combined with UNION ALL.
+
+    Args:
+        db (Database): The database to query.
+        query (str): The query, with the variable @AsOfDate in its FOR SYSTEM_TIME AS OF clause.
+        date_strings: The dates as "%Y-%m-%d" strings, duplicates are fetched once.
+
+    Returns
+    -------
+        pd.DataFrame: The results of all dates, with the date in the column AsOfDate.
+    """
+    date_strings = sorted(set(date_strings))
+    variables = [f"@AsOfDate_{i:03d}" for i in range(len(date_strings))]
+    union_query = "\nUNION ALL\n".join(
+        f"SELECT q.*, {variable} AS AsOfDate FROM ({query.replace('@AsOfDate', variable)}) AS q"
+        for variable in variables
+    )
+    return db.read_sql(union_query, variables=variables, values=date_strings)
+
+
+# The strategy of each fund, the first strategy listing a fund wins
+strategy_by_fund = {}
+for strategy, funds in strategy_mapping.items():
+    for fund in funds:
+        strategy_by_fund.setdefault(fund, strategy)
+
+
+def map_strategy(strategy_funds: pd.Series) -> pd.Series:
+    """
+    Maps the strategy funds of the opportunities to the strategies of strategy_mapping.
+
+    Returns
+    -------
+        pd.Series: The strategy of each fund, "Other" for funds not in the mapping.
+    """
+    return strategy_funds.map(strategy_by_fund).fillna("Other")
+
+
+def get_change_in_pipeline(opportunities_df: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    """
+    Compares the first and the last entry of each opportunity modified within the period, and lists the
+    opportunities whose probability changed.
+
+    Returns
+    -------
+        pd.DataFrame: The changed opportunities by expected revenue, with the probability and expected revenue
+            at the first and the last entry.
+    """
+    start_date = start_date.strftime("%Y-%m-%d")
+    end_date = end_date.strftime("%Y-%m-%d")
+    # Filter the opportunities within the given date range
+    filtered_df = opportunities_df[(opportunities_df['AsOfDate'] >= start_date) &
+                                   (opportunities_df['AsOfDate'] <= end_date)]
+
+    # Sort values by OpportunityId and ModifiedTime
+    filtered_df = filtered_df[filtered_df['OpportunityId'].notna()]
+    filtered_df = filtered_df.sort_values(['OpportunityId', 'ModifiedTime'])
+
+    # Get the first and last entries for each OpportunityId, the same entry for opportunities with one entry
+    first_entries = filtered_df.drop_duplicates('OpportunityId', keep='first')
+    last_entries = filtered_df.drop_duplicates('OpportunityId', keep='last').copy()
+
+    # Calculate changes in Probability and Expected Revenue, only comparable when the account and the fund are the same
+    same_opportunity = np.ones(len(last_entries), dtype=bool)
+    for column in ['AccountName', 'StrategyFund']:
+        first_values = first_entries[column].to_numpy()
+        last_values = last_entries[column].to_numpy()
+        same_opportunity &= pd.notna(first_values) & pd.notna(last_values) & (first_values == last_values)
+
+    last_entries['From Probability %'] = np.where(same_opportunity, first_entries['Probability'], np.nan)
+    last_entries['From Exp AuM mEUR'] = np.where(same_opportunity, first_entries['ExpectedRevenueEUR'], np.nan)
+    last_entries['Probability Change %'] = last_entries['Probability'] - last_entries['From Probability %']
+    last_entries['Exp Revenue EUR Change'] = last_entries['ExpectedRevenueEUR'] - last_entries['From Exp AuM mEUR']
+
+    # Filter rows based on conditions
+    filtered_pipeline = last_entries.dropna(subset=['Probability Change %'])
+    filtered_pipeline = filtered_pipeline[
+        (filtered_pipeline['Probability Change %'] != 0) &
+        (filtered_pipeline['ExpectedRevenueEUR'] >= 10) &
+        (filtered_pipeline['Probability'] > 0)
+        ]
+
+    # Select and sort required columns
+    change_in_key_pipeline = filtered_pipeline[['AccountName', 'StrategyFund', 'From Exp AuM mEUR',
+                                                'ExpectedRevenueEUR', 'From Probability %', 'Probability',
+                                                'Probability Change %']]
+    change_in_key_pipeline = change_in_key_pipeline.sort_values('ExpectedRevenueEUR', ascending=False)
+
+    # Rename columns
+    change_in_key_pipeline = change_in_key_pipeline.rename(columns={'Probability': 'To Probability %',
+                                                                    'AccountName': 'Account Name',
+                                                                    'StrategyFund': 'Strategy Fund',
+                                                                    'ExpectedRevenueEUR': 'To Exp AuM mEUR'})
+
+    # Round float columns to integers
+    change_in_key_pipeline[change_in_key_pipeline.select_dtypes(include='float').columns] = \
+        change_in_key_pipeline.select_dtypes(include='float').round().astype(int)
+
+    return change_in_key_pipeline
+
+
+def zoho_database() -> Database:
+    return Database(database='Zoho', use_service_account=os.environ["ENV"].lower() == 'adalab')
+
+
+def data_version(validated_data) -> str | None:
+    # The last change of the opportunity and account tables, see utils.artifact_cache
+    return zoho_database().last_modified(['Custom.Opportunity', 'ZohoCrm.Opportunities', 'ZohoCrm.Accounts'])
+
+
+@traced(category="curate")
 def curate_data(report_date: date):
     report_date_dt = datetime.combine(report_date, datetime.min.time())
     from_date = report_date_dt - relativedelta(months=12)
@@ -32,10 +148,7 @@ def curate_data(report_date: date):
     """
     Get Data
     """
-    if os.environ["ENV"].lower() == 'adalab':
-        db = Database(database='Zoho', use_service_account=True)
-    else:
-        db = Database(database='Zoho', use_service_account=False)
+    db = zoho_database()
 
     opportunity_asofdate = """SELECT o.OpportunityId,
                                      a.AccountName,
@@ -75,26 +188,27 @@ def curate_data(report_date: date):
                                        ON a.RecordId = o2.AccountId
                                    ORDER BY AsOfDate"""
 
+    # Get the data at all as of dates in one query, the quarter ends are a subset of the month ends
+    quarter_end_months = {3, 6, 9, 12}
+    quarter_end_dates = {date for date in date_strings if int(date.split('-')[1]) in quarter_end_months}
+    sixty_days_ago_str = sixty_days_ago.strftime("%Y-%m-%d")
+    opportunities_as_of = read_sql_as_of(db, opportunity_asofdate,
+                                         date_strings | intra_period_dates | {sixty_days_ago_str})
+
+    def as_of(date_set):
+        return opportunities_as_of.loc[opportunities_as_of['AsOfDate'].isin(date_set)].reset_index(drop=True)
+
     # Get data for last 12 months
-    opportunities = pd.concat([
-        db.read_sql(opportunity_asofdate, variables=['@AsOfDate'], values=[date_str]).assign(AsOfDate=date_str)
-        for date_str in date_strings
-    ], ignore_index=True)
+    opportunities = as_of(date_strings)
     opportunities = opportunities[~opportunities['Stage'].isin(['Closed Won Inflow',
                                                                 'Closed Lost Outflow',
                                                                 'Closed Lost opportunity'])]
 
     # Get data for the relevant dates intra period
-    opportunities_intra_periods = pd.concat([
-        db.read_sql(opportunity_asofdate, variables=['@AsOfDate'], values=[date_str]).assign(AsOfDate=date_str)
-        for date_str in intra_period_dates
-    ], ignore_index=True)
+    opportunities_intra_periods = as_of(intra_period_dates)
 
     # Get data for last 60 days
-    opportunities_past_60 = db.read_sql(opportunity_asofdate,
-                                        variables=['@AsOfDate'],
-                                        values=[sixty_days_ago.strftime("%Y-%m-%d")])
-    opportunities_past_60['AsOfDate'] = sixty_days_ago.strftime("%Y-%m-%d")
+    opportunities_past_60 = as_of({sixty_days_ago_str})
     opportunities_changes = db.read_sql(opportunity_all_dates)
     opportunities_changes = opportunities_changes.loc[opportunities_changes['AsOfDate'] >= sixty_days_ago.date()]
     opportunities_changes = opportunities_changes.loc[opportunities_changes['AsOfDate'] <= report_date]
@@ -103,11 +217,8 @@ def curate_data(report_date: date):
     opportunities_past_60['AsOfDate'] = pd.to_datetime(opportunities_past_60['AsOfDate'])
 
     # Map Strategy
-    def map_strategy(row):
-        return next((strategy for strategy, funds in strategy_mapping.items() if row['StrategyFund'] in funds), "Other")
-
-    opportunities['Strategy'] = opportunities.apply(map_strategy, axis=1)
-    opportunities_past_60['Strategy'] = opportunities_past_60.apply(map_strategy, axis=1)
+    opportunities['Strategy'] = map_strategy(opportunities['StrategyFund'])
+    opportunities_past_60['Strategy'] = map_strategy(opportunities_past_60['StrategyFund'])
 
     # Probability Weighted Pipeline AUM
     def calc_prob_weighted_aum(df, prob_filter=None):
@@ -135,56 +246,6 @@ def curate_data(report_date: date):
     current_pipeline.reset_index(inplace=True)
     current_pipeline.rename(columns={'Strategy': 'Strategy / Probability'}, inplace=True)
 
-    def get_change_in_pipeline(opportunities_df, start_date, end_date):
-        start_date = start_date.strftime("%Y-%m-%d")
-        end_date = end_date.strftime("%Y-%m-%d")
-        # Filter the opportunities within the given date range
-        filtered_df = opportunities_df[(opportunities_df['AsOfDate'] >= start_date) &
-                                       (opportunities_df['AsOfDate'] <= end_date)]
-
-        # Sort values by OpportunityId and AsOfDate
-        filtered_df = filtered_df.sort_values(['OpportunityId', 'ModifiedTime'])
-
-        # Get the first and last entries for each OpportunityId
-        first_last_entries = filtered_df.groupby('OpportunityId').apply(lambda x: x.iloc[[0, -1]]).reset_index(
-            drop=True)
-
-        # Calculate changes in Probability and Expected Revenue
-        first_last_entries['From Probability %'] = \
-            first_last_entries.groupby(['AccountName', 'OpportunityId', 'StrategyFund'])['Probability'].shift()
-        first_last_entries['From Exp AuM mEUR'] = \
-            first_last_entries.groupby(['AccountName', 'OpportunityId', 'StrategyFund'])['ExpectedRevenueEUR'].shift()
-        first_last_entries['Probability Change %'] = first_last_entries['Probability'] - first_last_entries[
-            'From Probability %']
-        first_last_entries['Exp Revenue EUR Change'] = first_last_entries['ExpectedRevenueEUR'] - first_last_entries[
-            'From Exp AuM mEUR']
-
-        # Filter rows based on conditions
-        filtered_pipeline = first_last_entries.dropna(subset=['Probability Change %'])
-        filtered_pipeline = filtered_pipeline[
-            (filtered_pipeline['Probability Change %'] != 0) &
-            (filtered_pipeline['ExpectedRevenueEUR'] >= 10) &
-            (filtered_pipeline['Probability'] > 0)
-            ]
-
-        # Select and sort required columns
-        change_in_key_pipeline = filtered_pipeline[['AccountName', 'StrategyFund', 'From Exp AuM mEUR',
-                                                    'ExpectedRevenueEUR', 'From Probability %', 'Probability',
-                                                    'Probability Change %']]
-        change_in_key_pipeline = change_in_key_pipeline.sort_values('ExpectedRevenueEUR', ascending=False)
-
-        # Rename columns
-        change_in_key_pipeline.rename(columns={'Probability': 'To Probability %', 'AccountName': 'Account Name',
-                                               'StrategyFund': 'Strategy Fund',
-                                               'ExpectedRevenueEUR': 'To Exp AuM mEUR'},
-                                      inplace=True)
-
-        # Round float columns to integers
-        change_in_key_pipeline[change_in_key_pipeline.select_dtypes(include='float').columns] = \
-            change_in_key_pipeline.select_dtypes(include='float').round().astype(int)
-
-        return change_in_key_pipeline
-
     # Last 60 days
     change_last_60_days = get_change_in_pipeline(opportunities_past_60, sixty_days_ago, report_date)
 
@@ -197,21 +258,16 @@ def curate_data(report_date: date):
     """
     Region for Quarterly development of PwP
     """
-    quarter_end_months = {3, 6, 9, 12}
-    quarter_end_dates = {date for date in date_strings if int(date.split('-')[1]) in quarter_end_months}
     earliest_date = min(quarter_end_dates, key=lambda date: datetime.strptime(date, '%Y-%m-%d'))
     latest_date = max(quarter_end_dates, key=lambda date: datetime.strptime(date, '%Y-%m-%d'))
 
     # Quarter end data
-    quarter_end_data = pd.concat([
-        db.read_sql(opportunity_asofdate, variables=['@AsOfDate'], values=[date_str]).assign(AsOfDate=date_str)
-        for date_str in quarter_end_dates
-    ], ignore_index=True)
+    quarter_end_data = as_of(quarter_end_dates)
     quarter_end_data = quarter_end_data[~quarter_end_data['Stage'].isin(['Closed Won Inflow',
                                                                          'Closed Lost Outflow',
                                                                          'Closed Lost opportunity'])]
 
-    quarter_end_data['Strategy'] = quarter_end_data.apply(map_strategy, axis=1)
+    quarter_end_data['Strategy'] = map_strategy(quarter_end_data['StrategyFund'])
     quarter_end_data = quarter_end_data[quarter_end_data['Strategy'] != "C4 CLO Liability"]
     quarter_end_data['AsOfDate'] = pd.to_datetime(quarter_end_data['AsOfDate'])
     quarter_end_data['QuarterYear'] = quarter_end_data['AsOfDate'].dt.to_period('Q')
@@ -1,8 +1,10 @@
 from reports.month_end_performance.utils.instantiation import InstantiatePerformance
 from reports.month_end_performance.model import ReportModel
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel
                     ):
     Data = {}
@@ -1,5 +1,8 @@
 import pandas as pd
 
+from utils.tracing import traced
+
+@traced(category="curate")
 def curate_data():
     data_new_sales = pd.read_excel(r'C:\Users\uhrsk\OneDrive - Lumo Technologies ApS\Lumo Technologies\Delogue Data - dummy dataset.xlsx', sheet_name='NewSales')
     data_pl = pd.read_excel(r'C:\Users\uhrsk\OneDrive - Lumo Technologies ApS\Lumo Technologies\Delogue Data - dummy dataset.xlsx', sheet_name='P&L')
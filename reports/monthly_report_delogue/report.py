@@ -2,8 +2,10 @@ from reports.monthly_report_delogue.datasource import curate_data
 from reports.monthly_report_delogue.page import (new_sales_page, pl_page, cashflow_page, fte_page, renewals_page)
 from reports.monthly_report_delogue.model import ReportModel
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
     data = curate_data()
 
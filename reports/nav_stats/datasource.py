@@ -1,7 +1,9 @@
 from UTILITIES_TO_REMOVE.NavStatsClass.NavStats import get_portfolio_nav_stats
 from UTILITIES_TO_REMOVE.database import Database
+from utils.tracing import traced
 
 
+@traced(category="curate")
 def curate_data(
     fund_code,
     shareclass,
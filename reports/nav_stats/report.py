@@ -2,9 +2,11 @@ from reports.nav_stats.datasource import curate_data
 from reports.nav_stats.page import page
 from reports.nav_stats.model import ReportModel
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 from utils.report_compiler import compile_report
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel):
     data = curate_data(
         fund_code=validated_data.fund_code,
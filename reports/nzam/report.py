@@ -4,8 +4,10 @@ from reports.nzam.datasource import curate_data
 from reports.nzam.page import page
 from reports.nzam.model import ReportModel
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel
                     ):
     report_date_iso = datetime.combine(validated_data.report_date, datetime.min.time())
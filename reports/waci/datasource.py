@@ -100,7 +100,8 @@ class waci_datasource(object):
                                   values=values,
                                   replace_method=replace_method,
                                   Tables=7,
-                                  stored_procedure=True)
+                                  stored_procedure=True,
+                                  as_of=self.ReportEndDate)
 
         return Report_WACI
 
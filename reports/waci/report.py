@@ -1,12 +1,14 @@
 from datetime import datetime
 
 from utils.excel.ExcelReport import Report
+from utils.artifact_cache import cache_artifact
 from reports.waci.model import ReportModel
 from reports.waci.page import page
 from reports.waci.datasource import waci_datasource
 from reports.waci.utils.portfolio_settings import WaciSettings
 
 
+@cache_artifact
 def generate_report(validated_data: ReportModel
                     ):
 
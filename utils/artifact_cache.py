@@ -0,0 +1,291 @@
+"""Compiled report cache.
+
+On-disk cache in front of the generate_report functions, holding the compiled report stream and its filename. An
+entry is keyed by the report, a hash of the validated ReportModel (which includes the export format), a code version
+and a data version token. The code version is a hash of the report code and templates (see CODE_DIRECTORIES), so a
+deploy that changes a report never serves its old output. The data version token is returned by an optional
+data_version(validated_data) function in the datasource module of the report, e.g. the last load time of its source
+tables, so that reloaded data is not served from the cache.
+
+The cache is disabled unless the environment variable ARTIFACT_CACHE_PATH points at a directory, or a cache is set
+with set_artifact_cache. The size limit and the time-to-live are read from ARTIFACT_CACHE_MAX_BYTES and
+ARTIFACT_CACHE_TTL (seconds). All entries expire after the time-to-live, except reports for a historical month-end
+with a data version token, which are kept until they are evicted: a restatement of the month changes the token.
+"""
+
+import functools
+import hashlib
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Tuple
+
+from utils.as_of_dates import find_as_of_date
+from utils.lru_file_store import LruFileStore
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024**3
+DEFAULT_TTL = timedelta(hours=1)
+
+# The code and templates behind the reports, relative to the repository root
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_DIRECTORIES = ("reports", "utils", "UTILITIES_TO_REMOVE")
+# Seconds between checks of the code files for changes, a deploy restarts the processes anyway
+CODE_VERSION_CHECK_INTERVAL = 60
+
+
+class ArtifactCache(LruFileStore):
+    """
+    Size-bounded on-disk cache of compiled reports with least-recently-used eviction, see utils.lru_file_store.
+
+    Examples
+    --------
+        cache = ArtifactCache(directory='/tmp/lumo_artifacts', max_bytes=500 * 1024**2)
+        key = cache.make_key('reports.nav_stats', validated_data=validated_data, code_version=code_version(),
+                             data_version='2024-11-29T18:00')
+        artifact = cache.get(key)
+        if artifact is None:
+            artifact = generate_report(validated_data)
+            cache.put(key, *artifact, as_of_date=validated_data.to_date)
+        report_stream, filename = artifact
+    """
+
+    TABLE = "artifacts"
+    SUFFIX = ".bin"
+    COLUMNS = ("filename",)
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, ttl: timedelta = DEFAULT_TTL):
+        super().__init__(directory, max_bytes, ttl)
+
+    @staticmethod
+    def make_key(report: str, validated_data, code_version: str | None = None, data_version: str | None = None) -> str:
+        """
+        Hash the report name, the validated ReportModel, the code version and the data version token into a cache key.
+
+        Args:
+            report (str): The report, e.g. its package name 'reports.nav_stats'.
+            validated_data (BaseReportConfig): The validated ReportModel passed to generate_report.
+            code_version (Optional[str]): Changes whenever the code or templates of the report change, see code_version.
+            data_version (Optional[str]): Changes whenever the data behind the report changes.
+
+        Returns
+        -------
+            str: The cache key.
+        """
+        payload = json.dumps(
+            {
+                "report": report,
+                "model": type(validated_data).__qualname__,
+                "data": validated_data.model_dump(mode="json"),
+                "code_version": code_version,
+                "data_version": data_version,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[BytesIO, str] | None:
+        """Return a new stream of the cached report and its filename, or None if the key is missing or has expired."""
+        row = self._lookup(key)
+        if row is None:
+            return None
+
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            # Evicted by another process between the lookup and the read
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        (filename,) = row
+        return BytesIO(data), filename
+
+    def put(self, key: str, report_stream: BytesIO, filename: str, as_of_date: date | None = None):
+        """
+        Store a compiled report. The stream is read without moving its position.
+
+        Args:
+            key (str): The cache key, see make_key.
+            report_stream (BytesIO): The compiled report.
+            filename (str): The filename returned with the report.
+            as_of_date (Optional[date]): The report date. Reports for a historical month-end never expire, so only pass
+                it if the key includes a data version token.
+        """
+        data = report_stream.getvalue()
+        if len(data) > self.max_bytes:
+            return
+
+        temp_path = self._temp_path(key)
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        self._add(key, temp_path, as_of_date=as_of_date, filename=filename)
+
+
+_ARTIFACT_CACHE = None
+_ARTIFACT_CACHE_CONFIGURED = False
+_ARTIFACT_CACHE_LOCK = threading.Lock()
+
+# One lock per key with the number of callers holding or waiting for it, so concurrent requests for the same report
+# in this process build it once. The lock is dropped when the last caller is done.
+_BUILD_LOCKS = {}
+_BUILD_LOCKS_LOCK = threading.Lock()
+
+# The time of the last check, the size and modification time of the files and the code version hashed from them
+_CODE_VERSION = None
+_CODE_VERSION_LOCK = threading.Lock()
+
+
+def set_artifact_cache(cache: ArtifactCache | None):
+    """Set the process-wide artifact cache, or disable it with None."""
+    global _ARTIFACT_CACHE, _ARTIFACT_CACHE_CONFIGURED
+    with _ARTIFACT_CACHE_LOCK:
+        _ARTIFACT_CACHE = cache
+        _ARTIFACT_CACHE_CONFIGURED = True
+
+
+def get_artifact_cache() -> ArtifactCache | None:
+    """Return the process-wide artifact cache. On first use it is created from ARTIFACT_CACHE_PATH, if set."""
+    global _ARTIFACT_CACHE, _ARTIFACT_CACHE_CONFIGURED
+    with _ARTIFACT_CACHE_LOCK:
+        if not _ARTIFACT_CACHE_CONFIGURED:
+            directory = os.environ.get("ARTIFACT_CACHE_PATH")
+            if directory:
+                _ARTIFACT_CACHE = ArtifactCache(
+                    directory=directory,
+                    max_bytes=int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                    ttl=timedelta(seconds=float(os.environ.get("ARTIFACT_CACHE_TTL", DEFAULT_TTL.total_seconds()))),
+                )
+            _ARTIFACT_CACHE_CONFIGURED = True
+
+        return _ARTIFACT_CACHE
+
+
+def _code_files() -> list:
+    # The files below CODE_DIRECTORIES in a fixed order, without compiled Python files
+    paths = []
+    for directory in CODE_DIRECTORIES:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT_DIRECTORY, directory)):
+            dirnames[:] = sorted(name for name in dirnames if name != "__pycache__" and not name.startswith("."))
+            paths += [os.path.join(dirpath, name) for name in sorted(filenames)
+                      if not name.endswith(".pyc") and not name.startswith(".")]
+    return paths
+
+
+def code_version() -> str:
+    """
+    Hash the code and templates of the reports, i.e. all files below CODE_DIRECTORIES. The version is computed once
+    and the files are checked for changes at most every CODE_VERSION_CHECK_INTERVAL seconds, they are only read again
+    when one of them is added, removed or modified.
+
+    Returns
+    -------
+        str: The code version.
+    """
+    global _CODE_VERSION
+    with _CODE_VERSION_LOCK:
+        now = time.monotonic()
+        if _CODE_VERSION is not None and now - _CODE_VERSION[0] < CODE_VERSION_CHECK_INTERVAL:
+            return _CODE_VERSION[2]
+
+        paths = _code_files()
+        signature = []
+        for path in paths:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+
+        if _CODE_VERSION is None or _CODE_VERSION[1] != signature:
+            digest = hashlib.sha256()
+            for path in paths:
+                digest.update(os.path.relpath(path, ROOT_DIRECTORY).replace(os.sep, "/").encode("utf-8") + b"\0")
+                with open(path, "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+            _CODE_VERSION = (now, signature, digest.hexdigest())
+        else:
+            _CODE_VERSION = (now, signature, _CODE_VERSION[2])
+
+        return _CODE_VERSION[2]
+
+
+def _data_version(report: str, validated_data) -> str | None:
+    # The token of the optional data_version function in the datasource module of the report. A token that cannot be
+    # read leaves the report to the time-to-live.
+    module_name = f"{report}.datasource"
+    try:
+        datasource = importlib.import_module(module_name)
+    except ModuleNotFoundError as e:
+        if e.name != module_name:
+            raise
+        return None
+
+    data_version = getattr(datasource, "data_version", None)
+    if data_version is None:
+        return None
+
+    try:
+        token = data_version(validated_data)
+    except Exception as e:
+        logger.warning("The data version of %s could not be read: %s", report, e)
+        return None
+    return None if token is None else str(token)
+
+
+def cache_artifact(func):
+    """
+    Decorator serving a generate_report function from the artifact cache, if one is configured. Each call is traced
+    as a generate_report span (see utils.tracing).
+
+    Inside utils.report_compiler.deferred_compilation the function returns a CompilationRequest instead of the
+    report, the cache and the key are then passed on with the request, which stores the report once it is compiled.
+    """
+    report = func.__module__.rsplit(".", 1)[0]
+
+    @functools.wraps(func)
+    def cached_generate_report(validated_data):
+        with span("generate_report", category="report", report=report) as s:
+            cache = get_artifact_cache()
+            if cache is None:
+                return func(validated_data)
+
+            data_version = _data_version(report, validated_data)
+            key = cache.make_key(report, validated_data=validated_data, code_version=code_version(),
+                                 data_version=data_version)
+            with _BUILD_LOCKS_LOCK:
+                build_lock = _BUILD_LOCKS.setdefault(key, [threading.Lock(), 0])
+                build_lock[1] += 1
+
+            try:
+                with build_lock[0]:
+                    artifact = cache.get(key)
+                    if artifact is not None:
+                        s.set(cached=True)
+                        return artifact
+
+                    report_stream, filename = func(validated_data)
+                    # Without a data version token a restatement would go unnoticed, so the report expires
+                    as_of_date = None
+                    if data_version is not None:
+                        as_of_date = find_as_of_date(list(validated_data.model_dump().values()))
+                    if isinstance(report_stream, BytesIO):
+                        cache.put(key, report_stream, filename, as_of_date=as_of_date)
+                    elif hasattr(report_stream, "artifact_key"):
+                        report_stream.artifact_cache = cache
+                        report_stream.artifact_key = key
+                        report_stream.as_of_date = as_of_date
+                    return report_stream, filename
+            finally:
+                with _BUILD_LOCKS_LOCK:
+                    build_lock[1] -= 1
+                    if build_lock[1] == 0:
+                        del _BUILD_LOCKS[key]
+
+    return cached_generate_report
@@ -0,0 +1,80 @@
+"""As-of dates of cached data.
+
+Shared by the result cache (UTILITIES_TO_REMOVE.cache) and the compiled report cache (utils.artifact_cache), which
+keep data for a historical month-end past the time-to-live.
+"""
+
+from collections.abc import Iterator
+from datetime import date, datetime
+
+from pandas.tseries import offsets
+
+
+def is_historical_month_end(as_of_date: date | None, today: date | None = None) -> bool:
+    """
+    True if the date is the last business day (or last day) of a month before the current month.
+
+    Args:
+        as_of_date (Optional[date]): The date to check.
+        today (Optional[date]): The current date, by default date.today().
+
+    Returns
+    -------
+        bool
+    """
+    if as_of_date is None:
+        return False
+
+    if today is None:
+        today = date.today()
+
+    if as_of_date >= today.replace(day=1):
+        return False
+
+    next_business_day = as_of_date + offsets.BusinessDay()
+    return next_business_day.month != as_of_date.month
+
+
+def _dates(values) -> Iterator[date]:
+    # The dates among the (nested) values, where strings in the format YYYY-MM-DD count as dates
+    stack = [values]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple, set)):
+            stack.extend(value)
+            continue
+
+        if isinstance(value, datetime):
+            yield value.date()
+        elif isinstance(value, date):
+            yield value
+        elif isinstance(value, str):
+            try:
+                yield datetime.strptime(value.strip(), "%Y-%m-%d").date()
+            except ValueError:
+                continue
+
+
+def find_as_of_date(values) -> date | None:
+    """Return the latest date among the (nested) values, where strings in the format YYYY-MM-DD count as dates."""
+    return max(_dates(values), default=None)
+
+
+def historical_as_of_date(values, today: date | None = None) -> date | None:
+    """
+    Return the latest date among the (nested) values if every one of them is a historical month-end, see
+    is_historical_month_end. Used for the as-of dates of cached data, which only never expires if all of it is
+    historical.
+
+    Args:
+        values: The dates, as dates or strings in the format YYYY-MM-DD.
+        today (Optional[date]): The current date, by default date.today().
+
+    Returns
+    -------
+        Optional[date]: The latest date, or None if there are no dates or one is not a historical month-end.
+    """
+    dates = list(_dates(values))
+    if not dates or not all(is_historical_month_end(d, today=today) for d in dates):
+        return None
+    return max(dates)
@@ -0,0 +1,153 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from io import BytesIO
+from types import ModuleType
+from typing import Iterable, Iterator, Optional, Tuple
+
+from models.base import BaseReportConfig
+from utils.tracing import Span, get_tracer, set_tracer, span, tracing
+from utils.report_compiler import CompilationRequest, deferred_compilation
+
+# Seconds between checks whether queued work has started, while a timeout is set
+POLL_INTERVAL = 0.05
+
+
+@dataclass
+class BatchJob:
+    """
+    A single report in a batch.
+
+    Args:
+        report (ModuleType): The report module, e.g. reports.credit_beta.report, exposing generate_report.
+        validated_data (BaseReportConfig): The validated ReportModel passed to generate_report.
+        name (Optional[str]): Label used when reporting errors, defaults to the module name.
+    """
+    report: ModuleType
+    validated_data: BaseReportConfig
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.name is None:
+            self.name = self.report.__name__
+
+
+@dataclass
+class BatchResult:
+    """
+    The outcome of a BatchJob. Either report_stream and filename are set, or error holds the exception raised by the
+    job (a TimeoutError if the job did not finish in time).
+    """
+    job: BatchJob
+    report_stream: Optional[BytesIO] = None
+    filename: Optional[str] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def _curate(job: BatchJob) -> Tuple[BytesIO | CompilationRequest, str, list[Span]]:
+    with span("batch_job", category="batch", job=job.name), deferred_compilation():
+        report_stream, filename = job.report.generate_report(job.validated_data)
+    return report_stream, filename, []
+
+
+def _compile(request: CompilationRequest, trace: bool = False,
+             memory: Optional[str] = None) -> Tuple[BytesIO, str, list[Span]]:
+    # The worker records spans only for the tracer of the batch, which adds them to its own
+    set_tracer(None)
+    if not trace:
+        return *request.compile(), []
+
+    with tracing(memory=memory) as tracer:
+        with span("compile", category="batch", filename=request.filename):
+            report_stream, filename = request.compile()
+    return report_stream, filename, tracer.spans
+
+
+def compile_reports(jobs: Iterable[BatchJob],
+                    curation_workers: int = 8,
+                    compilation_workers: Optional[int] = None,
+                    timeout: Optional[float] = None) -> Iterator[BatchResult]:
+    """
+    Generates a batch of reports and yields the results as they finish.
+
+    Data curation (generate_report up to compile_report) runs on a thread pool, as it is bound by the database and
+    the API. The workbook compilation runs on a process pool, as xlsxwriter is CPU bound. Reports that compile
+    directly with Report.CompileReport instead of compile_report are compiled on the curation thread.
+
+    A failing job does not stop the batch, its exception is returned on the BatchResult instead.
+
+    Args:
+        jobs (Iterable[BatchJob]): The reports to generate.
+        curation_workers (int): Number of threads used for data curation.
+        compilation_workers (Optional[int]): Number of processes used for compilation, defaults to the CPU count.
+        timeout (Optional[float]): Seconds each stage of a job, the curation and the compilation, may take once it
+            runs. Time spent queued for a free thread or process does not count. A job that times out is reported
+            with a TimeoutError. Note that a running thread or process cannot be interrupted, the result is only
+            abandoned.
+
+    While a tracer is active (see utils.tracing), the spans of the compilation processes are added to
+    it, so a Chrome trace of the batch shows a track per curation thread and compilation process.
+
+    Returns:
+        Iterator[BatchResult]: One result per job, in order of completion.
+    """
+    tracer = get_tracer()
+    curation_pool = ThreadPoolExecutor(max_workers=curation_workers, thread_name_prefix="curation")
+    # Spawn rather than fork, as the curation threads may hold database connections and locks.
+    compilation_pool = ProcessPoolExecutor(max_workers=compilation_workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+
+    # The job and stage of each future, and the time each future was first seen running
+    pending: dict[Future, Tuple[BatchJob, str]] = {}
+    started: dict[Future, float] = {}
+    try:
+        for job in jobs:
+            pending[curation_pool.submit(_curate, job)] = (job, "curation")
+
+        while pending:
+            wait_time = None
+            if timeout is not None:
+                now = time.monotonic()
+                for future in pending:
+                    if future not in started and future.running():
+                        started[future] = now
+                wait_times = [started[future] + timeout - now for future in pending if future in started]
+                if len(started) < len(pending):
+                    wait_times.append(POLL_INTERVAL)
+                wait_time = max(min(wait_times), 0)
+            done, _ = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                job, _ = pending.pop(future)
+                started.pop(future, None)
+                try:
+                    report_stream, filename, spans = future.result()
+                except Exception as e:
+                    yield BatchResult(job=job, error=e)
+                    continue
+
+                if spans:
+                    tracer.extend(spans)
+                if isinstance(report_stream, CompilationRequest):
+                    compilation = compilation_pool.submit(_compile, report_stream, trace=tracer is not None,
+                                                          memory=None if tracer is None else tracer.memory)
+                    pending[compilation] = (job, "compilation")
+                else:
+                    yield BatchResult(job=job, report_stream=report_stream, filename=filename)
+
+            now = time.monotonic()
+            for future, (job, stage) in list(pending.items()):
+                if future in started and now >= started[future] + timeout:
+                    future.cancel()
+                    del pending[future]
+                    del started[future]
+                    yield BatchResult(job=job, error=TimeoutError(
+                        f"The {stage} of {job.name} did not finish within {timeout} seconds."))
+    finally:
+        curation_pool.shutdown(wait=False, cancel_futures=True)
+        compilation_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,19 +1,79 @@
 import io
+import tempfile
+from collections.abc import Mapping
+from typing import Callable
+
 import xlsxwriter as xlsx
 from utils.excel.Format import Format, FormatSetting
 from utils.FileManagement import appendExtensionIfExists
 
 
+class FormatRegistry(Mapping):
+    """
+    The formats of a workbook by name. The names and properties are known up front, but a format is only added to
+    the workbook on its first lookup, so the setup cost scales with the formats a report uses. Formats with identical
+    properties, e.g. an ad-hoc format repeating a pre-defined one, share one workbook format.
+
+    Args:
+        Definitions: The properties of the pre-defined formats by name, e.g. utils.excel.Format.Format().__dict__.
+        AddFormat: Creates a format from its properties, e.g. xlsxwriter's Workbook.add_format.
+    """
+
+    def __init__(self, Definitions: dict, AddFormat: Callable[[dict], object]):
+        self.__Definitions = dict(Definitions)
+        self.__AddFormat = AddFormat
+        self.__Formats = {}
+        self.__FormatsByProperties = {}
+
+    def __getitem__(self, Key):
+        Fmt = self.__Formats.get(Key)
+        if Fmt is None:
+            Properties = self.__Definitions[Key]
+            PropertiesKey = tuple(sorted(Properties.items()))
+            Fmt = self.__FormatsByProperties.get(PropertiesKey)
+            if Fmt is None:
+                Fmt = self.__AddFormat(dict(Properties))
+                self.__FormatsByProperties[PropertiesKey] = Fmt
+            self.__Formats[Key] = Fmt
+        return Fmt
+
+    def __contains__(self, Key) -> bool:
+        return Key in self.__Definitions
+
+    def __iter__(self):
+        return iter(self.__Definitions)
+
+    def __len__(self) -> int:
+        return len(self.__Definitions)
+
+    def Add(self, Key, Properties: dict):
+        """Define (or redefine) a format, it is created on its first lookup."""
+        self.__Definitions[Key] = dict(Properties)
+        self.__Formats.pop(Key, None)
+
+
 class BaseWorkbook:
     def __init__(
-        self, Format: FormatSetting = FormatSetting.DEFAULT
+        self, Format: FormatSetting = FormatSetting.DEFAULT, ConstantMemory: bool = False
     ):
-        # Create a new Excel file in memory
+        """
+        Args:
+            Format: The format setting used for the pre-defined formats.
+            ConstantMemory: If True, xlsxwriter's constant_memory mode is used: each row is flushed to a temporary
+                file as soon as a later row is written, so memory stays flat however many rows are written. Rows must
+                then be written in order, BaseWorkSheet.InsertTableBody switches to row-major writing for this.
+                Cells written to an already flushed row are lost, so only use it for pages that append rows.
+        """
+        # Create a new Excel file in memory, or spill the rows to temporary files in constant memory mode
         self.output = io.BytesIO()
-        self.Workbook = xlsx.Workbook(self.output, {'in_memory': True})
-
-        # Add pre-defined formats
-        self.Format = {}
+        self.ConstantMemory = ConstantMemory
+        if self.ConstantMemory:
+            Options = {'constant_memory': True, 'tmpdir': tempfile.gettempdir()}
+        else:
+            Options = {'in_memory': True}
+        self.Workbook = xlsx.Workbook(self.output, Options)
+
+        # Register the pre-defined formats, they are added to the workbook when first used
         self.__addFormats(Fmt=Format)
 
     def __addFormats(self, Fmt: FormatSetting = FormatSetting.DEFAULT):
@@ -22,8 +82,7 @@ class BaseWorkbook:
         self.Workbook.formats[0].font_size = fmt.std_branding.FONT_SIZE
         self.Workbook.formats[0].font_color = fmt.std_branding.NORDIC_GREY_3
 
-        for key, item in fmt.__dict__.items():
-            self.Format[key] = self.Workbook.add_format(item)
+        self.Format = FormatRegistry(Definitions=fmt.__dict__, AddFormat=self.Workbook.add_format)
 
     def Add_WorkSheet(self, SheetName: str = None):
         self.Workbook.add_worksheet(SheetName)
@@ -35,7 +94,7 @@ class BaseWorkbook:
         return self.Workbook.add_chart(Options)
 
     def Add_AdHocFormat(self, format_key, format_dict):
-        self.Format[format_key] = self.Workbook.add_format(format_dict)
+        self.Format.Add(format_key, format_dict)
 
 
 
@@ -47,15 +106,16 @@ class BaseWorkbook:
 class BaseWorkbookLocal:
     def __init__(self,
                  FilePath:str = None,
-                 Format:FormatSetting = FormatSetting.DEFAULT):
+                 Format:FormatSetting = FormatSetting.DEFAULT,
+                 ConstantMemory:bool = False):
         # Ensure that you are not overriding an existing file.
         self.FilePath = appendExtensionIfExists(dst=FilePath)
 
-        # Instantiate the workbook.
-        self.Workbook = xlsx.Workbook(filename=self.FilePath)
+        # Instantiate the workbook. See BaseWorkbook for ConstantMemory.
+        self.ConstantMemory = ConstantMemory
+        self.Workbook = xlsx.Workbook(filename=self.FilePath, options={'constant_memory': ConstantMemory})
 
-        # Add pre-defined formats
-        self.Format = {}
+        # Register the pre-defined formats, they are added to the workbook when first used
         self.__addFormats(Fmt=Format)
 
     def __addFormats(self,
@@ -65,8 +125,7 @@ class BaseWorkbookLocal:
         self.Workbook.formats[0].font_size = fmt.std_branding.FONT_SIZE
         self.Workbook.formats[0].font_color = fmt.std_branding.NORDIC_GREY_3
 
-        for key, item in fmt.__dict__.items():
-            self.Format[key] = self.Workbook.add_format(item)
+        self.Format = FormatRegistry(Definitions=fmt.__dict__, AddFormat=self.Workbook.add_format)
 
     def Add_WorkSheet(self, SheetName:str = None):
         self.Workbook.add_worksheet(SheetName)
@@ -77,6 +136,8 @@ class BaseWorkbookLocal:
     def Add_Chart(self, Options:dict = None):
         return self.Workbook.add_chart(Options)
 
+    def Add_AdHocFormat(self, format_key, format_dict):
+        self.Format.Add(format_key, format_dict)
 
     def Close(self):
         self.Workbook.close()
@@ -1,6 +1,8 @@
 import datetime
 import decimal
+import math
 
+import numpy as np
 import pandas as pd
 import xlsxwriter as xlsx
 
@@ -35,7 +37,11 @@ class BaseWorkSheet:
         else:
             Type = f"{Type}_"
 
-        return self.Format.get(f"{Type}{CellFormat}", self.Format.get(f"{Type}DEFAULT"))
+        # Only look the fallback up when needed, as formats are added to the workbook on their first lookup
+        Key = f"{Type}{CellFormat}"
+        if Key in self.Format:
+            return self.Format[Key]
+        return self.Format.get(f"{Type}DEFAULT")
 
     def GetLocalRowCounters(self, Counter: str = None, RowNumber: int = None):
         if Counter is not None:
@@ -81,32 +87,111 @@ class BaseWorkSheet:
         RowNumber: int = 0,
         Format: dict = {},
         UpdatableRowCounter: str = None,
-        Type: str = None
+        Type: str = None,
+        BulkWrite: bool = True
     ):
+        """
+        Writes the body of a table column by column, or row by row if the workbook is in constant memory mode.
+
+        Args:
+            BulkWrite: If True, each column is converted to a list of native Python values once and written with the
+                typed writers, resolving the cell format once per column. If False, the legacy cell-by-cell path is
+                used. Both produce the same workbook. Ignored in constant memory mode, which always writes rows.
+        """
         LocalRowNumber = RowNumber
         #Type = "UNDERLINE"
 
-        for j in range(Dataframe.shape[1]):
-            FormatEle = Format.get(Dataframe.columns[j], "DEFAULT")
-            for i in range(Dataframe.shape[0]):
-                try:
-                    self.WorkSheet.write(
-                        i + LocalRowNumber,
-                        j + ColumnNumber,
-                        Dataframe.iloc[i, j],
-                        self.GetFormat(CellFormat=FormatEle, Type=Type),
-                    )
-                except:
-                    self.WorkSheet.write(
-                        i + LocalRowNumber,
-                        j + ColumnNumber,
-                        None,
-                        self.GetFormat(CellFormat=FormatEle, Type=Type),
-                    )
+        if self.Workbook.ConstantMemory:
+            self.__WriteRows(
+                RowNumber=LocalRowNumber,
+                ColumnNumber=ColumnNumber,
+                Dataframe=Dataframe,
+                CellFormats=[
+                    self.GetFormat(CellFormat=Format.get(Column, "DEFAULT"), Type=Type)
+                    for Column in Dataframe.columns
+                ],
+            )
+        elif BulkWrite:
+            for j in range(Dataframe.shape[1]):
+                FormatEle = Format.get(Dataframe.columns[j], "DEFAULT")
+                self.__WriteColumn(
+                    RowNumber=LocalRowNumber,
+                    ColumnNumber=j + ColumnNumber,
+                    Column=Dataframe.iloc[:, j],
+                    CellFormat=self.GetFormat(CellFormat=FormatEle, Type=Type),
+                )
+        else:
+            for j in range(Dataframe.shape[1]):
+                FormatEle = Format.get(Dataframe.columns[j], "DEFAULT")
+                for i in range(Dataframe.shape[0]):
+                    try:
+                        self.WorkSheet.write(
+                            i + LocalRowNumber,
+                            j + ColumnNumber,
+                            Dataframe.iloc[i, j],
+                            self.GetFormat(CellFormat=FormatEle, Type=Type),
+                        )
+                    except:
+                        self.WorkSheet.write(
+                            i + LocalRowNumber,
+                            j + ColumnNumber,
+                            None,
+                            self.GetFormat(CellFormat=FormatEle, Type=Type),
+                        )
 
         if UpdatableRowCounter is not None:
             self.UpdateRowCounters(Counter=UpdatableRowCounter, Add=Dataframe.shape[0])
 
+    @staticmethod
+    def __ColumnValues(Column: pd.Series) -> list:
+        # Numeric columns as floats, so booleans are written as numbers to match how numpy booleans are written by the
+        # cell-by-cell path.
+        if pd.api.types.is_numeric_dtype(Column.dtype) and not isinstance(Column.dtype, pd.CategoricalDtype):
+            return Column.to_numpy(dtype=float, na_value=np.nan).tolist()
+        return Column.tolist()
+
+    def __WriteColumn(self, RowNumber: int, ColumnNumber: int, Column: pd.Series, CellFormat=None):
+        # Numeric columns without NaN/inf can be handed to xlsxwriter in one call.
+        if pd.api.types.is_numeric_dtype(Column.dtype) and not isinstance(Column.dtype, pd.CategoricalDtype):
+            Values = Column.to_numpy(dtype=float, na_value=np.nan)
+            if np.isfinite(Values).all():
+                self.WorkSheet.write_column(RowNumber, ColumnNumber, Values.tolist(), CellFormat)
+                return
+
+        WriteValue = self.__WriteValue
+        for i, Value in enumerate(self.__ColumnValues(Column)):
+            WriteValue(i + RowNumber, ColumnNumber, Value, CellFormat)
+
+    def __WriteRows(self, RowNumber: int, ColumnNumber: int, Dataframe: pd.DataFrame, CellFormats: list):
+        # Row-major counterpart of __WriteColumn. In constant memory mode a row is flushed to disk as soon as a later
+        # row is written, so every row has to be complete before moving on.
+        Columns = [self.__ColumnValues(Dataframe.iloc[:, j]) for j in range(Dataframe.shape[1])]
+
+        WriteValue = self.__WriteValue
+        for i, Values in enumerate(zip(*Columns)):
+            Row = i + RowNumber
+            for j, Value in enumerate(Values):
+                WriteValue(Row, j + ColumnNumber, Value, CellFormats[j])
+
+    def __WriteValue(self, Row: int, Column: int, Value, CellFormat=None):
+        ValueType = Value.__class__
+        if ValueType is float:
+            # NaN and inf cannot be written without the 'nan_inf_to_errors' option, leave them blank.
+            if math.isfinite(Value):
+                self.WorkSheet.write_number(Row, Column, Value, CellFormat)
+            else:
+                self.WorkSheet.write_blank(Row, Column, None, CellFormat)
+        elif ValueType is int:
+            self.WorkSheet.write_number(Row, Column, Value, CellFormat)
+        elif Value is None:
+            self.WorkSheet.write_blank(Row, Column, None, CellFormat)
+        else:
+            # Strings go through write() to keep formula/url handling, everything else falls back to a blank cell.
+            try:
+                self.WorkSheet.write(Row, Column, Value, CellFormat)
+            except:
+                self.WorkSheet.write_blank(Row, Column, None, CellFormat)
+
     def InsertTableTotal(
         self,
         Dataframe: pd.DataFrame = None,
@@ -1,13 +1,15 @@
 import os
 import tempfile
 from io import BytesIO
-import subprocess
 from typing import Optional
 
 import xlwings as xw
 
+from utils.tracing import span
 from utils.excel.ExcelBase import BaseWorkbook, BaseWorkbookLocal
 from utils.excel.Format import FormatSetting
+from utils.libreoffice_pool import convert_to_pdf
+from utils.pdf.PdfWorkbook import PdfWorkbook
 
 
 class Report:
@@ -16,78 +18,49 @@ class Report:
             Data: dict = None,
             Sheets: dict = None,
             Format: FormatSetting = FormatSetting.DEFAULT,
+            ConstantMemory: bool = False,
+            NativePDF: bool = False,
     ):
-        self.Workbook = BaseWorkbook(Format=Format)
-        self.Data = Data
-        self.Sheets = Sheets
-
-    def __ConvertToPDF_LibreOffice(self, input_file, output_dir="."):
         """
-        Converts the given input file to a PDF using LibreOffice in headless mode.
-
         Args:
-            input_file (str): The path to the input file (e.g., an .xlsx file).
-            output_dir (str): The directory where the output PDF will be saved.
-
-        Returns:
-            str: The path to the converted PDF file or raises an error.
+            NativePDF: If True, CompilePDFReport renders the pages straight to PDF with reportlab (see PdfWorkbook)
+                instead of converting the workbook with LibreOffice or Excel. Charts are not rendered.
         """
-        if not os.path.isfile(input_file):
-            raise FileNotFoundError(f"Input file '{input_file}' does not exist.")
-
-        try:
-            # Run the LibreOffice command using subprocess
-            subprocess.run(
-                [
-                    "libreoffice",
-                    "--headless",
-                    "--convert-to", "pdf:calc_pdf_Export",
-                    "--outdir", output_dir,
-                    input_file
-                ],
-                check=True
-            )
-
-            # Construct the output file path
-            output_file = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file))[0] + ".pdf")
-
-            # Check if the conversion was successful
-            if os.path.isfile(output_file):
-                return output_file
-            else:
-                raise RuntimeError("Conversion failed. Output file not found.")
-
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Error while converting file: {e}")
-        except Exception as e:
-            raise RuntimeError(f"An error occurred: {e}")
+        self.Workbook = BaseWorkbook(Format=Format, ConstantMemory=ConstantMemory)
+        self.Format = Format
+        self.ConstantMemory = ConstantMemory
+        self.NativePDF = NativePDF
+        self.Data = Data
+        self.Sheets = Sheets
 
-    def ReportToPDF(self, temp_xlsx_path):
+    def ReportToPDF(self, temp_xlsx_path: str = None, WorkbookBytes: bytes = None):
         """
         Compiles the report to a PDF file. Different methods are used depending on the environment.
         LibreOffice is used when running in the Adalab environment, while xlwings is used locally.
+
+        Args:
+            temp_xlsx_path (str): Path of the workbook. Required for xlwings.
+            WorkbookBytes (bytes): The workbook, used instead of reading temp_xlsx_path with LibreOffice.
         """
         if os.environ["ENV"].lower() == 'adalab':
-            # Convert the Excel file to PDF using LibreOffice
-            temp_pdf_path = self.__ConvertToPDF_LibreOffice(temp_xlsx_path)
-
-            # Open the converted PDF file for streaming response
-            with open(temp_pdf_path, "rb") as pdf_file:
-                pdf_bytes = pdf_file.read()
-
-            # Clean up the temporary files
-            os.remove(temp_pdf_path)
+            # Convert the Excel file to PDF on the warm LibreOffice pool (see utils.libreoffice_pool)
+            if WorkbookBytes is None:
+                with open(temp_xlsx_path, "rb") as xlsx_file:
+                    WorkbookBytes = xlsx_file.read()
+            with span("pdf_conversion", category="excel", converter="libreoffice"):
+                pdf_bytes = convert_to_pdf(WorkbookBytes)
 
         else:
             """Compiles the report to a PDF file using xlwings."""
-            with tempfile.TemporaryDirectory() as tmpdirname:
-                temp_pdf_path = os.path.join(tmpdirname, "output.pdf")
-                with xw.App(visible=False) as app:
-                    book = app.books.open(temp_xlsx_path)
-                    book.api.ExportAsFixedFormat(Type=0, Filename=temp_pdf_path)
-                    book.close()
-                with open(temp_pdf_path, "rb") as pdf_file:
-                    pdf_bytes = pdf_file.read()
+            with span("pdf_conversion", category="excel", converter="xlwings"):
+                with tempfile.TemporaryDirectory() as tmpdirname:
+                    temp_pdf_path = os.path.join(tmpdirname, "output.pdf")
+                    with xw.App(visible=False) as app:
+                        book = app.books.open(temp_xlsx_path)
+                        book.api.ExportAsFixedFormat(Type=0, Filename=temp_pdf_path)
+                        book.close()
+                    with open(temp_pdf_path, "rb") as pdf_file:
+                        pdf_bytes = pdf_file.read()
 
         return BytesIO(pdf_bytes)
 
@@ -95,24 +68,24 @@ class Report:
         if self.Workbook.output.getbuffer().nbytes > 0:
             return self.Workbook.output
         else:
-            for Name, WorkSheetClass in self.Sheets.items():
-                Data = self.Data.get(Name, None)
-                self.Workbook.Add_WorkSheet(SheetName=Name)
-                wsc = WorkSheetClass(Workbook=self.Workbook, SheetName=Name, Data=Data)
-                wsc.AttributeSheet()
-            self.Workbook.Close()
+            self.__AttributeSheets(Workbook=self.Workbook)
             return self.Workbook.output
 
     def CompilePDFReport(self):
+        if self.NativePDF:
+            # Rendered without an office suite, the xlsxwriter workbook is not used
+            Workbook = PdfWorkbook(Format=self.Format)
+            self.__AttributeSheets(Workbook=Workbook)
+            return Workbook.output
+
         if self.Workbook.output.getbuffer().nbytes == 0:
-            for Name, WorkSheetClass in self.Sheets.items():
-                Data = self.Data.get(Name, None)
-                self.Workbook.Add_WorkSheet(SheetName=Name)
-                wsc = WorkSheetClass(Workbook=self.Workbook, SheetName=Name, Data=Data)
-                wsc.AttributeSheet()
-            self.Workbook.Close()
+            self.__AttributeSheets(Workbook=self.Workbook)
+
+        # LibreOffice converts the workbook from memory
+        if os.environ["ENV"].lower() == 'adalab':
+            return self.ReportToPDF(WorkbookBytes=self.Workbook.output.getvalue())
 
-        # Since the workbook is in memory, save it to a temporary file first
+        # xlwings needs the workbook on disk, so save it to a temporary file first
         with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
             temp_xlsx_path = tmp.name
         with open(temp_xlsx_path, "wb") as f:
@@ -125,6 +98,15 @@ class Report:
 
         return pdf_stream
 
+    def __AttributeSheets(self, Workbook):
+        for Name, WorkSheetClass in self.Sheets.items():
+            Data = self.Data.get(Name, None)
+            with span("AttributeSheet", category="excel", sheet=Name, page=WorkSheetClass.__name__):
+                Workbook.Add_WorkSheet(SheetName=Name)
+                wsc = WorkSheetClass(Workbook=Workbook, SheetName=Name, Data=Data)
+                wsc.AttributeSheet()
+        with span("Workbook.Close", category="excel", workbook=type(Workbook).__name__):
+            Workbook.Close()
 
 
 class ReportOfReports(Report):
@@ -150,9 +132,11 @@ class ReportLocal:
                  FilePath:str,
                  Data:dict = None,
                  Sheets:dict = None,
-                 Format:FormatSetting = FormatSetting.DEFAULT):
+                 Format:FormatSetting = FormatSetting.DEFAULT,
+                 ConstantMemory:bool = False):
         self.Workbook = BaseWorkbookLocal(FilePath=FilePath,
-                                          Format=Format)
+                                          Format=Format,
+                                          ConstantMemory=ConstantMemory)
         self.Data = Data
         self.Sheets = Sheets
 
@@ -169,19 +153,22 @@ class ReportLocal:
             else:
                 PDF_FilePath = filename + ".pdf"
 
-        with xw.App(visible=False) as app:
-            book = app.books.open(fullname=self.FilePath)
-            book.api.ExportAsFixedFormat(Type=0, Filename=PDF_FilePath)
-            book.close()
+        with span("pdf_conversion", category="excel", converter="xlwings"):
+            with xw.App(visible=False) as app:
+                book = app.books.open(fullname=self.FilePath)
+                book.api.ExportAsFixedFormat(Type=0, Filename=PDF_FilePath)
+                book.close()
 
     def CompileReport(self, ExportToPDF:bool = False):
         for Name, WorkSheetClass in self.Sheets.items():
             Data = self.Data.get(Name, None)
-            self.Workbook.Add_WorkSheet(SheetName=Name)
-            wsc = WorkSheetClass(Workbook=self.Workbook, SheetName=Name, Data=Data)
-            wsc.AttributeSheet()
+            with span("AttributeSheet", category="excel", sheet=Name, page=WorkSheetClass.__name__):
+                self.Workbook.Add_WorkSheet(SheetName=Name)
+                wsc = WorkSheetClass(Workbook=self.Workbook, SheetName=Name, Data=Data)
+                wsc.AttributeSheet()
 
-        self.Workbook.Close()
+        with span("Workbook.Close", category="excel", workbook=type(self.Workbook).__name__):
+            self.Workbook.Close()
 
         if ExportToPDF:
             self.ReportToPDF()
@@ -0,0 +1,443 @@
+import abc
+import atexit
+import functools
+import importlib.util
+import logging
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BINARY = "libreoffice"
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 120.0
+STARTUP_TIMEOUT = 60.0
+
+
+def _kill(process: subprocess.Popen):
+    # The process is the leader of its own process group, which also holds the soffice.bin it started.
+    if process.poll() is not None:
+        return
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _unoserver_path() -> Optional[str]:
+    # The directory holding the unoserver package of this environment, put on the path of the UNO Python
+    spec = importlib.util.find_spec("unoserver")
+    if spec is None or spec.origin is None:
+        return None
+    return os.path.dirname(os.path.dirname(spec.origin))
+
+
+def _python_environment() -> dict:
+    environment = dict(os.environ)
+    path = _unoserver_path()
+    if path is not None:
+        environment["PYTHONPATH"] = os.pathsep.join(filter(None, [path, environment.get("PYTHONPATH")]))
+    return environment
+
+
+@functools.lru_cache(maxsize=None)
+def find_uno_python(binary: str = DEFAULT_BINARY) -> Optional[str]:
+    """
+    Find a Python that can import the UNO bindings and unoserver, to run the unoserver processes of the pool. The
+    bindings ship with LibreOffice and are not a pip dependency: official LibreOffice builds bundle a Python next to
+    the executable, Linux distributions package them for the system Python (e.g. python3-uno). unoserver is taken from
+    this environment if the UNO Python does not have it.
+
+    The candidates are LIBREOFFICE_PYTHON, the Python bundled with the LibreOffice executable, this Python and
+    python3, in that order.
+
+    Args:
+        binary (str): The LibreOffice executable.
+
+    Returns
+    -------
+        Optional[str]: The Python executable, or None if no candidate can import both.
+    """
+    candidates = [os.environ.get("LIBREOFFICE_PYTHON")]
+    executable = shutil.which(binary)
+    if executable is not None:
+        program = os.path.dirname(os.path.realpath(executable))
+        candidates += [os.path.join(program, "python"), os.path.join(program, "python.exe")]
+    candidates += [sys.executable, shutil.which("python3")]
+
+    environment = _python_environment()
+    for candidate in candidates:
+        if not candidate or not os.path.isfile(candidate):
+            continue
+        try:
+            result = subprocess.run([candidate, "-c", "import uno, unoserver.server"], env=environment,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=STARTUP_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        if result.returncode == 0:
+            return candidate
+    return None
+
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    # The XML-RPC transport has no timeout of its own
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class _Worker(abc.ABC):
+    """A LibreOffice installation profile, owned by one conversion at a time."""
+
+    def __init__(self, binary: str):
+        self.binary = binary
+        self.profile = tempfile.mkdtemp(prefix="lumo-libreoffice-")
+
+    @property
+    @abc.abstractmethod
+    def running(self) -> bool:
+        """True if the worker can convert without being started."""
+
+    @abc.abstractmethod
+    def start(self):
+        """Start the worker, replacing a stopped one."""
+
+    @abc.abstractmethod
+    def convert(self, data: bytes, filter_name: str, suffix: str, timeout: float) -> bytes:
+        """Convert the document with the LibreOffice export filter, returning the converted document."""
+
+    @abc.abstractmethod
+    def stop(self):
+        """Stop the worker, keeping its profile."""
+
+    def remove(self):
+        self.stop()
+        shutil.rmtree(self.profile, ignore_errors=True)
+
+
+class _UnoserverWorker(_Worker):
+    """
+    A unoserver process keeping one headless LibreOffice running. Documents are sent to it over XML-RPC and converted
+    in memory, so a conversion neither starts LibreOffice nor writes temporary files.
+    """
+
+    def __init__(self, binary: str, python: str):
+        super().__init__(binary=binary)
+        self.python = python
+        self.process: Optional[subprocess.Popen] = None
+        self.url: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None and self.url is not None
+
+    def __proxy(self, timeout: float) -> xmlrpc.client.ServerProxy:
+        return xmlrpc.client.ServerProxy(self.url, transport=_TimeoutTransport(timeout), allow_none=True)
+
+    def start(self):
+        self.stop()
+        port = _free_port()
+        uno_port = _free_port()
+        while uno_port == port:
+            uno_port = _free_port()
+
+        self.process = subprocess.Popen(
+            [
+                self.python, "-m", "unoserver.server",
+                "--interface", "127.0.0.1",
+                "--port", str(port),
+                "--uno-port", str(uno_port),
+                "--user-installation", self.profile,
+                "--executable", self.binary,
+                "--quiet",
+            ],
+            env=_python_environment(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+        self.url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                self.__proxy(timeout=5).info()
+                return
+            except (OSError, xmlrpc.client.Error):
+                if self.process.poll() is not None:
+                    returncode = self.process.returncode
+                    self.stop()
+                    raise RuntimeError(f"unoserver exited with code {returncode} during startup.")
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise TimeoutError(f"unoserver did not accept connections within {STARTUP_TIMEOUT} seconds.")
+                time.sleep(0.25)
+
+    def convert(self, data: bytes, filter_name: str, suffix: str, timeout: float) -> bytes:
+        try:
+            result = self.__proxy(timeout=timeout).convert(
+                None, xmlrpc.client.Binary(data), None, "pdf", filter_name, [], True, None
+            )
+        except TimeoutError:
+            # The conversion cannot be cancelled, so LibreOffice is killed with its unoserver
+            self.stop()
+            raise TimeoutError(f"The conversion did not finish within {timeout:.0f} seconds.")
+        return result.data
+
+    def stop(self):
+        self.url = None
+        if self.process is not None:
+            _kill(self.process)
+            self.process = None
+
+
+def convert_with_command_line(data: bytes, filter_name: str = "calc_pdf_Export", suffix: str = ".xlsx",
+                              timeout: float = DEFAULT_TIMEOUT, binary: str = DEFAULT_BINARY) -> bytes:
+    """
+    Convert a document to PDF with one libreoffice --convert-to call, which starts and stops LibreOffice. Used when
+    no Python with the UNO bindings is found, see find_uno_python.
+
+    Args:
+        data (bytes): The document, e.g. an xlsx workbook.
+        filter_name (str): The LibreOffice export filter.
+        suffix (str): File extension of the document.
+        timeout (float): Seconds the conversion may take.
+        binary (str): The LibreOffice executable.
+
+    Returns
+    -------
+        bytes: The PDF.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, f"document{suffix}")
+        with open(input_path, "wb") as f:
+            f.write(data)
+
+        # A profile of its own, so the call does not wait on the lock of a profile in use
+        process = subprocess.Popen(
+            [binary, "--headless", "--norestore", f"-env:UserInstallation={Path(directory, 'profile').as_uri()}",
+             "--convert-to", f"pdf:{filter_name}", "--outdir", directory, input_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            raise TimeoutError(f"The conversion did not finish within {timeout:.0f} seconds.")
+
+        output_path = os.path.join(directory, "document.pdf")
+        if process.returncode != 0 or not os.path.isfile(output_path):
+            raise RuntimeError(f"Conversion failed with exit code {process.returncode}.")
+        with open(output_path, "rb") as f:
+            return f.read()
+
+
+class LibreOfficePool:
+    """
+    A pool of warm headless LibreOffice processes converting documents to PDF.
+
+    Starting LibreOffice takes seconds, so the processes are started once and reused: each worker is a unoserver
+    process holding a LibreOffice with its own profile. Conversions queue for a free worker. A conversion that fails
+    or exceeds the timeout kills its worker, which is restarted in the background before it takes new work. A failed
+    conversion is retried once on the restarted worker, a timed out one is not.
+
+    Args:
+        workers (int): Number of LibreOffice processes.
+        timeout (float): Default seconds a conversion may take, including the wait for a free worker.
+        binary (str): The LibreOffice executable.
+        python (Optional[str]): The Python running unoserver, by default found with find_uno_python.
+
+    Raises
+    ------
+        RuntimeError: If no Python with the UNO bindings and unoserver is found.
+
+    Examples
+    --------
+        pool = LibreOfficePool(workers=2)
+        pool.start()
+        pdf_bytes = pool.convert(report.Workbook.output.getvalue())
+        pool.close()
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT, binary: str = DEFAULT_BINARY,
+                 python: Optional[str] = None):
+        self.timeout = timeout
+        self.closed = False
+
+        python = python or find_uno_python(binary)
+        if python is None:
+            raise RuntimeError("No Python with the UNO bindings and unoserver was found, set LIBREOFFICE_PYTHON.")
+        self.__workers = [_UnoserverWorker(binary=binary, python=python) for _ in range(workers)]
+        self.__idle = queue.Queue()
+        for worker in self.__workers:
+            self.__idle.put(worker)
+
+    def start(self):
+        """Start all idle workers in parallel, so the first conversions do not pay the startup time."""
+        workers = []
+        while True:
+            try:
+                workers.append(self.__idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            self.__release(worker)
+
+    def convert(self, data: bytes, filter_name: str = "calc_pdf_Export", suffix: str = ".xlsx",
+                timeout: Optional[float] = None) -> bytes:
+        """
+        Convert a document to PDF.
+
+        Args:
+            data (bytes): The document, e.g. an xlsx workbook.
+            filter_name (str): The LibreOffice export filter.
+            suffix (str): File extension of the document, unused by the pool.
+            timeout (Optional[float]): Seconds the conversion may take, including the wait for a free worker.
+
+        Returns
+        -------
+            bytes: The PDF.
+        """
+        if self.closed:
+            raise RuntimeError("The LibreOffice pool is closed.")
+
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self.__idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No LibreOffice worker became available within {timeout:.0f} seconds.")
+
+        try:
+            for attempt in range(2):
+                try:
+                    if not worker.running:
+                        worker.start()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"The conversion did not finish within {timeout:.0f} seconds.")
+                    return worker.convert(data=data, filter_name=filter_name, suffix=suffix, timeout=remaining)
+                except TimeoutError:
+                    worker.stop()
+                    raise
+                except Exception as e:
+                    worker.stop()
+                    if attempt == 1:
+                        raise RuntimeError(f"LibreOffice failed to convert the document: {e}") from e
+        finally:
+            self.__release(worker)
+
+    def __release(self, worker: _Worker):
+        # Return the worker to the queue, restarting it in the background first if it is not running.
+        if self.closed:
+            worker.remove()
+            return
+        if worker.running:
+            self.__idle.put(worker)
+            return
+
+        def restart():
+            try:
+                worker.start()
+            except Exception as e:
+                logger.warning("LibreOffice worker failed to start, it is retried on its next conversion: %s", e)
+            if self.closed:
+                worker.remove()
+            else:
+                self.__idle.put(worker)
+
+        threading.Thread(target=restart, name="libreoffice-start", daemon=True).start()
+
+    def close(self):
+        """Stop all workers and remove their profiles."""
+        self.closed = True
+        for worker in self.__workers:
+            worker.remove()
+
+
+_POOL = None
+_POOL_CONFIGURED = False
+_POOL_LOCK = threading.Lock()
+
+
+def get_converter_pool() -> Optional[LibreOfficePool]:
+    """
+    Return the process-wide LibreOffice pool, started on first use. The size and the timeout are read from
+    LIBREOFFICE_POOL_SIZE and LIBREOFFICE_TIMEOUT (seconds), the executable from LIBREOFFICE_BINARY.
+
+    Returns
+    -------
+        Optional[LibreOfficePool]: The pool, or None if no Python with the UNO bindings and unoserver is found.
+    """
+    global _POOL, _POOL_CONFIGURED
+    with _POOL_LOCK:
+        if not _POOL_CONFIGURED:
+            _POOL_CONFIGURED = True
+            binary = os.environ.get("LIBREOFFICE_BINARY", DEFAULT_BINARY)
+            python = find_uno_python(binary)
+            if python is None:
+                logger.warning("No Python with the UNO bindings and unoserver was found, LibreOffice is started for "
+                               "every conversion. Set LIBREOFFICE_PYTHON to use the pool.")
+                return None
+
+            _POOL = LibreOfficePool(
+                workers=int(os.environ.get("LIBREOFFICE_POOL_SIZE", DEFAULT_WORKERS)),
+                timeout=float(os.environ.get("LIBREOFFICE_TIMEOUT", DEFAULT_TIMEOUT)),
+                binary=binary,
+                python=python,
+            )
+            _POOL.start()
+            atexit.register(_POOL.close)
+
+        return _POOL
+
+
+def convert_to_pdf(data: bytes, filter_name: str = "calc_pdf_Export", suffix: str = ".xlsx") -> bytes:
+    """
+    Convert a document to PDF on the process-wide pool, or with convert_with_command_line if there is no pool.
+
+    Args:
+        data (bytes): The document, e.g. an xlsx workbook.
+        filter_name (str): The LibreOffice export filter.
+        suffix (str): File extension of the document.
+
+    Returns
+    -------
+        bytes: The PDF.
+    """
+    pool = get_converter_pool()
+    if pool is None:
+        return convert_with_command_line(
+            data, filter_name=filter_name, suffix=suffix,
+            timeout=float(os.environ.get("LIBREOFFICE_TIMEOUT", DEFAULT_TIMEOUT)),
+            binary=os.environ.get("LIBREOFFICE_BINARY", DEFAULT_BINARY),
+        )
+    return pool.convert(data, filter_name=filter_name, suffix=suffix)
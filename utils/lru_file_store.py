@@ -0,0 +1,178 @@
+"""Size-bounded on-disk file store.
+
+Base class of the on-disk caches (UTILITIES_TO_REMOVE.cache.ResultCache and utils.artifact_cache.ArtifactCache). Every
+entry is one file in the directory, named by its key, with a row in a small SQLite index holding its size, expiry,
+last access and the extra columns of the subclass. Entries expire after the time-to-live, except those stored with a
+historical month-end as-of date, and the least recently used entries are evicted once the files exceed max_bytes.
+
+The subclasses serialize the values: they write a file to temp_path(key) and add it with _add, and read the file at
+_path(key) after a successful _lookup.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from utils.as_of_dates import is_historical_month_end
+
+
+class LruFileStore:
+    """
+    Files with a SQLite index and least-recently-used eviction.
+
+    Subclasses set TABLE, the name of the index table, SUFFIX, the extension of the files, and COLUMNS, the names of
+    the extra text columns stored with every entry.
+    """
+
+    TABLE = "entries"
+    SUFFIX = ".bin"
+    COLUMNS = ()
+
+    def __init__(self, directory: str, max_bytes: int, ttl: timedelta):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.__index_path = os.path.join(self.directory, "index.sqlite")
+
+        os.makedirs(self.directory, exist_ok=True)
+        columns = "".join(f"{column} TEXT NOT NULL, " for column in self.COLUMNS)
+        with self._connect() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                f"key TEXT PRIMARY KEY, {columns}size INTEGER NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE}_last_access ON {self.TABLE} (last_access)"
+            )
+
+    def __reduce__(self):
+        # Pickled by its settings, e.g. to store results of a spawned process in the same directory
+        return type(self), (self.directory, self.max_bytes, self.ttl)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Commit on success and always close, the connection is not shared between threads
+        connection = sqlite3.connect(self.__index_path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def _temp_path(self, key: str) -> str:
+        return f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _lookup(self, key: str) -> tuple | None:
+        """
+        Look an entry up and mark it as used. A missing or expired entry is counted as a miss, the subclass counts the
+        outcome of reading the file with _count.
+
+        Returns
+        -------
+            tuple | None: The values of COLUMNS, or None if the key is missing or has expired.
+        """
+        now = time.time()
+        columns = "".join(f"{column}, " for column in self.COLUMNS)
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                f"SELECT {columns}expires_at FROM {self.TABLE} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or not os.path.isfile(self._path(key)):
+                self.misses += 1
+                return None
+
+            if row[-1] is not None and row[-1] <= now:
+                connection.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+                self._remove_file(key)
+                self.misses += 1
+                return None
+
+            connection.execute(f"UPDATE {self.TABLE} SET last_access = ? WHERE key = ?", (now, key))
+
+        return row[:-1]
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _add(self, key: str, temp_path: str, as_of_date: date | None = None, **columns: str):
+        """
+        Move a file written to temp_path(key) into the store and evict entries if needed.
+
+        Args:
+            key (str): The key of the entry.
+            temp_path (str): The written file, see _temp_path.
+            as_of_date (Optional[date]): The as-of date of data that never changes once published. Entries of a
+                historical month-end never expire, all others expire after the time-to-live.
+            **columns (str): The values of COLUMNS.
+        """
+        path = self._path(key)
+        os.replace(temp_path, path)
+
+        now = time.time()
+        expires_at = None if is_historical_month_end(as_of_date) else now + self.ttl.total_seconds()
+        names = ", ".join(("key", *self.COLUMNS, "size", "expires_at", "last_access"))
+        markers = ", ".join("?" * (len(self.COLUMNS) + 4))
+        values = (key, *(columns[column] for column in self.COLUMNS), os.path.getsize(path), expires_at, now)
+        with self._lock, self._connect() as connection:
+            connection.execute(f"INSERT OR REPLACE INTO {self.TABLE} ({names}) VALUES ({markers})", values)
+            self.__evict(connection)
+
+    def __evict(self, connection: sqlite3.Connection):
+        # Drop expired entries first, then the least recently used until the store fits within max_bytes
+        expired = connection.execute(
+            f"SELECT key FROM {self.TABLE} WHERE expires_at <= ?", (time.time(),)
+        ).fetchall()
+        for (key,) in expired:
+            connection.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+            self._remove_file(key)
+            self.evictions += 1
+
+        total_size = connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        for key, size in connection.execute(f"SELECT key, size FROM {self.TABLE} ORDER BY last_access").fetchall():
+            connection.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+            self._remove_file(key)
+            self.evictions += 1
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock, self._connect() as connection:
+            for (key,) in connection.execute(f"SELECT key FROM {self.TABLE}").fetchall():
+                self._remove_file(key)
+            connection.execute(f"DELETE FROM {self.TABLE}")
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters of this process, and the number and total size of the stored entries."""
+        with self._lock, self._connect() as connection:
+            entries, size = connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries, "bytes": size}
@@ -1,3 +1,5 @@
+from functools import lru_cache
+from typing import Iterable, Tuple
 from pypdf import PdfReader, PdfWriter
 import io
 from reportlab.pdfgen import canvas
@@ -5,6 +7,21 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import os
 
+FOOTER_FONT_PATH = "Roboto-Regular.ttf"
+FOOTER_FONT_SIZE = 8
+FOOTER_OFFSET = 20  # Position from the bottom of the page
+
+
+@lru_cache(maxsize=None)
+def footer_font() -> str:
+    """
+    Registers the footer font once per process and returns its name (Roboto or fallback to Helvetica).
+    """
+    if os.path.exists(FOOTER_FONT_PATH):
+        pdfmetrics.registerFont(TTFont("Roboto", FOOTER_FONT_PATH))
+        return "Roboto"
+    return "Helvetica"
+
 
 class PdfModifier:
     def __init__(self):
@@ -14,6 +31,9 @@ class PdfModifier:
         """
         Merges multiple PDFs and optionally adds page numbers as a footer on each page.
 
+        The pages are read once and written once. The page numbers are rendered up front into one overlay PDF, and
+        each page is stamped as it is appended.
+
         Args:
             paths (list[str]): List of file paths for PDFs to merge.
             output_path (str): Path to save the merged PDF.
@@ -22,30 +42,96 @@ class PdfModifier:
         if not paths or not output_path:
             raise ValueError("Paths and output path must be provided.")
 
-        # Step 1: Merge all pages into one document without page numbers
-        for path in paths:
-            with open(path, "rb") as pdf_file:
-                reader = PdfReader(pdf_file)
-                for page in reader.pages:
-                    self.writer.add_page(page)
-
-        # Step 2: If page numbers are requested, add them
-        if add_page_numbers:
-            # Create a BytesIO object for temporary in-memory storage
-            temp_output = io.BytesIO()
-            self.writer.write(temp_output)
-            temp_output.seek(0)
-
-            # Add footer page numbers using add_footer_page_number
-            numbered_output = self.add_footer_page_number(temp_output)
-
-            # Write the numbered output to the specified file
-            with open(output_path, "wb") as final_output:
-                final_output.write(numbered_output.read())
-        else:
-            # Directly save the merged PDF without page numbers
+        # The files are kept open until the merged PDF is written, as pypdf reads the page content lazily.
+        files = [open(path, "rb") for path in paths]
+        try:
+            pages = [page for pdf_file in files for page in PdfReader(pdf_file).pages]
+            self.__append_pages(pages=pages, add_page_numbers=add_page_numbers)
+
             with open(output_path, "wb") as merged_file:
                 self.writer.write(merged_file)
+        finally:
+            for pdf_file in files:
+                pdf_file.close()
+
+    def merge_pdf_streams(self, reports: Iterable[Tuple[io.BytesIO, str]], add_page_numbers: bool = False,
+                          bookmarks: bool = True) -> io.BytesIO:
+        """
+        Merges PDF streams, e.g. the (report_stream, filename) pairs returned by report_compiler.compile_report,
+        into a single PDF stream without writing them to disk.
+
+        The reports are consumed one at a time, but the merged document keeps every copied page until it is written,
+        so the memory used grows with the total size of the reports. Merge in batches when that is too large.
+
+        Args:
+            reports (Iterable[Tuple[BytesIO, str]]): The PDF streams and their filenames.
+            add_page_numbers (bool): If True, adds page numbers, counted over the merged document, as a footer.
+            bookmarks (bool): If True, adds an outline entry per report, titled by the filename without extension,
+                pointing at its first page.
+
+        Returns:
+            BytesIO: The merged PDF.
+        """
+        writer = PdfWriter()
+        page_count = 0
+        for report_stream, filename in reports:
+            if not filename.lower().endswith(".pdf"):
+                raise ValueError(f"{filename} is not a PDF. Compile the report with export_format='pdf'.")
+
+            report_stream.seek(0)
+            pages = list(PdfReader(report_stream).pages)
+            self.__append_pages(pages=pages, add_page_numbers=add_page_numbers, writer=writer,
+                                first_page_number=page_count + 1)
+
+            if bookmarks and pages:
+                writer.add_outline_item(os.path.splitext(filename)[0], page_count)
+            page_count += len(pages)
+
+        pdf_output = io.BytesIO()
+        writer.write(pdf_output)
+        pdf_output.seek(0)
+        return pdf_output
+
+    def __append_pages(self, pages: list, add_page_numbers: bool, writer: PdfWriter = None,
+                       first_page_number: int = 1):
+        writer = self.writer if writer is None else writer
+        if not add_page_numbers:
+            for page in pages:
+                writer.add_page(page)
+            return
+
+        overlay = self.create_page_number_overlay(
+            [(page.mediabox.width, page.mediabox.height) for page in pages], first_page_number=first_page_number
+        )
+        for page, overlay_page in zip(pages, overlay.pages):
+            writer.add_page(page).merge_page(overlay_page)
+
+    def create_page_number_overlay(self, page_sizes: list[tuple[float, float]], first_page_number: int = 1) -> PdfReader:
+        """
+        Renders the page numbers of a whole document into one overlay PDF, using a single canvas.
+
+        Args:
+            page_sizes (list[tuple[float, float]]): Width and height of each page.
+            first_page_number (int): The number printed on the first page.
+
+        Returns:
+            PdfReader: A PDF with one page per entry in page_sizes, holding only the centered page number.
+        """
+        packet = io.BytesIO()
+        can = canvas.Canvas(packet)
+        font = footer_font()
+
+        for i, (page_width, page_height) in enumerate(page_sizes):
+            can.setPageSize((page_width, page_height))
+            can.setFont(font, FOOTER_FONT_SIZE)
+            text = f"{i + first_page_number}"
+            x = (float(page_width) - can.stringWidth(text, font, FOOTER_FONT_SIZE)) / 2
+            can.drawString(x, FOOTER_OFFSET, text)
+            can.showPage()
+        can.save()
+
+        packet.seek(0)
+        return PdfReader(packet)
 
     def create_watermark(self, text: str, page_width: float, page_height: float) -> PdfReader:
         """
@@ -61,21 +147,14 @@ class PdfModifier:
         """
         packet = io.BytesIO()
         can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-
-        # Register and set font (Roboto or fallback to Helvetica)
-        font_path = "Roboto-Regular.ttf"
-        if os.path.exists(font_path):
-            pdfmetrics.registerFont(TTFont("Roboto", font_path))
-            can.setFont("Roboto", 8)
-        else:
-            can.setFont("Helvetica", 8)  # Fallback to Helvetica if Roboto is not available
+        font = footer_font()
+        can.setFont(font, FOOTER_FONT_SIZE)
 
         # Center the text at the bottom of the page
-        text_width = can.stringWidth(text, "Roboto" if os.path.exists(font_path) else "Helvetica", 8)
+        text_width = can.stringWidth(text, font, FOOTER_FONT_SIZE)
         x = (page_width - text_width) / 2
-        y = 20  # Position from the bottom of the page
 
-        can.drawString(x, y, text)
+        can.drawString(x, FOOTER_OFFSET, text)
         can.save()
 
         packet.seek(0)
@@ -95,7 +174,7 @@ class PdfModifier:
         # Check if input_pdf is a path (str) or a BytesIO object
         if isinstance(input_pdf, str):
             with open(input_pdf, "rb") as input_file:
-                reader = PdfReader(input_file)
+                reader = PdfReader(io.BytesIO(input_file.read()))
         elif isinstance(input_pdf, io.BytesIO):
             input_pdf.seek(0)
             reader = PdfReader(input_pdf)
@@ -103,12 +182,7 @@ class PdfModifier:
             raise ValueError("input_pdf must be a file path or a BytesIO object.")
 
         writer = PdfWriter()
-        num_pages = len(reader.pages)
-        for i in range(num_pages):
-            page = reader.pages[i]
-            watermark = self.create_watermark(f"{i + 1}", page.mediabox.width, page.mediabox.height)
-            page.merge_page(watermark.pages[0])
-            writer.add_page(page)
+        self.__append_pages(pages=list(reader.pages), add_page_numbers=True, writer=writer)
 
         # Output the numbered PDF
         if output_pdf:
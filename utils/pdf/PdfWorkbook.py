@@ -0,0 +1,945 @@
+import datetime
+import decimal
+import fractions
+import io
+import math
+import os
+import re
+import warnings
+from functools import lru_cache
+from typing import Optional
+
+from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfgen import canvas
+from xlsxwriter.format import Format as CellFormat
+from xlsxwriter.utility import datetime_to_excel_datetime, xl_cell_to_rowcol
+
+from utils.excel.ExcelBase import FormatRegistry
+from utils.excel.Format import Format, FormatSetting
+
+# Page sizes in points of the xlsxwriter paper indices used by the pages
+PAPER_SIZES = {1: (612.0, 792.0), 5: (612.0, 1008.0), 8: (841.89, 1190.55), 9: (595.28, 841.89)}
+
+DEFAULT_COLUMN_WIDTH = 8.43  # Characters
+DEFAULT_ROW_HEIGHT = 15.0  # Points
+DEFAULT_MARGINS = {"left": 0.7, "right": 0.7, "top": 0.75, "bottom": 0.75}  # Inches
+PIXEL = 0.75  # Points per pixel at 96 dpi
+CELL_PADDING = 2.0
+INDENT_WIDTH = 7.5
+LINE_SPACING = 1.2
+
+# Border style index: (line width, dash pattern). Style 6 is a double line.
+BORDER_STYLES = {
+    1: (0.5, None), 2: (1.0, None), 3: (0.5, [3, 1]), 4: (0.5, [1, 1]), 5: (1.5, None), 6: (0.5, None),
+    7: (0.25, None), 8: (1.0, [3, 1]), 9: (0.5, [3, 1, 1, 1]), 10: (1.0, [3, 1, 1, 1]), 11: (0.5, [3, 1, 1, 1, 1, 1]),
+    12: (1.0, [3, 1, 1, 1, 1, 1]), 13: (1.0, [3, 1, 1, 1]),
+}
+
+BUILTIN_NUM_FORMATS = {
+    0: "General", 1: "0", 2: "0.00", 3: "#,##0", 4: "#,##0.00", 9: "0%", 10: "0.00%", 11: "0.00E+00", 14: "mm-dd-yy",
+    15: "d-mmm-yy", 16: "d-mmm", 17: "mmm-yy", 22: "m/d/yy h:mm", 49: "@",
+}
+
+# The pages use Roboto, which is not one of the PDF standard fonts, so every font is rendered as Helvetica.
+FONTS = {
+    (False, False): "Helvetica", (True, False): "Helvetica-Bold", (False, True): "Helvetica-Oblique",
+    (True, True): "Helvetica-BoldOblique",
+}
+
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+
+class PdfWorkbook:
+    """
+    Renders pages written against the BaseWorkSheet API straight to PDF with reportlab, without an office suite.
+
+    Duck-types BaseWorkbook: the pages write their cells, merges, column widths, row heights and page setup to
+    PdfWorkSheet objects, which record the calls of the xlsxwriter worksheet API the pages use. Close lays the
+    recorded sheets out as Excel prints them (fit to page width, manual page breaks, hidden rows and sheets) and
+    writes the PDF to output.
+
+    Cells are rendered with their fills, borders, alignment, indent, wrapping and number formats. Text boxes and
+    images are drawn at their anchor cell. Charts, conditional formats, headers and footers are not rendered yet.
+    Formulas are not evaluated and render empty.
+
+    Args:
+        Format: The format setting used for the pre-defined formats.
+
+    Examples
+    --------
+        wb = PdfWorkbook()
+        wb.Add_WorkSheet(SheetName='Overview')
+        OverviewPage(Workbook=wb, SheetName='Overview', Data=Data).AttributeSheet()
+        wb.Close()
+        pdf_bytes = wb.output.getvalue()
+    """
+
+    def __init__(self, Format: FormatSetting = FormatSetting.DEFAULT):
+        self.output = io.BytesIO()
+        self.ConstantMemory = False
+        self.WorkSheets = []
+
+        # Register the pre-defined formats, they are created when first used
+        self.__addFormats(Fmt=Format)
+
+    def __addFormats(self, Fmt: FormatSetting = FormatSetting.DEFAULT):
+        fmt = Format(Format=Fmt)
+        self.DefaultFormat = CellFormat({"font_name": fmt.std_branding.FONT_NAME,
+                                         "font_size": fmt.std_branding.FONT_SIZE,
+                                         "font_color": fmt.std_branding.NORDIC_GREY_3})
+
+        self.Format = FormatRegistry(Definitions=fmt.__dict__, AddFormat=CellFormat)
+
+    def Add_WorkSheet(self, SheetName: str = None):
+        if SheetName is None:
+            SheetName = f"Sheet{len(self.WorkSheets) + 1}"
+        self.WorkSheets.append(PdfWorkSheet(name=SheetName))
+
+    def Get_WorkSheet(self, SheetName: str = None) -> Optional["PdfWorkSheet"]:
+        for WorkSheet in self.WorkSheets:
+            if WorkSheet.name == SheetName:
+                return WorkSheet
+        return None
+
+    def Add_Chart(self, Options: dict = None):
+        return _Chart(Options)
+
+    def Add_AdHocFormat(self, format_key, format_dict):
+        self.Format.Add(format_key, format_dict)
+
+    def Close(self):
+        can = canvas.Canvas(self.output, pageCompression=1)
+        for WorkSheet in self.WorkSheets:
+            if not WorkSheet.hidden:
+                _SheetRenderer(WorkSheet, self.DefaultFormat).render(can)
+        can.save()
+        self.output.seek(0)
+
+
+class _Chart:
+    """Stand-in for an xlsxwriter chart, accepting the chart calls of the pages. Charts are not rendered."""
+
+    def __init__(self, options: dict = None):
+        self.options = options
+
+    def __getattr__(self, name):
+        def ignore(*args, **kwargs):
+            return None
+
+        return ignore
+
+
+def _cell_args(method):
+    # Accept A1 notation for the first cell, like xlsxwriter's convert_cell_args
+    def cell_method(self, *args, **kwargs):
+        if args and isinstance(args[0], str):
+            row, col = xl_cell_to_rowcol(args[0])
+            args = (row, col) + args[1:]
+        return method(self, *args, **kwargs)
+
+    return cell_method
+
+
+def _range_args(method):
+    # Accept A1:B2 notation for a range, like xlsxwriter's convert_range_args
+    def range_method(self, *args, **kwargs):
+        if args and isinstance(args[0], str):
+            first, _, last = args[0].partition(":")
+            first_row, first_col = xl_cell_to_rowcol(first)
+            last_row, last_col = xl_cell_to_rowcol(last or first)
+            args = (first_row, first_col, last_row, last_col) + args[1:]
+        return method(self, *args, **kwargs)
+
+    return range_method
+
+
+def _column_args(method):
+    # Accept A:B notation for a column range, like xlsxwriter's convert_column_args
+    def column_method(self, *args, **kwargs):
+        if args and isinstance(args[0], str):
+            first, _, last = args[0].partition(":")
+            first_col = xl_cell_to_rowcol(first + "1")[1]
+            last_col = xl_cell_to_rowcol((last or first) + "1")[1]
+            args = (first_col, last_col) + args[1:]
+        return method(self, *args, **kwargs)
+
+    return column_method
+
+
+class PdfWorkSheet:
+    """
+    Records the xlsxwriter worksheet calls made by the pages. Values are validated like xlsxwriter does, e.g. NaN
+    raises in write_number, so the pages take the same code paths as with a real workbook.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cells = {}  # (row, col): (value, format), where value is a float, str, bool or None
+        self.merged = []  # (first_row, first_col, last_row, last_col)
+        self.column_widths = {}
+        self.column_formats = {}
+        self.hidden_columns = set()
+        self.row_heights = {}
+        self.row_formats = {}
+        self.hidden_rows = set()
+        self.objects = []  # (row, col, kind, data, options) of text boxes and images
+
+        self.hidden = False
+        self.paper = 9
+        self.landscape = False
+        self.margins = dict(DEFAULT_MARGINS)
+        self.fit_width = 0
+        self.fit_height = 0
+        self.print_scale = 100
+        self.area = None
+        self.h_breaks = set()
+        self.v_breaks = set()
+
+    # Cell data
+
+    @_cell_args
+    def write(self, row: int, col: int, *args):
+        token = args[0] if args else None
+        cell_format = args[1] if len(args) > 1 else None
+
+        if token is None:
+            return self.write_blank(row, col, token, cell_format)
+        if isinstance(token, bool):
+            return self.write_boolean(row, col, token, cell_format)
+        if isinstance(token, (int, float, decimal.Decimal, fractions.Fraction)):
+            return self.write_number(row, col, token, cell_format)
+        if isinstance(token, (datetime.datetime, datetime.date, datetime.time, datetime.timedelta)):
+            return self.write_datetime(row, col, token, cell_format)
+        if isinstance(token, str):
+            if token == "":
+                return self.write_blank(row, col, token, cell_format)
+            if token.startswith("=") or token.startswith("{="):
+                return self.write_formula(row, col, token, cell_format)
+            return self.write_string(row, col, token, cell_format)
+
+        try:
+            return self.write_number(row, col, float(token), cell_format)
+        except (TypeError, ValueError):
+            raise TypeError(f"Unsupported type {type(token)} in write()")
+
+    @_cell_args
+    def write_string(self, row: int, col: int, string: str, cell_format=None):
+        self.cells[(row, col)] = (str(string), cell_format)
+        return 0
+
+    @_cell_args
+    def write_number(self, row: int, col: int, number, cell_format=None):
+        if math.isnan(number) or math.isinf(number):
+            raise TypeError("NAN/INF not supported in write_number() without 'nan_inf_to_errors' Workbook() option")
+        self.cells[(row, col)] = (float(number), cell_format)
+        return 0
+
+    @_cell_args
+    def write_blank(self, row: int, col: int, blank=None, cell_format=None):
+        # Like xlsxwriter, a blank cell without a format is not written
+        if cell_format is not None:
+            self.cells[(row, col)] = (None, cell_format)
+        return 0
+
+    @_cell_args
+    def write_boolean(self, row: int, col: int, boolean: bool, cell_format=None):
+        self.cells[(row, col)] = (bool(boolean), cell_format)
+        return 0
+
+    @_cell_args
+    def write_datetime(self, row: int, col: int, date, cell_format=None):
+        self.cells[(row, col)] = (float(datetime_to_excel_datetime(date, False, True)), cell_format)
+        return 0
+
+    @_cell_args
+    def write_formula(self, row: int, col: int, formula: str, cell_format=None, value=0):
+        # Formulas are not evaluated, the cell keeps its format only
+        self.cells[(row, col)] = (None, cell_format)
+        return 0
+
+    @_cell_args
+    def write_column(self, row: int, col: int, data, cell_format=None):
+        for i, token in enumerate(data):
+            self.write(row + i, col, token, cell_format)
+        return 0
+
+    @_cell_args
+    def write_row(self, row: int, col: int, data, cell_format=None):
+        for j, token in enumerate(data):
+            self.write(row, col + j, token, cell_format)
+        return 0
+
+    @_range_args
+    def merge_range(self, first_row: int, first_col: int, last_row: int, last_col: int, data, cell_format=None):
+        if first_row == last_row and first_col == last_col:
+            warnings.warn("Can't merge single cell")
+            return -1
+        first_row, last_row = min(first_row, last_row), max(first_row, last_row)
+        first_col, last_col = min(first_col, last_col), max(first_col, last_col)
+
+        self.merged.append((first_row, first_col, last_row, last_col))
+        self.write(first_row, first_col, data, cell_format)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                if row != first_row or col != first_col:
+                    self.write_blank(row, col, "", cell_format)
+        return 0
+
+    @_cell_args
+    def insert_textbox(self, row: int, col: int, text: str, options: dict = None):
+        self.objects.append((row, col, "textbox", text, options or {}))
+        return 0
+
+    @_cell_args
+    def insert_image(self, row: int, col: int, filename: str, options: dict = None):
+        options = options or {}
+        if not options.get("image_data") and not os.path.exists(filename):
+            warnings.warn(f"Image file '{filename}' not found.")
+            return -1
+        self.objects.append((row, col, "image", filename, options))
+        return 0
+
+    @_cell_args
+    def insert_chart(self, row: int, col: int, chart, options: dict = None):
+        return 0
+
+    @_range_args
+    def conditional_format(self, first_row: int, first_col: int, last_row: int, last_col: int, options: dict = None):
+        return 0
+
+    # Rows and columns
+
+    @_column_args
+    def set_column(self, first_col: int, last_col: int, width: float = None, cell_format=None, options: dict = None):
+        options = options or {}
+        for col in range(first_col, last_col + 1):
+            if width is not None:
+                self.column_widths[col] = width
+            if cell_format is not None:
+                self.column_formats[col] = cell_format
+            if options.get("hidden"):
+                self.hidden_columns.add(col)
+            else:
+                self.hidden_columns.discard(col)
+        return 0
+
+    def set_row(self, row: int, height: float = None, cell_format=None, options: dict = None):
+        options = options or {}
+        if height is not None:
+            self.row_heights[row] = height
+        if cell_format is not None:
+            self.row_formats[row] = cell_format
+        if options.get("hidden") or height == 0:
+            self.hidden_rows.add(row)
+        else:
+            self.hidden_rows.discard(row)
+        return 0
+
+    # Page setup
+
+    def hide(self):
+        self.hidden = True
+
+    def set_paper(self, paper_size: int):
+        self.paper = paper_size
+
+    def set_landscape(self):
+        self.landscape = True
+
+    def set_portrait(self):
+        self.landscape = False
+
+    def set_margins(self, left: float = 0.7, right: float = 0.7, top: float = 0.75, bottom: float = 0.75):
+        self.margins = {"left": left, "right": right, "top": top, "bottom": bottom}
+
+    def fit_to_pages(self, width: int, height: int):
+        self.fit_width = width
+        self.fit_height = height
+
+    def set_print_scale(self, scale: int):
+        self.print_scale = scale
+
+    @_range_args
+    def print_area(self, first_row: int, first_col: int, last_row: int, last_col: int):
+        self.area = (first_row, first_col, last_row, last_col)
+        return 0
+
+    def set_h_pagebreaks(self, breaks: list):
+        self.h_breaks = set(breaks)
+
+    def set_v_pagebreaks(self, breaks: list):
+        self.v_breaks = set(breaks)
+
+    def set_header(self, header: str = "", options: dict = None, margin=None):
+        pass
+
+    def set_footer(self, footer: str = "", options: dict = None, margin=None):
+        pass
+
+    def outline_settings(self, visible: bool = True, symbols_below: bool = True, symbols_right: bool = True,
+                         auto_style: bool = False):
+        pass
+
+
+class _SheetRenderer:
+    """Lays a recorded sheet out on pages and draws it."""
+
+    def __init__(self, sheet: PdfWorkSheet, default_format: CellFormat):
+        self.sheet = sheet
+        self.default_format = default_format
+
+        self.merge_of = {}
+        for first_row, first_col, last_row, last_col in sheet.merged:
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    self.merge_of[(row, col)] = (first_row, first_col, last_row, last_col)
+
+    def render(self, can: canvas.Canvas):
+        sheet = self.sheet
+        used = self.__used_range()
+        if used is None:
+            return
+        first_row, first_col, last_row, last_col = used
+
+        rows = [row for row in range(first_row, last_row + 1) if row not in sheet.hidden_rows]
+        cols = [col for col in range(first_col, last_col + 1) if col not in sheet.hidden_columns]
+
+        # The cells with a value by row, with their position in the sheet, so the row heights and the pages only
+        # look at their own cells and draw them in the order they were written
+        self.cells_of_row = {}
+        for position, ((row, col), (value, _)) in enumerate(sheet.cells.items()):
+            if value is not None:
+                self.cells_of_row.setdefault(row, []).append((position, col, value))
+
+        self.widths = {col: _column_width(sheet.column_widths.get(col, DEFAULT_COLUMN_WIDTH)) for col in cols}
+        self.heights = {row: self.__row_height(row) for row in rows}
+
+        page_width, page_height = PAPER_SIZES.get(sheet.paper, PAPER_SIZES[9])
+        if sheet.landscape:
+            page_width, page_height = page_height, page_width
+        margins = {key: value * 72 for key, value in sheet.margins.items()}
+        printable_width = page_width - margins["left"] - margins["right"]
+        printable_height = page_height - margins["top"] - margins["bottom"]
+
+        # Fit to pages only shrinks, like in Excel
+        scale = sheet.print_scale / 100
+        if sheet.fit_width or sheet.fit_height:
+            scale = 1.0
+            if sheet.fit_width:
+                scale = min(scale, sheet.fit_width * printable_width / max(sum(self.widths.values()), 1))
+            if sheet.fit_height:
+                scale = min(scale, sheet.fit_height * printable_height / max(sum(self.heights.values()), 1))
+
+        row_pages = _paginate(rows, self.heights, printable_height / scale, sheet.h_breaks)
+        col_pages = _paginate(cols, self.widths, printable_width / scale, sheet.v_breaks)
+
+        # Pages are ordered down, then over
+        for page_cols in col_pages:
+            for page_rows in row_pages:
+                can.setPageSize((page_width, page_height))
+                can.saveState()
+                can.translate(margins["left"], page_height - margins["top"])
+                can.scale(scale, scale)
+                self.__draw_page(can, page_rows, page_cols)
+                can.restoreState()
+                can.showPage()
+
+    def __used_range(self):
+        sheet = self.sheet
+        if sheet.area is not None:
+            return sheet.area
+
+        keys = list(sheet.cells) + [(row, col) for row, col, *_ in sheet.objects]
+        keys += [(last_row, last_col) for _, _, last_row, last_col in sheet.merged]
+        if not keys:
+            return None
+        return (min(row for row, _ in keys), min(col for _, col in keys),
+                max(row for row, _ in keys), max(col for _, col in keys))
+
+    def __format(self, row: int, col: int) -> CellFormat:
+        cell = self.sheet.cells.get((row, col))
+        if cell is not None and cell[1] is not None:
+            return cell[1]
+        if cell is None:
+            cell_format = self.sheet.row_formats.get(row, self.sheet.column_formats.get(col))
+            if cell_format is not None:
+                return cell_format
+        return self.default_format
+
+    def __row_height(self, row: int) -> float:
+        if row in self.sheet.row_heights:
+            return self.sheet.row_heights[row]
+
+        # Rows without a set height grow with their font size and wrapped text
+        height = DEFAULT_ROW_HEIGHT
+        for _, col, value in self.cells_of_row.get(row, ()):
+            cell_format = self.__format(row, col)
+            lines = 1
+            if cell_format.text_wrap and isinstance(value, str) and (row, col) not in self.merge_of:
+                width = self.widths.get(col, 0) - 2 * CELL_PADDING - cell_format.indent * INDENT_WIDTH
+                lines = len(_wrap(value, _font(cell_format), cell_format.font_size, width))
+            height = max(height, lines * cell_format.font_size * LINE_SPACING + 2 * CELL_PADDING)
+        return height
+
+    def __draw_page(self, can: canvas.Canvas, rows: list, cols: list):
+        x_of, y_of = {}, {}
+        x = 0.0
+        for col in cols:
+            x_of[col] = x
+            x += self.widths[col]
+        y = 0.0
+        for row in rows:
+            y_of[row] = y
+            y += self.heights[row]
+
+        # Fills first, so borders and text of neighbouring cells are drawn on top
+        for row in rows:
+            for col in cols:
+                fill = _fill(self.__format(row, col))
+                if fill:
+                    can.setFillColor(_color(fill))
+                    can.rect(x_of[col], -y_of[row] - self.heights[row], self.widths[col], self.heights[row],
+                             stroke=0, fill=1)
+
+        for row in rows:
+            for col in cols:
+                self.__draw_borders(can, row, col, x_of[col], -y_of[row], self.widths[col], self.heights[row])
+
+        # The sorted columns of the page and their positions, for the text overflow
+        col_positions = {col: position for position, col in enumerate(cols)}
+
+        page_cells = sorted((position, row, col, value) for row in rows
+                            for position, col, value in self.cells_of_row.get(row, ()))
+        for _, row, col, value in page_cells:
+            if (row, col) in self.merge_of:
+                first_row, first_col, last_row, last_col = self.merge_of[(row, col)]
+                if (row, col) != (first_row, first_col):
+                    continue
+                width = sum(self.widths.get(c, 0) for c in range(first_col, last_col + 1) if c in x_of)
+                height = sum(self.heights.get(r, 0) for r in range(first_row, last_row + 1) if r in y_of)
+            elif col in x_of:
+                width, height = self.widths[col], self.heights[row]
+            else:
+                continue
+            if col in x_of:
+                self.__draw_value(can, row, col, value, x_of, -y_of[row], width, height, cols, col_positions)
+
+        for row, col, kind, data, options in self.sheet.objects:
+            if row in y_of and col in x_of:
+                if kind == "textbox":
+                    _draw_textbox(can, data, options, x_of[col], -y_of[row])
+                else:
+                    _draw_image(can, data, options, x_of[col], -y_of[row])
+
+    def __draw_borders(self, can: canvas.Canvas, row: int, col: int, x: float, top: float, width: float,
+                       height: float):
+        cell_format = self.__format(row, col)
+        merge = self.merge_of.get((row, col))
+        bottom = top - height
+        edges = [
+            ("top", x, top, x + width, top, merge is None or row == merge[0]),
+            ("bottom", x, bottom, x + width, bottom, merge is None or row == merge[2]),
+            ("left", x, top, x, bottom, merge is None or col == merge[1]),
+            ("right", x + width, top, x + width, bottom, merge is None or col == merge[3]),
+        ]
+        for side, x1, y1, x2, y2, outer in edges:
+            style = getattr(cell_format, side)
+            if not style or not outer:
+                continue
+            line_width, dash = BORDER_STYLES.get(style, (0.5, None))
+            can.setStrokeColor(_color(getattr(cell_format, f"{side}_color") or "#000000"))
+            can.setLineWidth(line_width)
+            can.setDash(dash or [])
+            if style == 6:
+                dx, dy = (0.75, 0) if x1 == x2 else (0, 0.75)
+                can.line(x1 - dx, y1 - dy, x2 - dx, y2 - dy)
+                can.line(x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            else:
+                can.line(x1, y1, x2, y2)
+        can.setDash([])
+
+    def __draw_value(self, can: canvas.Canvas, row: int, col: int, value, x_of: dict, top: float, width: float,
+                     height: float, cols: list, col_positions: dict):
+        cell_format = self.__format(row, col)
+        text = format_value(value, cell_format.num_format)
+        if text == "":
+            return
+
+        font = _font(cell_format)
+        size = cell_format.font_size
+        align = cell_format.text_h_align
+        if align in (0, 4, 5):
+            align = 3 if isinstance(value, float) else 2 if isinstance(value, bool) else 1
+        elif align in (6, 7):
+            align = 2
+
+        indent = cell_format.indent * INDENT_WIDTH
+        inner = width - 2 * CELL_PADDING - indent
+        if cell_format.text_wrap and isinstance(value, str):
+            lines = _wrap(text, font, size, inner)
+        else:
+            lines = [text]
+
+        text_height = len(lines) * size * LINE_SPACING
+        v_align = cell_format.text_v_align
+        if v_align == 1:
+            baseline = top - CELL_PADDING - size
+        elif v_align == 2:
+            baseline = top - (height - text_height) / 2 - size
+        else:
+            baseline = top - height + CELL_PADDING + text_height - size * LINE_SPACING + size * 0.2
+        x = x_of[col]
+
+        # Text that does not fit overflows into empty neighbouring cells, as in Excel, otherwise it is clipped
+        clip = None
+        text_width = max(can.stringWidth(line, font, size) for line in lines)
+        if text_width > inner:
+            clip = self.__overflow(row, col, value, align, x, width, x_of, cols, col_positions)
+
+        can.saveState()
+        if clip is not None:
+            path = can.beginPath()
+            path.rect(clip[0], top - height, clip[1] - clip[0], height)
+            can.clipPath(path, stroke=0, fill=0)
+        can.setFillColor(_color(cell_format.font_color or "#000000"))
+        can.setFont(font, size)
+        for i, line in enumerate(lines):
+            y = baseline - i * size * LINE_SPACING
+            if align == 3:
+                can.drawRightString(x + width - CELL_PADDING - indent, y, line)
+            elif align == 2:
+                can.drawCentredString(x + width / 2, y, line)
+            else:
+                can.drawString(x + CELL_PADDING + indent, y, line)
+            if cell_format.underline:
+                line_width = can.stringWidth(line, font, size)
+                start = {3: x + width - CELL_PADDING - indent - line_width,
+                         2: x + (width - line_width) / 2}.get(align, x + CELL_PADDING + indent)
+                can.setStrokeColor(_color(cell_format.font_color or "#000000"))
+                can.setLineWidth(0.5)
+                can.line(start, y - 1.5, start + line_width, y - 1.5)
+        can.restoreState()
+
+    def __overflow(self, row: int, col: int, value, align: int, x: float, width: float, x_of: dict, cols: list,
+                   col_positions: dict):
+        # Returns the horizontal extent the text may be drawn in, cols are the columns of the page in order
+        left, right = x, x + width
+        if not isinstance(value, str) or self.__format(row, col).text_wrap or (row, col) in self.merge_of:
+            return left, right
+
+        position = col_positions[col]
+        if align in (1, 2):
+            for neighbour in cols[position + 1:]:
+                if self.__occupied(row, neighbour):
+                    break
+                right = x_of[neighbour] + self.widths[neighbour]
+        if align in (3, 2):
+            for neighbour in reversed(cols[:position]):
+                if self.__occupied(row, neighbour):
+                    break
+                left = x_of[neighbour]
+        return left, right
+
+    def __occupied(self, row: int, col: int) -> bool:
+        cell = self.sheet.cells.get((row, col))
+        return (cell is not None and cell[0] is not None) or (row, col) in self.merge_of
+
+
+def _paginate(items: list, sizes: dict, available: float, breaks: set) -> list:
+    # Greedy split of rows or columns into pages, starting a new page at a manual break
+    pages, page, used = [], [], 0.0
+    for item in items:
+        if page and (item in breaks or used + sizes[item] > available):
+            pages.append(page)
+            page, used = [], 0.0
+        page.append(item)
+        used += sizes[item]
+    if page:
+        pages.append(page)
+    return pages
+
+
+def _column_width(width: float) -> float:
+    # Column width in characters to points, with xlsxwriter's conversion to pixels
+    if width <= 0:
+        return 0.0
+    if width < 1:
+        return int(width * 12 + 0.5) * PIXEL
+    return (int(width * 7 + 0.5) + 5) * PIXEL
+
+
+def _font(cell_format: CellFormat) -> str:
+    return FONTS[(bool(cell_format.bold), bool(cell_format.italic))]
+
+
+@lru_cache(maxsize=None)
+def _color(color: str) -> colors.Color:
+    # reportlab parses color strings on every use, the cells of a sheet share a handful of colors
+    return colors.toColor(color)
+
+
+def _fill(cell_format: CellFormat) -> Optional[str]:
+    if cell_format.pattern > 1:
+        return cell_format.fg_color or None
+    if cell_format.pattern == 1 and cell_format.fg_color:
+        return cell_format.fg_color
+    return cell_format.bg_color or None
+
+
+def _wrap(text: str, font: str, size: float, width: float) -> list:
+    lines = []
+    for paragraph in text.split("\n"):
+        lines.extend(simpleSplit(paragraph, font, size, max(width, 1.0)) or [""])
+    return lines
+
+
+def _draw_textbox(can: canvas.Canvas, text: str, options: dict, x: float, top: float):
+    width = options.get("width", 192) * options.get("x_scale", 1) * PIXEL
+    height = options.get("height", 120) * options.get("y_scale", 1) * PIXEL
+    x += options.get("x_offset", 0) * PIXEL
+    top -= options.get("y_offset", 0) * PIXEL
+
+    fill = options.get("fill", {})
+    line = options.get("line", {})
+    if not fill.get("none"):
+        can.setFillColor(fill.get("color", "#FFFFFF"))
+    if not line.get("none"):
+        can.setStrokeColor(line.get("color", "#000000"))
+        can.setLineWidth(line.get("width", 0.75))
+    can.rect(x, top - height, width, height, stroke=0 if line.get("none") else 1, fill=0 if fill.get("none") else 1)
+
+    font_options = options.get("font", {})
+    font = FONTS[(bool(font_options.get("bold")), bool(font_options.get("italic")))]
+    size = font_options.get("size", 11)
+    lines = _wrap(text or "", font, size, width - 2 * 7.2)
+    text_height = len(lines) * size * LINE_SPACING
+
+    align = options.get("align", {})
+    vertical = align.get("vertical", "top")
+    if vertical == "middle":
+        baseline = top - (height - text_height) / 2 - size
+    elif vertical == "bottom":
+        baseline = top - height + 3.6 + text_height - size * LINE_SPACING + size * 0.2
+    else:
+        baseline = top - 3.6 - size
+
+    can.setFillColor(font_options.get("color", "#000000"))
+    can.setFont(font, size)
+    horizontal = align.get("horizontal", "left")
+    for i, line_text in enumerate(lines):
+        y = baseline - i * size * LINE_SPACING
+        if horizontal == "center":
+            can.drawCentredString(x + width / 2, y, line_text)
+        elif horizontal == "right":
+            can.drawRightString(x + width - 7.2, y, line_text)
+        else:
+            can.drawString(x + 7.2, y, line_text)
+
+
+def _draw_image(can: canvas.Canvas, filename: str, options: dict, x: float, top: float):
+    image = ImageReader(options.get("image_data") or filename)
+    pixel_width, pixel_height = image.getSize()
+    width = pixel_width * options.get("x_scale", 1) * PIXEL
+    height = pixel_height * options.get("y_scale", 1) * PIXEL
+    x += options.get("x_offset", 0) * PIXEL
+    top -= options.get("y_offset", 0) * PIXEL
+    can.drawImage(image, x, top - height, width=width, height=height, mask="auto")
+
+
+def format_value(value, num_format) -> str:
+    """
+    Renders a cell value with an Excel number format, e.g. '0.00%;-0.00%;-' or 'yyyy-mm-dd'.
+
+    Args:
+        value: A float (numbers and dates as Excel serials), str, bool or None.
+        num_format: The format string, or the index of a built-in format.
+
+    Returns
+    -------
+        str: The value as Excel displays it.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(num_format, int):
+        num_format = BUILTIN_NUM_FORMATS.get(num_format, "General")
+
+    sections = _sections(num_format or "General")
+    if isinstance(value, str):
+        if len(sections) > 3 and sections[3] is not None:
+            return _render_section(sections[3], text=value)
+        if sections[0] is not None and any(kind == "text" for kind, _ in sections[0]):
+            return _render_section(sections[0], text=value)
+        return value
+
+    if value > 0 or len(sections) == 1:
+        section, number = sections[0], value
+    elif value < 0:
+        section, number = (sections[1], -value) if len(sections) > 1 else (sections[0], value)
+    else:
+        section, number = (sections[2] if len(sections) > 2 else sections[0]), value
+
+    if section is None:
+        return _general(number)
+    if any(kind == "date" for kind, _ in section) and not any(
+            kind == "number" and re.search("[0#]", token) for kind, token in section):
+        return _render_date(section, number)
+
+    sign = "-" if number < 0 else ""
+    return sign + _render_section(section, number=abs(number))
+
+
+_TOKENS = re.compile(r'"[^"]*"|\\.|_.|\*.|\[[^\]]*\]|AM/PM|A/P|[0#?,.%]+(?:[Ee][+-][0#]+)?|[yY]+|[mM]+|[dD]+|[hH]+'
+                     r'|[sS]+|@|.', re.DOTALL)
+
+
+@lru_cache(maxsize=None)
+def _sections(num_format: str) -> tuple:
+    # Splits a format into its positive;negative;zero;text sections and tokenizes them. General is None.
+    sections, current, quoted = [], "", False
+    for char in num_format:
+        if char == '"':
+            quoted = not quoted
+        if char == ";" and not quoted:
+            sections.append(current)
+            current = ""
+        else:
+            current += char
+    sections.append(current)
+
+    parsed = []
+    for section in sections:
+        if section.strip().lower() == "general":
+            parsed.append(None)
+            continue
+        tokens = []
+        for token in _TOKENS.findall(section):
+            if token.startswith('"'):
+                tokens.append(("literal", token[1:-1]))
+            elif token.startswith("\\"):
+                tokens.append(("literal", token[1:]))
+            elif token.startswith("_"):
+                tokens.append(("literal", " "))
+            elif token.startswith("*") or token.startswith("["):
+                continue
+            elif token in ("AM/PM", "A/P"):
+                tokens.append(("ampm", token))
+            elif token[0] in "0#?,.%":
+                tokens.append(("number", token))
+            elif token[0] in "yYmMdDhHsS":
+                tokens.append(("date", token.lower()))
+            elif token == "@":
+                tokens.append(("text", token))
+            else:
+                tokens.append(("literal", token))
+        parsed.append(tuple(tokens))
+    return tuple(parsed)
+
+
+def _general(number: float) -> str:
+    if number == int(number) and abs(number) < 1e11:
+        return str(int(number))
+    text = f"{number:.10g}"
+    if "e" in text and 1e-9 < abs(number) < 1e11:
+        text = f"{number:.10f}".rstrip("0").rstrip(".")
+    return text
+
+
+def _render_section(section: tuple, number: float = None, text: str = None) -> str:
+    parts = []
+    digits_rendered = False
+    percent = sum(token.count("%") for kind, token in section if kind == "number")
+    if number is not None:
+        number = number * 100 ** percent
+
+    for kind, token in section:
+        if kind == "literal":
+            parts.append(token)
+        elif kind == "text":
+            parts.append(text or "")
+        elif kind == "number":
+            if number is not None and not digits_rendered and re.search("[0#]", token):
+                parts.append(_render_number(number, token.replace("%", "")) + "%" * token.count("%"))
+                digits_rendered = True
+            else:
+                parts.append(token.replace("?", " ").replace("#", "").replace("0", ""))
+        elif kind == "date":
+            parts.append(token)
+    return "".join(parts)
+
+
+def _render_number(number: float, pattern: str) -> str:
+    exponent = None
+    if "E" in pattern.upper():
+        pattern, exponent = re.split("[Ee]", pattern, maxsplit=1)
+
+    integer_pattern, point, fraction_pattern = pattern.partition(".")
+    thousands = "," in integer_pattern.strip(",")
+    min_integer = integer_pattern.count("0")
+    max_decimals = sum(char in "0#?" for char in fraction_pattern)
+    min_decimals = fraction_pattern.count("0") + fraction_pattern.count("?")
+
+    power = 0
+    if exponent is not None and number != 0:
+        power = math.floor(math.log10(number))
+        number = number / 10 ** power
+
+    # Excel rounds half away from zero on the decimal representation
+    rounded = decimal.Decimal(f"{number:.15g}").quantize(decimal.Decimal(1).scaleb(-max_decimals),
+                                                         rounding=decimal.ROUND_HALF_UP)
+    integer, _, fraction = f"{rounded:{',' if thousands else ''}.{max_decimals}f}".partition(".")
+    fraction = fraction[:min_decimals] + fraction[min_decimals:].rstrip("0")
+    if integer == "0" and min_integer == 0:
+        integer = ""
+    elif len(integer) < min_integer:
+        integer = integer.zfill(min_integer)
+
+    text = integer + (point + fraction if point else "")
+    if exponent is not None:
+        sign = "-" if power < 0 else ("+" if "+" in exponent else "")
+        text += f"E{sign}{abs(power):0{exponent.count('0')}d}"
+    return text
+
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _render_date(section: tuple, serial: float) -> str:
+    moment = EXCEL_EPOCH + datetime.timedelta(seconds=round(serial * 86400))
+    twelve_hour = any(kind == "ampm" for kind, _ in section)
+    date_tokens = [i for i, (kind, _) in enumerate(section) if kind == "date"]
+
+    parts = []
+    for i, (kind, token) in enumerate(section):
+        if kind == "literal":
+            parts.append(token)
+        elif kind == "number":
+            parts.append(token)
+        elif kind == "ampm":
+            parts.append(("AM" if moment.hour < 12 else "PM") if token == "AM/PM" else
+                         ("A" if moment.hour < 12 else "P"))
+        elif kind == "date":
+            position = date_tokens.index(i)
+            previous = section[date_tokens[position - 1]][1] if position > 0 else ""
+            following = section[date_tokens[position + 1]][1] if position + 1 < len(date_tokens) else ""
+            letter, length = token[0], len(token)
+            if letter == "y":
+                parts.append(f"{moment.year % 100:02d}" if length <= 2 else f"{moment.year:04d}")
+            elif letter == "m" and (previous.startswith("h") or following.startswith("s")) and length <= 2:
+                parts.append(f"{moment.minute:0{length}d}")
+            elif letter == "m":
+                parts.append({1: str(moment.month), 2: f"{moment.month:02d}", 3: MONTHS[moment.month - 1][:3],
+                              5: MONTHS[moment.month - 1][0]}.get(length, MONTHS[moment.month - 1]))
+            elif letter == "d":
+                parts.append({1: str(moment.day), 2: f"{moment.day:02d}",
+                              3: DAYS[moment.weekday()][:3]}.get(length, DAYS[moment.weekday()]))
+            elif letter == "h":
+                hour = (moment.hour % 12 or 12) if twelve_hour else moment.hour
+                parts.append(f"{hour:0{min(length, 2)}d}")
+            elif letter == "s":
+                parts.append(f"{moment.second:0{min(length, 2)}d}")
+    return "".join(parts)
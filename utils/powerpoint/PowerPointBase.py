@@ -1,17 +1,55 @@
+import copy
+import os
+import threading
 
 from pptx import Presentation
 
+# Parsed templates by path, with the modification time and size they were parsed at. Presentations are cloned from
+# these, the templates themselves are never modified.
+_TEMPLATES = {}
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def open_presentation(file_path: str = None):
+    """
+    Returns a new presentation from the .pptx template, like Presentation(file_path). The template is parsed once per
+    process and each call returns a deep copy of it, which is several times faster than parsing. A template changed on
+    disk is parsed again.
+
+    Args:
+        file_path: Path of the template, None for the python-pptx default template.
+    """
+    if file_path is None:
+        key, signature = None, None
+    else:
+        stat = os.stat(file_path)
+        key, signature = os.path.abspath(file_path), (stat.st_mtime_ns, stat.st_size)
+
+    with _TEMPLATES_LOCK:
+        cached_signature, template = _TEMPLATES.get(key, (None, None))
+        if template is None or cached_signature != signature:
+            template = Presentation(file_path)
+            _TEMPLATES[key] = (signature, template)
+
+    return copy.deepcopy(template)
+
 
 class BasePresentation:
     def __init__(
         self, file_path: str = None
     ):
-        self.presentation = Presentation(file_path)
+        self.presentation = open_presentation(file_path)
         self.counter = '1'
+
+        # The first layout of each name, as add_slide used to pick it by a linear scan
+        self.layouts = {}
+        for layout in self.presentation.slide_layouts:
+            self.layouts.setdefault(layout.name, layout)
+
     def add_slide(self, slide_name: str = None):
-        for idx, t in enumerate(self.presentation.slide_layouts):
-            if t.name == slide_name:
-                return self.presentation.slides.add_slide(self.presentation.slide_layouts[idx])
+        layout = self.layouts.get(slide_name)
+        if layout is not None:
+            return self.presentation.slides.add_slide(layout)
 
     def update_footers(self, add: int = 1):
         counter = int(self.counter) + add
@@ -19,4 +57,3 @@ class BasePresentation:
 
     def save(self, output):
         self.presentation.save(output)
-
@@ -1,14 +1,21 @@
 
+import re
+from copy import deepcopy
+
 import numpy as np
 import pandas as pd
 from pptx.chart.data import CategoryChartData
 from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
 from pptx.enum.text import MSO_ANCHOR, PP_PARAGRAPH_ALIGNMENT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
 from pptx.oxml.xmlchemy import OxmlElement
 from pptx.util import Inches, Pt
 
 from utils.powerpoint.PowerPointBase import BasePresentation
 
+_SPECIAL_CHARACTERS = re.compile('[\x00-\x08\x0b-\x1f]|\n')
+
 
 class BaseSlide:
     def __init__(self, presentation: BasePresentation = None, slide_name: str = None, data: dict = None):
@@ -19,15 +26,20 @@ class BaseSlide:
         self.set_placeholders()
 
     def set_placeholders(self):
+        # Placeholders are renamed '<type> <n>', numbered per type in slide order. A placeholder whose name contains
+        # several types counts as the first of them.
         self.placeholder_dict = {}
-        for shape_name in ['Table Placeholder', 'Title', 'Text Placeholder', 'Chart Placeholder']:
-            idx = 1
-            for shape in self.slide.placeholders:
+        self.placeholder_shapes = {}
+        counters = {shape_name: 1 for shape_name in ['Table Placeholder', 'Title', 'Text Placeholder', 'Chart Placeholder']}
+        for shape in self.slide.placeholders:
+            for shape_name, idx in counters.items():
                 if shape_name in shape.name:
                     shape.name = shape_name + ' ' + str(idx)
-                    idx += 1
-                    # print(shape.name, shape.placeholder_format.idx, shape.text_frame, shape.text)
+                    counters[shape_name] = idx + 1
                     self.placeholder_dict[shape.name] = shape.placeholder_format.idx
+                    self.placeholder_shapes[shape.name] = shape
+                    break
+
     def set_master_style(self, shape_text: str = None, replace_text: str = None, font_size: int = 6, right_alignment: bool = False ):
         for shape in self.presentation.presentation.slide_master.shapes:
             if not shape.has_text_frame:
@@ -39,16 +51,16 @@ class BaseSlide:
                     shape.text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.RIGHT
 
     def get_placeholder(self, shape_name: str = None, shape_number: int = None):
-        for key, item in self.placeholder_dict.items():
-            if key == shape_name + ' ' + str(shape_number):
-                placeholder = self.slide.placeholders[item]
-                return placeholder
-        raise ValueError(f'The number {shape_number} for the type {shape_name} does not exist. Edit template')
+        placeholder = self.placeholder_shapes.get(shape_name + ' ' + str(shape_number))
+        if placeholder is None:
+            raise ValueError(f'The number {shape_number} for the type {shape_name} does not exist. Edit template')
+        return placeholder
 
     def remove_placeholder(self, shape_name: str = None, shape_number: int = None) -> None:
         placeholder = self.get_placeholder(shape_name=shape_name, shape_number=shape_number)
         sp = placeholder.element
         sp.getparent().remove(sp)
+        del self.placeholder_shapes[shape_name + ' ' + str(shape_number)]
     def set_superscript(self,
                         text_frame,
                         text: str = '',
@@ -226,8 +238,19 @@ class BaseSlide:
                          title: bool = True,
                          col_widths: list = None,
                          row_heights: list = None,
-                         right_align: bool = True):
-
+                         right_align: bool = True,
+                         col_formats: dict = None,
+                         bulk_write: bool = True):
+        """
+        Writes the values of the dataframe to the table body, below the title and header rows.
+
+        Args:
+            col_formats: The text of the cells in a column, by column name. Either a format string, e.g. '{:.2%}', or
+                a function of the value. Other columns show floats rounded to 2 decimals and NaN as an empty cell.
+            bulk_write: If True, the cells are generated in one pass as copies of a prototype cell, whose paragraph,
+                margin and border elements are built once. If False, the legacy cell-by-cell path is used. Both produce
+                the same table XML.
+        """
         rows, cols = df.shape
         m = df.values
         if title:
@@ -235,30 +258,82 @@ class BaseSlide:
         else:
             add_row = 1
 
-        for row in range(rows):
-            for col in range(cols):
-                val = m[row, col]
-                text = str(val)
-                if isinstance(val, float):
-                    if np.isnan(val):
-                        text = ""
-                    else:
-                        text = str(round(val, 2))
-                table.cell(row + add_row, col).text = text
-                table.cell(row + add_row, col).text_frame.paragraphs[0].font.size = Pt(8)
-                self.set_none_cell_margins(table.cell(row + add_row, col))
-                table.cell(row + add_row, col).vertical_anchor = MSO_ANCHOR.MIDDLE
-                self.set_cell_border(table.cell(row + add_row, col), border_width='4000')
-                if right_align:
-                    if col == 0:
-                        table.cell(row + add_row, col).text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.LEFT
-                    else:
-                        table.cell(row + add_row, col).text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.RIGHT
+        formats = [(col_formats or {}).get(column) for column in df.columns]
+
+        if bulk_write:
+            alignments = [None] * cols
+            if right_align:
+                alignments = ['l'] + ['r'] * (cols - 1)
+            prototypes = {(alignment, has_text): self.__table_cell_prototype(alignment=alignment, has_text=has_text)
+                          for alignment in set(alignments) for has_text in (False, True)}
+
+            tr_lst = table._tbl.tr_lst
+            for row in range(rows):
+                tr = tr_lst[row + add_row]
+                tc_lst = tr.tc_lst
+                for col in range(cols):
+                    text = self.__cell_text(m[row, col], formats[col])
+                    if _SPECIAL_CHARACTERS.search(text):
+                        # Line breaks and control characters need python-pptx's text handling
+                        self.__write_cell(table, row + add_row, col, text, right_align)
+                        continue
+
+                    tc = deepcopy(prototypes[(alignments[col], text != "")])
+                    if text:
+                        tc[0][2][1][0].text = text
+                    tr.replace(tc_lst[col], tc)
+        else:
+            for row in range(rows):
+                for col in range(cols):
+                    text = self.__cell_text(m[row, col], formats[col])
+                    self.__write_cell(table, row + add_row, col, text, right_align)
+
         if col_widths is not None:
             self.set_col_widths(cols=table.columns, widths=col_widths)
         if row_heights is not None:
             self.set_row_heights(rows=table.rows, heights=row_heights)
 
+    @staticmethod
+    def __cell_text(val, col_format=None) -> str:
+        if col_format is not None:
+            if isinstance(val, float) and np.isnan(val):
+                return ""
+            return col_format(val) if callable(col_format) else col_format.format(val)
+
+        text = str(val)
+        if isinstance(val, float):
+            if np.isnan(val):
+                text = ""
+            else:
+                text = str(round(val, 2))
+        return text
+
+    def __write_cell(self, table, row: int, col: int, text: str, right_align: bool):
+        cell = table.cell(row, col)
+        cell.text = text
+        cell.text_frame.paragraphs[0].font.size = Pt(8)
+        self.set_none_cell_margins(cell)
+        cell.vertical_anchor = MSO_ANCHOR.MIDDLE
+        self.set_cell_border(cell, border_width='4000')
+        if right_align:
+            if col == 0:
+                cell.text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.LEFT
+            else:
+                cell.text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.RIGHT
+
+    @staticmethod
+    def __table_cell_prototype(alignment: str = None, has_text: bool = True):
+        # A body cell as written by __write_cell, with an empty a:t to fill in
+        algn = '' if alignment is None else f' algn="{alignment}"'
+        run = '<a:r><a:t/></a:r>' if has_text else ''
+        return parse_xml(
+            f'<a:tc {nsdecls("a")}><a:txBody><a:bodyPr/><a:lstStyle/>'
+            f'<a:p><a:pPr{algn}><a:defRPr sz="800"/></a:pPr>{run}</a:p></a:txBody>'
+            f'<a:tcPr marB="0" marT="0" marL="0" marR="0" anchor="ctr">'
+            f'<a:lnB w="4000" cap="flat" cmpd="sng" algn="ctr"><a:solidFill><a:srgbClr val="423D36"/></a:solidFill>'
+            f'</a:lnB></a:tcPr></a:tc>'
+        )
+
     def set_table(self,
                   table_number: int = None,
                   df: pd.DataFrame = None,
@@ -291,7 +366,8 @@ class BaseSlide:
                      vertical_pos=MSO_ANCHOR.BOTTOM,
                      right_align: bool = True,
                      col_widths: list = None,
-                     row_heights: list = None):
+                     row_heights: list = None,
+                     col_formats: dict = None):
 
         if headers is None:
             headers = list(df.columns)
@@ -323,7 +399,8 @@ class BaseSlide:
                          df=df,
                          col_widths=col_widths,
                          row_heights=row_heights,
-                         right_align=right_align)
+                         right_align=right_align,
+                         col_formats=col_formats)
 
         return table
 
@@ -363,5 +440,3 @@ class BaseSlide:
         return chart
     def AttributeSheet(self):
         return None
-
-
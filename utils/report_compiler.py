@@ -1,7 +1,61 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
 from io import BytesIO
-from typing import Tuple
+from typing import Optional, Tuple
 
+from utils.tracing import span
+from utils.artifact_cache import ArtifactCache
 from utils.excel.ExcelReport import Report
+from utils.excel.Format import FormatSetting
+
+_deferral = threading.local()
+
+
+@dataclass
+class CompilationRequest:
+    """
+    Everything needed to compile a report in another process. Holds the report data and sheet classes rather than
+    the Report itself, since the xlsxwriter workbook cannot be pickled. If artifact_cache and artifact_key are set (see
+    utils.artifact_cache.cache_artifact), the compiled report is stored in that cache, also in a spawned process where
+    the process-wide cache of the parent is not set.
+    """
+    Data: dict
+    Sheets: dict
+    Format: FormatSetting
+    export_format: str
+    filename: str
+    ConstantMemory: bool = False
+    NativePDF: bool = False
+    artifact_cache: Optional[ArtifactCache] = None
+    artifact_key: Optional[str] = None
+    as_of_date: Optional[date] = None
+
+    def compile(self) -> Tuple[BytesIO, str]:
+        report = Report(Data=self.Data, Sheets=self.Sheets, Format=self.Format, ConstantMemory=self.ConstantMemory,
+                        NativePDF=self.NativePDF)
+        report_stream, filename = compile_report(report=report, export_format=self.export_format,
+                                                 filename=self.filename)
+
+        if self.artifact_cache is not None and self.artifact_key is not None:
+            self.artifact_cache.put(self.artifact_key, report_stream, filename, as_of_date=self.as_of_date)
+        return report_stream, filename
+
+
+@contextmanager
+def deferred_compilation():
+    """
+    Within this context compile_report does not compile the report on the current thread, but returns a
+    CompilationRequest in place of the report stream. Used by utils.batch_compiler to move workbook compilation to a
+    process pool without changing the generate_report functions.
+    """
+    previous = getattr(_deferral, "active", False)
+    _deferral.active = True
+    try:
+        yield
+    finally:
+        _deferral.active = previous
 
 
 def compile_report(report: Report, export_format: str, filename: str) -> Tuple[BytesIO, str]:
@@ -10,22 +64,42 @@ def compile_report(report: Report, export_format: str, filename: str) -> Tuple[B
 
     Args:
         report (Report): Report object to compile report.
-        export_format(str): Format of the report ('excel' or 'pdf').
+        export_format(str): Format of the report ('excel' or 'pdf'). With report.NativePDF, 'pdf' is rendered
+            without an office suite.
         filename(str): Name for the output file.
 
     Returns:
-        tuple: A tuple containing the report stream and filename.
+        tuple: A tuple containing the report stream and filename. Inside deferred_compilation() the report stream is
+        replaced by a CompilationRequest.
     """
-    # Compile as Excel
-    if "excel" in export_format:
-        report_stream = report.CompileReport()
-        filename = filename + ".xlsx"
-
-    # Compile as PDF
-    elif "pdf" in export_format:
-        report_stream = report.CompilePDFReport()
-        filename = filename + ".pdf"
-    else:
-        raise ValueError("Incorrect file format")
+    if getattr(_deferral, "active", False):
+        if "excel" in export_format:
+            extension = ".xlsx"
+        elif "pdf" in export_format:
+            extension = ".pdf"
+        else:
+            raise ValueError("Incorrect file format")
+
+        request = CompilationRequest(Data=report.Data,
+                                     Sheets=report.Sheets,
+                                     Format=report.Format,
+                                     export_format=export_format,
+                                     filename=filename,
+                                     ConstantMemory=report.ConstantMemory,
+                                     NativePDF=report.NativePDF)
+        return request, filename + extension
+
+    with span("compile_report", category="excel", export_format=export_format, filename=filename):
+        # Compile as Excel
+        if "excel" in export_format:
+            report_stream = report.CompileReport()
+            filename = filename + ".xlsx"
+
+        # Compile as PDF
+        elif "pdf" in export_format:
+            report_stream = report.CompilePDFReport()
+            filename = filename + ".pdf"
+        else:
+            raise ValueError("Incorrect file format")
 
     return report_stream, filename
@@ -0,0 +1,434 @@
+"""Stage tracing.
+
+Nested spans recording the wall time, CPU time, memory growth and row counts of the stages of report generation:
+data curation, database and API queries, sheet attribution, workbook close and PDF conversion. The spans of a run
+can be written as JSON, or as a Chrome trace to be opened in chrome://tracing or https://ui.perfetto.dev.
+
+Spans are only recorded while a tracer is active, otherwise opening a span is a single lookup. A tracer is activated
+with tracing() or set_tracer, or for the whole process by setting the environment variable TRACE_PATH. The spans are
+then written to that path on exit, in the format given by TRACE_FORMAT ('json' or 'chrome', by default 'json').
+
+Memory is measured in one of two ways, chosen per tracer:
+    'rss': Growth of the peak resident set size of the process during the span. Cheap, but a span that allocates
+        less than an earlier peak shows no growth.
+    'tracemalloc': Peak of the Python heap during the span above its size at the start. Exact, but tracemalloc
+        slows down allocation heavy code considerably. Spans running concurrently on several threads share the peak.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MEMORY_MODES = ("rss", "tracemalloc", None)
+
+_TRACER = None
+_TRACER_CONFIGURED = False
+_TRACER_LOCK = threading.Lock()
+
+_CURRENT_SPAN: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_SPAN_IDS = count(1)
+
+
+def _peak_rss() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count_rows(result) -> Optional[int]:
+    """
+    The number of rows of a result: the length of a DataFrame or array, or the total over the frames in a dict, list
+    or tuple. None if the result holds no frames.
+    """
+    shape = getattr(result, "shape", None)
+    if shape:
+        return shape[0]
+
+    if isinstance(result, dict):
+        result = result.values()
+    elif not isinstance(result, (list, tuple)):
+        return None
+
+    rows = [count_rows(item) for item in result]
+    rows = [row for row in rows if row is not None]
+    return sum(rows) if rows else None
+
+
+@dataclass
+class Span:
+    """
+    A timed stage. Attributes, e.g. the number of rows fetched, are added with set.
+
+    Args:
+        name (str): The stage, e.g. 'read_sql' or 'AttributeSheet'.
+        category (str): Groups the spans in the Chrome trace, e.g. 'query' or 'excel'.
+        attributes (dict): Details of the span, e.g. the sheet name.
+    """
+    name: str
+    category: str = "stage"
+    attributes: dict = field(default_factory=dict)
+    span_id: int = 0
+    parent_id: Optional[int] = None
+    pid: int = 0
+    thread_id: int = 0
+    thread_name: str = ""
+    start: float = 0.0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    memory_delta: Optional[int] = None
+    error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Add or update attributes of the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "category": self.category,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "pid": self.pid,
+            "thread_id": self.thread_id,
+            "thread_name": self.thread_name,
+            "start": self.start,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "memory_delta": self.memory_delta,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NullSpan:
+    """Stands in for a span while no tracer is active."""
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _NullSpanContext:
+    def __enter__(self):
+        return _NULL_SPAN
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN_CONTEXT = _NullSpanContext()
+
+
+class _SpanContext:
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> Span:
+        span = self.span
+        parent = _CURRENT_SPAN.get()
+        span.span_id = next(_SPAN_IDS)
+        span.parent_id = None if parent is None else parent.span_id
+        span.pid = os.getpid()
+        span.thread_id = threading.get_ident()
+        span.thread_name = threading.current_thread().name
+
+        self.token = _CURRENT_SPAN.set(span)
+        self.memory_start = self.tracer.enter_memory(parent=parent, span=span)
+        span.start = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        span = self.span
+        span.wall_time = time.perf_counter() - self.wall_start
+        span.cpu_time = time.thread_time() - self.cpu_start
+        _CURRENT_SPAN.reset(self.token)
+        span.memory_delta = self.tracer.exit_memory(parent=_CURRENT_SPAN.get(), span=span, start=self.memory_start)
+        if exc_type is not None:
+            span.error = exc_type.__name__
+        self.tracer.record(span)
+        return False
+
+
+class Tracer:
+    """
+    Collects the spans of a run.
+
+    Args:
+        memory (Optional[str]): How memory is measured, 'rss', 'tracemalloc' or None to not measure it. See the
+            module docstring.
+
+    Examples
+    --------
+        with tracing(memory='rss') as tracer:
+            for job in jobs:
+                job.report.generate_report(job.validated_data)
+        tracer.write('month_end.json', format='chrome')
+        print(tracer.summary())
+    """
+
+    def __init__(self, memory: Optional[str] = "rss"):
+        if memory not in MEMORY_MODES:
+            raise ValueError(f"memory must be one of {MEMORY_MODES}")
+        self.memory = memory
+        self.spans: list[Span] = []
+
+        self.__lock = threading.Lock()
+        self.__started_tracemalloc = False
+        # Peak of the Python heap seen by each open span, while measuring with tracemalloc
+        self.__heap_peaks = {}
+
+    def start(self):
+        if self.memory == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracemalloc = True
+
+    def stop(self):
+        if self.__started_tracemalloc:
+            tracemalloc.stop()
+            self.__started_tracemalloc = False
+
+    def enter_memory(self, parent: Optional[Span], span: Span) -> int:
+        if self.memory == "rss":
+            return _peak_rss()
+        if self.memory != "tracemalloc" or not tracemalloc.is_tracing():
+            return 0
+
+        # The peak is reset for every span, so the peak reached so far is handed to the enclosing span first
+        current, peak = tracemalloc.get_traced_memory()
+        with self.__lock:
+            if parent is not None and parent.span_id in self.__heap_peaks:
+                self.__heap_peaks[parent.span_id] = max(self.__heap_peaks[parent.span_id], peak)
+            self.__heap_peaks[span.span_id] = current
+            tracemalloc.reset_peak()
+        return current
+
+    def exit_memory(self, parent: Optional[Span], span: Span, start: int) -> Optional[int]:
+        if self.memory == "rss":
+            return _peak_rss() - start if resource is not None else None
+        if self.memory != "tracemalloc" or not tracemalloc.is_tracing():
+            return None
+
+        _, peak = tracemalloc.get_traced_memory()
+        with self.__lock:
+            peak = max(self.__heap_peaks.pop(span.span_id, start), peak)
+            if parent is not None and parent.span_id in self.__heap_peaks:
+                self.__heap_peaks[parent.span_id] = max(self.__heap_peaks[parent.span_id], peak)
+            tracemalloc.reset_peak()
+        return peak - start
+
+    def span(self, name: str, category: str = "stage", **attributes) -> _SpanContext:
+        return _SpanContext(tracer=self, span=Span(name=name, category=category, attributes=attributes))
+
+    def record(self, span: Span):
+        with self.__lock:
+            self.spans.append(span)
+
+    def extend(self, spans: list[Span]):
+        """Add spans recorded elsewhere, e.g. by a tracer in a worker process."""
+        with self.__lock:
+            self.spans.extend(spans)
+
+    def to_json(self) -> dict:
+        """The spans in order of their start, with times in seconds and memory in bytes."""
+        with self.__lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {"memory": self.memory, "spans": [span.to_dict() for span in spans]}
+
+    def to_chrome_trace(self) -> dict:
+        """The spans as complete events of the Chrome trace event format, with one track per process and thread."""
+        with self.__lock:
+            spans = list(self.spans)
+
+        events = []
+        threads = {}
+        for span in spans:
+            threads[(span.pid, span.thread_id)] = span.thread_name
+            args = {"cpu_ms": round(span.cpu_time * 1000, 3), **span.attributes}
+            if span.memory_delta is not None:
+                args["memory_delta_mb"] = round(span.memory_delta / 1024**2, 3)
+            if span.error is not None:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.wall_time * 1e6,
+                "pid": span.pid,
+                "tid": span.thread_id,
+                "args": args,
+            })
+
+        for (pid, thread_id), thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id,
+                           "args": {"name": thread_name}})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, format: str = "json"):
+        """
+        Write the spans to a file.
+
+        Args:
+            path (str): The output file.
+            format (str): 'json' for to_json, 'chrome' for to_chrome_trace.
+        """
+        if format == "json":
+            content = self.to_json()
+        elif format == "chrome":
+            content = self.to_chrome_trace()
+        else:
+            raise ValueError("format must be 'json' or 'chrome'")
+
+        with open(path, "w") as f:
+            json.dump(content, f, default=str)
+
+    def summary(self) -> list[dict]:
+        """
+        Totals per span name, ordered by total wall time. Times include nested spans, so the totals of nested stages
+        add up to more than the run took.
+
+        Returns
+        -------
+            list[dict]: name, count, wall_time and cpu_time in seconds, rows and the largest memory_delta in bytes.
+        """
+        with self.__lock:
+            spans = list(self.spans)
+
+        totals = {}
+        for span in spans:
+            total = totals.setdefault(span.name, {"name": span.name, "count": 0, "wall_time": 0.0, "cpu_time": 0.0,
+                                                  "rows": 0, "memory_delta": None})
+            total["count"] += 1
+            total["wall_time"] += span.wall_time
+            total["cpu_time"] += span.cpu_time
+            total["rows"] += span.attributes.get("rows") or 0
+            if span.memory_delta is not None:
+                total["memory_delta"] = max(total["memory_delta"] or 0, span.memory_delta)
+
+        return sorted(totals.values(), key=lambda total: total["wall_time"], reverse=True)
+
+
+def set_tracer(tracer: Optional[Tracer]):
+    """Set the process-wide tracer, or stop tracing with None."""
+    global _TRACER, _TRACER_CONFIGURED
+    with _TRACER_LOCK:
+        _TRACER = tracer
+        _TRACER_CONFIGURED = True
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Return the process-wide tracer. On first use it is created from TRACE_PATH, if set."""
+    global _TRACER, _TRACER_CONFIGURED
+    if _TRACER_CONFIGURED:
+        return _TRACER
+
+    with _TRACER_LOCK:
+        if not _TRACER_CONFIGURED:
+            path = os.environ.get("TRACE_PATH")
+            if path:
+                tracer = Tracer(memory=os.environ.get("TRACE_MEMORY", "rss"))
+                tracer.start()
+                atexit.register(tracer.write, path, format=os.environ.get("TRACE_FORMAT", "json"))
+                _TRACER = tracer
+            _TRACER_CONFIGURED = True
+
+        return _TRACER
+
+
+@contextmanager
+def tracing(memory: Optional[str] = "rss") -> Iterator[Tracer]:
+    """
+    Record the spans opened within this context, on any thread, with a new tracer. The previous tracer is restored
+    afterwards.
+
+    Args:
+        memory (Optional[str]): How memory is measured, see Tracer.
+    """
+    previous = get_tracer()
+    tracer = Tracer(memory=memory)
+    tracer.start()
+    set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+        tracer.stop()
+
+
+def span(name: str, category: str = "stage", **attributes):
+    """
+    Context manager timing a stage as a span, nested in the span open on the current thread if any. Yields the Span,
+    which accepts further attributes with set. Does nothing while no tracer is active.
+
+    Examples
+    --------
+        with span('AttributeSheet', category='excel', sheet=SheetName) as s:
+            wsc.AttributeSheet()
+            s.set(rows=len(Data))
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        return _NULL_SPAN_CONTEXT
+    return tracer.span(name, category=category, **attributes)
+
+
+def current_span():
+    """The innermost open span of the current thread, for adding attributes, or a stand-in ignoring them."""
+    if get_tracer() is None:
+        return _NULL_SPAN
+    current = _CURRENT_SPAN.get()
+    return _NULL_SPAN if current is None else current
+
+
+def traced(name: Optional[str] = None, category: str = "stage"):
+    """
+    Decorator timing each call of a function as a span. The rows of a returned DataFrame, or of the frames in a
+    returned dict, list or tuple, are added as the rows attribute.
+
+    Args:
+        name (Optional[str]): The span name, defaults to the module and qualified name of the function.
+        category (str): The span category.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def traced_function(*args, **kwargs):
+            tracer = get_tracer()
+            if tracer is None:
+                return func(*args, **kwargs)
+
+            with tracer.span(span_name, category=category) as s:
+                result = func(*args, **kwargs)
+                rows = count_rows(result)
+                if rows is not None:
+                    s.set(rows=rows)
+                return result
+
+        return traced_function
+
+    return decorator